@@ -0,0 +1,108 @@
+# backend/benchmarks/bench_serialization.py
+"""
+Measures the per-row cost of a list endpoint's query + JSON encoding.
+
+Compares, on a throwaway SQLite database of --rows medicines:
+- orm_to_dict_stdlib: full ORM instances, Medicine.to_dict, Flask's JSON
+  provider (how /api/medicines?category=... used to work)
+- projected_stdlib:   with_entities rows, Flask's JSON provider
+- projected_orjson:   with_entities rows, the orjson provider (current)
+
+Prints a JSON report of microseconds per row (median of --repeat runs).
+
+    python benchmarks/bench_serialization.py --rows 5000 --json serialization.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from curepharma import create_app  # noqa: E402
+from curepharma.extensions import db  # noqa: E402
+from curepharma.helpers import rows_as_dicts  # noqa: E402
+from curepharma.models import Medicine  # noqa: E402
+
+
+def seed(rows):
+    today = date.today()
+    db.session.execute(Medicine.__table__.insert(), [{
+        'name': f"Medicine {i:06d}", 'quantity': i % 200, 'freeqty': 0, 'batch_no': f"B{i}",
+        'expiry_date': today + timedelta(days=i % 700), 'mrp': 10 + i % 90, 'ptr': 7 + i % 60,
+        'amount': 100.0, 'gst': 12.0, 'netvalue': 112.0, 'category': 'General',
+        'formula': 'Paracetamol 500mg', 'sync_uid': f"medicine-{i}",
+    } for i in range(rows)])
+    db.session.commit()
+
+
+def orm_to_dict(app):
+    medicines = Medicine.query.filter(Medicine.category == 'General').order_by(Medicine.name).all()
+    return app.json.response([med.to_dict() for med in medicines])
+
+
+def projected(app):
+    medicines = Medicine.query.with_entities(*[getattr(Medicine, name) for name in Medicine.API_COLUMNS])\
+        .filter(Medicine.category == 'General').order_by(Medicine.name)
+    return app.json.response(rows_as_dicts(medicines))
+
+
+def time_per_row(app, func, rows, repeat):
+    samples = []
+    with app.test_request_context():
+        func(app)  # warm up caches and the connection
+        for _ in range(repeat):
+            db.session.expunge_all()
+            start = time.perf_counter()
+            response = func(app)
+            response.get_data()
+            samples.append((time.perf_counter() - start) * 1e6 / rows)
+    return round(statistics.median(samples), 3)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', dest='json_path')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        config = {'SQLALCHEMY_DATABASE_URI': db_url, 'SCHEDULER_ENABLED': False}
+        stdlib_app = create_app({**config, 'JSON_PROVIDER': 'stdlib'})
+        orjson_app = create_app({**config, 'JSON_PROVIDER': 'orjson'})
+        with stdlib_app.app_context():
+            db.create_all()
+            seed(args.rows)
+
+        report = {
+            'rows': args.rows,
+            'us_per_row': {
+                'orm_to_dict_stdlib': time_per_row(stdlib_app, orm_to_dict, args.rows, args.repeat),
+                'projected_stdlib': time_per_row(stdlib_app, projected, args.rows, args.repeat),
+                'projected_orjson': time_per_row(orjson_app, projected, args.rows, args.repeat),
+            },
+        }
+        for app in (stdlib_app, orjson_app):
+            with app.app_context():
+                db.engine.dispose()
+
+    before = report['us_per_row']['orm_to_dict_stdlib']
+    after = report['us_per_row']['projected_orjson']
+    report['speedup'] = round(before / after, 2) if after else None
+
+    print(json.dumps(report, indent=2))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as out:
+            json.dump(report, out, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# backend/benchmarks/bench_startup.py
+"""
+Measures cold import time, create_app() time and first-request latency.
+
+Each sample runs in a fresh interpreter so module caches don't hide import
+cost. Prints a JSON report; with --max-import-ms / --max-first-request-ms it
+exits non-zero when the median exceeds the budget, which is how CI tracks it.
+
+    python benchmarks/bench_startup.py --runs 5 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Runs inside the child interpreter.
+PROBE = r'''
+import json, sys, time
+t0 = time.perf_counter()
+from curepharma import create_app
+from curepharma.extensions import db
+t1 = time.perf_counter()
+app = create_app({"SQLALCHEMY_DATABASE_URI": sys.argv[1], "SCHEDULER_ENABLED": False})
+t2 = time.perf_counter()
+with app.app_context():
+    db.create_all()
+client = app.test_client()
+t3 = time.perf_counter()
+client.get("/api/medicines")
+t4 = time.perf_counter()
+client.get("/api/medicines")
+t5 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "create_app_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t4 - t3) * 1000,
+    "warm_request_ms": (t5 - t4) * 1000,
+    "pandas_loaded": "pandas" in sys.modules,
+    "apscheduler_loaded": "apscheduler" in sys.modules,
+}))
+'''
+
+
+def sample(db_url):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, db_url],
+        cwd=BACKEND_DIR, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', dest='json_path')
+    parser.add_argument('--max-import-ms', type=float)
+    parser.add_argument('--max-first-request-ms', type=float)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        samples = [sample(db_url) for _ in range(args.runs)]
+
+    report = {'runs': args.runs}
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'warm_request_ms'):
+        values = [s[key] for s in samples]
+        report[key] = {'median': round(statistics.median(values), 2), 'min': round(min(values), 2), 'max': round(max(values), 2)}
+    report['heavy_modules_at_startup'] = sorted(
+        name for name in ('pandas', 'apscheduler') if any(s[f'{name}_loaded'] for s in samples)
+    )
+
+    print(json.dumps(report, indent=2))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as out:
+            json.dump(report, out, indent=2)
+
+    failed = False
+    if args.max_import_ms is not None and report['import_ms']['median'] > args.max_import_ms:
+        print(f"import time {report['import_ms']['median']}ms exceeds budget {args.max_import_ms}ms", file=sys.stderr)
+        failed = True
+    if args.max_first_request_ms is not None and report['first_request_ms']['median'] > args.max_first_request_ms:
+        print(f"first request {report['first_request_ms']['median']}ms exceeds budget {args.max_first_request_ms}ms", file=sys.stderr)
+        failed = True
+    if report['heavy_modules_at_startup']:
+        print(f"heavy modules imported at startup: {report['heavy_modules_at_startup']}", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
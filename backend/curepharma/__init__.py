@@ -0,0 +1,84 @@
+# backend/curepharma/__init__.py
+"""
+CurePharma X backend.
+
+    from curepharma import create_app
+    app = create_app()
+
+Building an app:
+- creates the database engines (db.init_app) and, for the desktop SQLite
+  profile, hooks its pragmas onto the engine. No connection is opened until
+  the first query;
+- starts the log writer thread (curepharma.logs);
+- scans the frontend build and loads its small files into memory
+  (curepharma.static_assets).
+The uploads folder is created on the first upload, the log file on the
+first record and the background scheduler on the first request.
+"""
+
+from flask import Flask
+
+from .blueprints import ALL_BLUEPRINTS
+from .commands import register_commands
+from .config import Config, default_config
+from .extensions import db, migrate, cors
+from . import logs, json_provider, sqlite_profile, postgres_profile, static_assets, stores, sync, shortages, change_stamps, catalog, barcodes, salts, report_cache, report_snapshots, rate_limit
+from . import models  # noqa: F401  (registers tables on db.metadata)
+
+
+def create_app(config=None):
+    """
+    Application factory. `config` may be a config class/object or a dict of
+    overrides applied on top of Config.
+    """
+    if config is None:
+        config = default_config()
+
+    settings = Config if isinstance(config, dict) else config
+    # No built-in /static route: static_assets serves the whole build, including build/static
+    app = Flask(
+        __name__,
+        static_folder=None,
+        template_folder=getattr(settings, 'TEMPLATE_FOLDER', Config.TEMPLATE_FOLDER),
+    )
+    app.config.from_object(settings)
+    if isinstance(config, dict):
+        app.config.from_mapping(config)
+
+    logs.init_app(app)
+    json_provider.init_app(app)
+    cors.init_app(app, supports_credentials=True)
+    db.init_app(app)
+    migrate.init_app(app, db)
+    sqlite_profile.init_app(app)
+    postgres_profile.init_app(app)
+    stores.init_app(app)
+    sync.init_app(app)
+    shortages.init_app(app)
+    change_stamps.init_app(app)
+    catalog.init_app(app)
+    barcodes.init_app(app)
+    salts.init_app(app)
+    report_cache.init_app(app)
+    report_snapshots.init_app(app)
+    rate_limit.init_app(app)
+    static_assets.init_app(app)
+
+    for blueprint in ALL_BLUEPRINTS:
+        app.register_blueprint(blueprint)
+
+    register_commands(app)
+
+    _start_scheduler_on_first_request(app)
+    return app
+
+
+def _start_scheduler_on_first_request(app):
+    if not app.config.get('SCHEDULER_ENABLED', True):
+        return
+
+    @app.before_request
+    def start_background_jobs():
+        if 'scheduler' not in app.extensions:
+            from .scheduler import start_scheduler
+            start_scheduler(app)
@@ -0,0 +1,255 @@
+# backend/curepharma/analytics_export.py
+"""
+Incremental Parquet export for offline analytics (cohorts, seasonality, ...).
+
+Three datasets are appended to ANALYTICS_FOLDER, partitioned by day:
+
+    analytics/manifest.json
+    analytics/invoices/date=2026-10-19/part-0000012345.parquet
+    analytics/invoice_lines/date=2026-10-19/part-0000012345.parquet
+    analytics/stock_movements/date=2026-10-19/part-0000098765.parquet
+
+- invoices, invoice_lines: bills with an id above the dataset's watermark,
+  with their lines. Online orders still Pending within PENDING_GRACE hold
+  the watermark back, so an order is exported once, after approval or
+  rejection.
+- stock_movements: Medicine quantity changes, read from the sync change log
+  (SyncChange ids above the watermark), with the change and the quantity
+  after it. changed_at, and so the partition day, is in UTC.
+
+Every dataset has the row's store_id. Files written before stores existed
+lack the column; read_dataset() gives their rows store 1, which all data of
+that time belongs to.
+
+Each run reads CHUNK rows at a time by primary key. A chunk's file is named
+after its first key, so a run that dies half way and is repeated rewrites
+the same files instead of duplicating rows. The manifest holds the
+watermarks and per-partition row counts and files; it is rewritten
+(atomically) after every chunk.
+
+Readers need nothing but the files, e.g. in DuckDB:
+
+    SELECT * FROM read_parquet('analytics/invoice_lines/*/*.parquet', hive_partitioning = true)
+
+or read_dataset() below. pandas and pyarrow are imported only when an
+export or read actually runs.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func, select
+
+from .extensions import db
+from .models import CustomerInvoice, CustomerInvoiceItem, Medicine, SyncChange
+from .scheduler import scheduled_job
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_FORMAT = 1
+PENDING_GRACE = timedelta(days=2)
+
+# Column name -> pandas dtype; fixed so every file of a dataset has the same schema
+INVOICE_COLUMNS = {
+    'id': 'int64', 'sync_uid': 'string', 'bill_date': 'datetime64[us]', 'customer_name': 'string',
+    'customer_phone': 'string', 'payment_mode': 'string', 'order_type': 'string', 'status': 'string',
+    'grand_total': 'float64', 'pincode': 'string', 'geohash': 'string', 'store_id': 'Int64',
+}
+INVOICE_LINE_COLUMNS = {
+    'id': 'int64', 'invoice_id': 'int64', 'bill_date': 'datetime64[us]', 'medicine_name': 'string',
+    'quantity': 'Int64', 'mrp': 'float64', 'discount_percent': 'float64', 'ptr': 'float64',
+    'gst': 'float64', 'total_price': 'float64', 'category': 'string', 'store_id': 'Int64',
+}
+STOCK_MOVEMENT_COLUMNS = {
+    'change_id': 'int64', 'changed_at': 'datetime64[us]', 'medicine_uid': 'string', 'medicine_name': 'string',
+    'quantity_change': 'Int64', 'quantity_after': 'Int64', 'origin': 'string', 'store_id': 'Int64',
+}
+
+
+# --- MANIFEST ---
+def _manifest_path(folder):
+    return os.path.join(folder, MANIFEST_NAME)
+
+
+def load_manifest(folder):
+    try:
+        with open(_manifest_path(folder), encoding='utf-8') as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {'format': MANIFEST_FORMAT, 'datasets': {}}
+
+
+def _save_manifest(folder, manifest):
+    manifest['updated_at'] = datetime.utcnow().isoformat(timespec='seconds')
+    path = _manifest_path(folder)
+    with open(path + '.tmp', 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def _dataset(manifest, name):
+    return manifest['datasets'].setdefault(name, {'watermark': 0, 'rows': 0, 'partitions': {}})
+
+
+# --- WRITING ---
+def _write_partitions(folder, manifest, name, records, columns, date_column, first_key):
+    """Writes one chunk of records as a file per day under folder/name and records it in the manifest."""
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(records, columns=list(columns)).astype(columns)
+    file_name = f"part-{first_key:010d}.parquet"
+    dataset = _dataset(manifest, name)
+    for day, rows in frame.groupby(frame[date_column].dt.strftime('%Y-%m-%d')):
+        directory = os.path.join(folder, name, f"date={day}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, file_name)
+        rows.to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+        partition = dataset['partitions'].setdefault(day, {'rows': 0, 'files': []})
+        if file_name not in partition['files']:
+            partition['files'].append(file_name)
+            partition['rows'] += len(rows)
+            dataset['rows'] += len(rows)
+
+
+def _invoice_bound():
+    """The highest invoice id that is safe to export (see PENDING_GRACE)."""
+    newest = db.session.query(func.max(CustomerInvoice.id)).scalar() or 0
+    held = db.session.query(func.min(CustomerInvoice.id)).filter(
+        CustomerInvoice.status == 'Pending',
+        CustomerInvoice.bill_date >= datetime.now() - PENDING_GRACE,
+    ).scalar()
+    return newest if held is None else min(newest, held - 1)
+
+
+def _export_invoices(folder, manifest, chunk_rows):
+    bound = _invoice_bound()
+    written = {'invoices': 0, 'invoice_lines': 0}
+    while True:
+        after = _dataset(manifest, 'invoices')['watermark']
+        ids = db.session.execute(
+            select(CustomerInvoice.id).where(CustomerInvoice.id > after, CustomerInvoice.id <= bound)
+            .order_by(CustomerInvoice.id).limit(chunk_rows)
+        ).scalars().all()
+        if not ids:
+            return written
+        last = ids[-1]
+        in_chunk = (CustomerInvoice.id > after, CustomerInvoice.id <= last)
+
+        invoices = db.session.execute(
+            select(*(getattr(CustomerInvoice, column) for column in INVOICE_COLUMNS)).where(*in_chunk)
+        ).all()
+        lines = db.session.execute(
+            select(
+                CustomerInvoiceItem.id, CustomerInvoiceItem.invoice_id, CustomerInvoice.bill_date,
+                CustomerInvoiceItem.medicine_name, CustomerInvoiceItem.quantity, CustomerInvoiceItem.mrp,
+                CustomerInvoiceItem.discount_percent, CustomerInvoiceItem.ptr, CustomerInvoiceItem.gst,
+                CustomerInvoiceItem.total_price, Medicine.category, CustomerInvoiceItem.store_id,
+            ).join(CustomerInvoice, CustomerInvoice.id == CustomerInvoiceItem.invoice_id)
+            # Names are unique per store only: the line's category is its own store's
+            .outerjoin(Medicine, and_(Medicine.store_id == CustomerInvoiceItem.store_id,
+                                      Medicine.name == CustomerInvoiceItem.medicine_name))
+            .where(*in_chunk)
+        ).all()
+
+        _write_partitions(folder, manifest, 'invoices', invoices, INVOICE_COLUMNS, 'bill_date', ids[0])
+        if lines:
+            _write_partitions(folder, manifest, 'invoice_lines', lines, INVOICE_LINE_COLUMNS, 'bill_date', ids[0])
+        _dataset(manifest, 'invoices')['watermark'] = last
+        _dataset(manifest, 'invoice_lines')['watermark'] = last
+        _save_manifest(folder, manifest)
+        written['invoices'] += len(invoices)
+        written['invoice_lines'] += len(lines)
+
+
+def _stock_movement(change):
+    payload = json.loads(change.payload or '{}')
+    row = payload.get('row', {})
+    change_amount = payload.get('deltas', {}).get('quantity')
+    if change_amount is None and payload.get('created'):
+        # A new medicine's opening stock
+        change_amount = row.get('quantity') or None
+    if not change_amount:
+        return None
+    return (change.id, change.created_at, change.row_uid, row.get('name'), change_amount, row.get('quantity'), change.origin,
+            change.store_id)
+
+
+def _export_stock_movements(folder, manifest, chunk_rows):
+    written = 0
+    while True:
+        after = _dataset(manifest, 'stock_movements')['watermark']
+        changes = db.session.execute(
+            select(SyncChange.id, SyncChange.created_at, SyncChange.row_uid, SyncChange.payload, SyncChange.origin,
+                   SyncChange.store_id)
+            .where(SyncChange.id > after, SyncChange.table_name == Medicine.__tablename__, SyncChange.operation == 'upsert')
+            .order_by(SyncChange.id).limit(chunk_rows)
+        ).all()
+        if not changes:
+            return written
+        movements = [movement for movement in map(_stock_movement, changes) if movement]
+        if movements:
+            _write_partitions(folder, manifest, 'stock_movements', movements, STOCK_MOVEMENT_COLUMNS, 'changed_at', changes[0].id)
+        _dataset(manifest, 'stock_movements')['watermark'] = changes[-1].id
+        _save_manifest(folder, manifest)
+        written += len(movements)
+
+
+def export_analytics(folder=None):
+    """Appends everything new since the manifest's watermarks; returns {dataset: rows written}."""
+    folder = folder or current_app.config['ANALYTICS_FOLDER']
+    chunk_rows = current_app.config.get('ANALYTICS_EXPORT_CHUNK_ROWS', 20000)
+    os.makedirs(folder, exist_ok=True)
+    manifest = load_manifest(folder)
+    written = _export_invoices(folder, manifest, chunk_rows)
+    written['stock_movements'] = _export_stock_movements(folder, manifest, chunk_rows)
+    return written
+
+
+@scheduled_job('cron', hour=2, minute=45)
+def export_analytics_nightly():
+    if not current_app.config.get('ANALYTICS_EXPORT_ENABLED'):
+        return
+    try:
+        written = export_analytics()
+        logger.info("Analytics export: %s", written)
+    except Exception:
+        db.session.rollback()
+        logger.exception("Error exporting analytics")
+
+
+# --- READING ---
+def read_dataset(name, start=None, end=None, columns=None, folder=None):
+    """One dataset as a pandas DataFrame, reading only the day partitions between start and end (dates, inclusive)."""
+    import pandas as pd
+
+    folder = folder or current_app.config['ANALYTICS_FOLDER']
+    partitions = load_manifest(folder)['datasets'].get(name, {}).get('partitions', {})
+    paths = [
+        os.path.join(folder, name, f"date={day}", file_name)
+        for day, partition in sorted(partitions.items())
+        if (start is None or day >= start.isoformat()) and (end is None or day <= end.isoformat())
+        for file_name in partition['files']
+    ]
+    if not paths:
+        return pd.DataFrame(columns=columns)
+    frame = pd.concat((_read_file(path, columns) for path in paths), ignore_index=True)
+    if 'store_id' in frame:
+        frame['store_id'] = frame['store_id'].fillna(1).astype('Int64')
+    return frame
+
+
+def _read_file(path, columns):
+    """One file as a DataFrame; columns it predates come back empty rather than failing the read."""
+    import pandas as pd
+    import pyarrow.parquet as pq
+
+    if columns is None:
+        return pd.read_parquet(path)
+    present = set(pq.read_schema(path).names)
+    return pd.read_parquet(path, columns=[column for column in columns if column in present]).reindex(columns=columns)
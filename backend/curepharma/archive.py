@@ -0,0 +1,184 @@
+# backend/curepharma/archive.py
+"""
+Hot/cold archival of closed records.
+
+Invoices, reminders, shortages and advance payments only ever grow, while
+the screens that list them care about recent or open rows. Closed rows
+older than ARCHIVE_AFTER_DAYS are moved into <table>_archive tables with
+the same columns (see models.archive_table): INSERT ... SELECT then DELETE,
+one transaction per ARCHIVE_BATCH_SIZE rows, at most ARCHIVE_MAX_BATCHES
+batches per table per run. A first run over years of history is therefore
+spread over several nights instead of locking the tables for minutes.
+
+Closed means:
+- invoice: anything but a Pending online order, with no hot reminder
+  pointing at it; its items move with it;
+- reminder: Sent or Dismissed;
+- shortage: Resolved;
+- advance payment: delivered.
+
+Moves bypass the ORM, so they are not replicated as deletes (see
+curepharma.sync): each database archives its own history. They do bump the
+tables' change stamps.
+
+Reads: listings of open records never need the archive. Date-ranged sales
+reads get their entities from sales_entities(start_date), which returns the
+models themselves unless the range reaches back to archived bills, and
+aliases over hot UNION ALL archive when it does. Screens that show whole
+bills (a customer's history, a shared bill link) use load_bills, which reads
+them the same way.
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+from flask import current_app
+from sqlalchemy import exists, func, select, union_all
+from sqlalchemy.orm import aliased
+
+from .change_stamps import mark_tables, stamp_name
+from .extensions import db
+from .models import (
+    CustomerInvoice, CustomerInvoiceItem, Reminder, Shortage, AdvancePayment,
+    customer_invoice_archive, customer_invoice_item_archive, reminder_archive,
+    shortage_archive, advance_payment_archive,
+)
+from .scheduler import scheduled_job
+
+logger = logging.getLogger(__name__)
+
+# model -> (archive table, dated column); invoice items move with their invoice
+ARCHIVES = {
+    CustomerInvoice: (customer_invoice_archive, CustomerInvoice.bill_date),
+    Reminder: (reminder_archive, Reminder.reminder_date),
+    Shortage: (shortage_archive, Shortage.requested_date),
+    AdvancePayment: (advance_payment_archive, AdvancePayment.created_date),
+}
+
+
+# --- MOVING ---
+def _closed(model, cutoff):
+    """WHERE criteria for rows of model that are closed and dated before cutoff."""
+    _archive, column = ARCHIVES[model]
+    criteria = [column < (cutoff.date() if column.type.python_type is date else cutoff)]
+    if model is CustomerInvoice:
+        criteria += [
+            CustomerInvoice.status != 'Pending',
+            ~exists().where(Reminder.invoice_id == CustomerInvoice.id),
+        ]
+    elif model is Reminder:
+        criteria.append(Reminder.status.in_(('Sent', 'Dismissed')))
+    elif model is Shortage:
+        criteria.append(Shortage.status == 'Resolved')
+    elif model is AdvancePayment:
+        criteria.append(AdvancePayment.is_delivered.is_(True))
+    return criteria
+
+
+def _move(table, archive, criteria):
+    columns = [column.name for column in table.columns]
+    db.session.execute(archive.insert().from_select(columns, select(*table.columns).where(*criteria)))
+    db.session.execute(table.delete().where(*criteria))
+
+
+def archive_batch(model, cutoff, batch_size):
+    """Moves up to batch_size closed rows of model to its archive, in one transaction. Returns the count."""
+    archive, column = ARCHIVES[model]
+    rows = db.session.execute(
+        select(model.id, model.store_id).where(*_closed(model, cutoff)).order_by(column, model.id).limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+    ids = [row.id for row in rows]
+    stores = {row.store_id for row in rows}
+
+    tables = [model.__tablename__]
+    if model is CustomerInvoice:
+        # Children first: customer_invoice_item.invoice_id references the invoice
+        _move(CustomerInvoiceItem.__table__, customer_invoice_item_archive, [CustomerInvoiceItem.invoice_id.in_(ids)])
+        tables.append(CustomerInvoiceItem.__tablename__)
+    _move(model.__table__, archive, [model.id.in_(ids)])
+    mark_tables(db.session, [stamp_name(table, store_id) for table in tables for store_id in stores])
+    db.session.commit()
+    return len(ids)
+
+
+def archive_closed_records(now=None):
+    """Runs bounded archival batches for every table; returns {table: rows moved}."""
+    config = current_app.config
+    cutoff = (now or datetime.now()) - timedelta(days=config.get('ARCHIVE_AFTER_DAYS', 365))
+    batch_size = config.get('ARCHIVE_BATCH_SIZE', 500)
+    moved = {}
+    # Reminders first, so invoices they were holding back can go in the same run
+    for model in (Reminder, CustomerInvoice, Shortage, AdvancePayment):
+        total = 0
+        for _ in range(config.get('ARCHIVE_MAX_BATCHES', 20)):
+            count = archive_batch(model, cutoff, batch_size)
+            total += count
+            if count < batch_size:
+                break
+        moved[model.__tablename__] = total
+    return moved
+
+
+@scheduled_job('cron', hour=3, minute=30)
+def archive_old_records():
+    try:
+        moved = archive_closed_records()
+        if any(moved.values()):
+            logger.info("Archived records: %s", moved)
+    except Exception:
+        db.session.rollback()
+        logger.exception("Error archiving records")
+
+
+# --- READING ---
+def archived_through(model):
+    """The newest date in model's archive, or None while it is empty."""
+    archive, column = ARCHIVES[model]
+    return db.session.execute(select(func.max(archive.c[column.key]))).scalar()
+
+
+def _as_datetime(value):
+    return value if isinstance(value, datetime) else datetime.combine(value, time.min)
+
+
+def sales_entities(start_date=None):
+    """
+    (Invoice, Item) to query bills dated start_date or later (None: all of
+    them). Normally CustomerInvoice and CustomerInvoiceItem themselves; when
+    the range reaches archived bills, aliases over hot UNION ALL archive,
+    usable the same way in column queries. Don't load entities through the
+    aliases: archived rows can't be updated or lazy-load their items.
+    """
+    newest = archived_through(CustomerInvoice)
+    if newest is None or (start_date is not None and _as_datetime(start_date) > newest):
+        return CustomerInvoice, CustomerInvoiceItem
+    invoices = union_all(select(CustomerInvoice.__table__), select(customer_invoice_archive)).subquery('all_invoices')
+    items = union_all(select(CustomerInvoiceItem.__table__), select(customer_invoice_item_archive)).subquery('all_invoice_items')
+    return aliased(CustomerInvoice, invoices), aliased(CustomerInvoiceItem, items)
+
+
+def load_bills(where):
+    """
+    Bills, hot and archived, newest first, as read-only objects with the
+    invoice's columns and an `items` list. where(Invoice) returns the criteria
+    on the invoice entity it is given. Two queries, whatever the count.
+    """
+    Invoice, Item = sales_entities()
+    criteria = where(Invoice)
+    query = select(*[getattr(Invoice, attr.key) for attr in CustomerInvoice.__mapper__.column_attrs])\
+        .where(*criteria).order_by(Invoice.bill_date.desc(), Invoice.id.desc())
+    bills = [SimpleNamespace(**row._mapping, items=[]) for row in db.session.execute(query)]
+    if not bills:
+        return []
+
+    by_id = {bill.id: bill for bill in bills}
+    items = select(*[getattr(Item, attr.key) for attr in CustomerInvoiceItem.__mapper__.column_attrs])\
+        .join(Invoice, Invoice.id == Item.invoice_id).where(*criteria).order_by(Item.id)
+    for row in db.session.execute(items):
+        bill = by_id.get(row.invoice_id)
+        if bill is not None:
+            bill.items.append(SimpleNamespace(**row._mapping))
+    return bills
@@ -0,0 +1,72 @@
+# backend/curepharma/barcodes.py
+"""
+Exact barcode lookups for the billing counter (/api/medicines/by-code/<code>).
+
+Scans are answered from an in-process dict {barcode: medicine row} instead
+of the database, one per store. The dict is a CatalogMirror: it follows the
+store's medicine writes through catalogue deltas (see curepharma.catalog).
+"""
+
+from flask import current_app
+
+from .catalog import CatalogMirror, register_mirror
+from .models import Medicine
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+MAX_CODE_LENGTH = 20
+
+
+def normalize_code(code):
+    """
+    A scanned or typed barcode in its stored form, or None if empty or invalid.
+    GTIN-8/12/13/14 are zero-padded to 14 digits so the same product matches
+    whichever symbology was scanned; other codes are upper-cased.
+    """
+    code = ''.join(str(code or '').split()).replace('-', '')
+    if not code or len(code) > MAX_CODE_LENGTH or not code.isalnum():
+        return None
+    if code.isdigit() and len(code) in GTIN_LENGTHS:
+        return code.zfill(14)
+    return code.upper()
+
+
+def normalize_hsn(code):
+    """An HSN/SAC code (2 to 8 digits), or None if empty or invalid."""
+    code = ''.join(str(code or '').split()).replace('.', '')
+    if not code.isdigit() or not 2 <= len(code) <= 8:
+        return None
+    return code
+
+
+class CodeIndex(CatalogMirror):
+    """barcode -> medicine row, for rows that have a barcode."""
+
+    def clear(self):
+        self.rows = {}   # barcode -> medicine row
+        self.codes = {}  # medicine id -> barcode
+
+    def discard(self, medicine_id):
+        code = self.codes.pop(medicine_id, None)
+        if code is not None and self.rows.get(code, {}).get('id') == medicine_id:
+            del self.rows[code]
+
+    def put(self, row):
+        self.discard(row['id'])
+        if row['barcode']:
+            self.rows[row['barcode']] = row
+            self.codes[row['id']] = row['barcode']
+
+    def rebuild_criteria(self):
+        return (Medicine.barcode.isnot(None),)
+
+    def lookup(self, code):
+        return self.ensure_current().rows.get(normalize_code(code))
+
+
+def get_code_index(store_id=None):
+    """The store's (default: the current store's) index."""
+    return current_app.extensions['code_index'].for_store(store_id)
+
+
+def init_app(app):
+    register_mirror(app, 'code_index', CodeIndex)
@@ -0,0 +1,306 @@
+# backend/curepharma/batch_billing.py
+"""
+Many bills in one request (/api/billing/batch), for the desktop counter's
+offline queue and for replaying a day of paper bills.
+
+Every bill carries a client-generated idempotency_key, which is stored on
+the invoice under a unique index. A key that already exists, on a hot or
+an archived invoice, is reported as 'duplicate' together with its invoice
+id. Keys are unique across stores, so one already used by another store is
+reported as 'conflict' and the bill is not saved. A concurrent request racing
+on the same key hits the unique index instead, so the chunk is retried
+and the bill then reported as a duplicate. A retry therefore never bills
+twice.
+
+Bills are processed in chunks of BILLING_BATCH_CHUNK_SIZE, with one
+transaction per chunk:
+1. one query finds the keys that already exist;
+2. one SELECT ... FOR UPDATE (a plain SELECT on SQLite) loads every
+   medicine the chunk sells. Stock is then allocated to the bills in
+   order, in memory, and a bill that doesn't fit is rejected on its own;
+3. invoices (RETURNING their ids), items and reminders go in as bulk
+   INSERTs, and the stock changes as one flush.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytz
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from .archive import sales_entities
+from .change_stamps import mark_tables, stamp_name
+from .extensions import db
+from .helpers import default_store_id
+from .models import Medicine, Reminder, CustomerInvoice, CustomerInvoiceItem, new_sync_uid
+from .report_snapshots import mark_closed_periods
+from .sync import record_bulk_inserts
+
+logger = logging.getLogger(__name__)
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+class InvalidBill(ValueError):
+    pass
+
+
+def _result(index, key, status, **extra):
+    return {'index': index, 'idempotency_key': key, 'status': status, **extra}
+
+
+def parse_bill(bill):
+    """Validates one bill's JSON (same shape as /api/billing plus idempotency_key). Raises InvalidBill."""
+    if not isinstance(bill, dict):
+        raise InvalidBill("Each bill must be an object")
+    key = str(bill.get('idempotency_key') or '').strip()
+    if not key or len(key) > 64:
+        raise InvalidBill("idempotency_key is required (at most 64 characters)")
+    customer = bill.get('customer')
+    items = bill.get('items')
+    if not customer or not items:
+        raise InvalidBill("Missing customer information or items")
+
+    bill_date = datetime.now(IST)
+    if bill.get('bill_date'):
+        try:
+            bill_date = datetime.fromisoformat(bill['bill_date'])
+        except (TypeError, ValueError):
+            raise InvalidBill("bill_date must be an ISO 8601 date/time")
+
+    lines = []
+    for item in items:
+        try:
+            quantity = int(item['quantity'])
+            mrp = float(item['mrp'])
+            discount = float(item.get('discount') or 0)
+            manual = bool(item.get('isManual', False))
+            medicine_id = None if manual else int(item['id'])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidBill(f"Invalid item {item.get('name') if isinstance(item, dict) else item!r}")
+        if quantity <= 0:
+            raise InvalidBill(f"Quantity for {item.get('name')} must be positive")
+        lines.append({
+            'name': item.get('name'),
+            'quantity': quantity,
+            'mrp': mrp,
+            'discount': discount,
+            'total': quantity * mrp * (1 - discount / 100),
+            'manual': manual,
+            'medicine_id': medicine_id,
+            'ptr': float(item.get('ptr') or 0.0),
+            'save_to_inventory': manual and bool(item.get('saveToInventory', False)),
+            'reminder_days': item.get('reminder_days'),
+        })
+
+    return {
+        'key': key,
+        'customer': customer,
+        'address': bill.get('address') or {},
+        'payment_mode': bill.get('paymentMode', 'Cash'),
+        'bill_date': bill_date,
+        'lines': lines,
+    }
+
+
+def _allocate_stock(pending, results):
+    """Locks the chunk's medicines, allocates stock to bills in order and returns (accepted, medicines)."""
+    medicine_ids = sorted({line['medicine_id'] for _, bill in pending for line in bill['lines'] if not line['manual']})
+    medicines = {}
+    if medicine_ids:
+        # Ordered by id so two batches lock rows in the same order
+        locked = Medicine.query.filter(Medicine.id.in_(medicine_ids)).order_by(Medicine.id).with_for_update()
+        medicines = {medicine.id: medicine for medicine in locked}
+    available = {medicine_id: medicine.quantity or 0 for medicine_id, medicine in medicines.items()}
+
+    accepted = []
+    for index, bill in pending:
+        needed = defaultdict(int)
+        for line in bill['lines']:
+            if not line['manual']:
+                needed[line['medicine_id']] += line['quantity']
+        short = next((line['name'] for line in bill['lines'] if not line['manual']
+                      and available.get(line['medicine_id'], 0) < needed[line['medicine_id']]), None)
+        if short is not None:
+            results[index] = _result(index, bill['key'], 'rejected', error=f"Not enough stock for {short}")
+            continue
+        for medicine_id, quantity in needed.items():
+            available[medicine_id] -= quantity
+        accepted.append((index, bill))
+
+    for medicine_id, medicine in medicines.items():
+        if available[medicine_id] != (medicine.quantity or 0):
+            medicine.quantity = available[medicine_id]
+    return accepted, medicines
+
+
+def _add_manual_medicines(accepted):
+    """Creates inventory rows for manual items marked saveToInventory, like /api/billing does."""
+    wanted = {}
+    for _, bill in accepted:
+        for line in bill['lines']:
+            if line['save_to_inventory'] and line['name']:
+                wanted.setdefault(line['name'], line)
+    if not wanted:
+        return
+    existing = {name for (name,) in db.session.query(Medicine.name).filter(Medicine.name.in_(list(wanted)))}
+    for name, line in wanted.items():
+        if name not in existing:
+            db.session.add(Medicine(name=name, mrp=line['mrp'], ptr=line['ptr'], gst=0.0, quantity=0))
+
+
+def _insert_bills(accepted, medicines):
+    """Bulk-inserts invoices, items and reminders. Returns {idempotency_key: invoice_id}."""
+    now = datetime.utcnow()
+    # Bulk INSERTs are Core statements: the store is given rather than defaulted, so sync logs it too
+    store_id = default_store_id()
+    invoice_rows = []
+    for _, bill in accepted:
+        customer, address = bill['customer'], bill['address']
+        invoice_rows.append({
+            'customer_name': customer.get('name', 'N/A'),
+            'customer_phone': customer.get('phone', 'N/A'),
+            'bill_date': bill['bill_date'],
+            'grand_total': sum(line['total'] for line in bill['lines']),
+            'payment_mode': bill['payment_mode'],
+            'address': address.get('address'),
+            'pincode': address.get('pincode'),
+            'latitude': address.get('lat'),
+            'longitude': address.get('lng'),
+            'order_type': 'In-Store',
+            'status': 'Approved',
+            'idempotency_key': bill['key'],
+            'store_id': store_id,
+            'sync_uid': new_sync_uid(),
+            'updated_at': now,
+        })
+    returned = db.session.execute(
+        insert(CustomerInvoice).returning(CustomerInvoice.idempotency_key, CustomerInvoice.id, sort_by_parameter_order=True),
+        invoice_rows,
+    )
+    invoice_ids = dict(returned.all())
+
+    item_rows, reminder_rows = [], []
+    for _, bill in accepted:
+        invoice_id = invoice_ids[bill['key']]
+        customer = bill['customer']
+        for line in bill['lines']:
+            medicine = medicines.get(line['medicine_id'])
+            item_rows.append({
+                'invoice_id': invoice_id,
+                'medicine_name': line['name'],
+                'quantity': line['quantity'],
+                'mrp': line['mrp'],
+                'discount_percent': line['discount'],
+                'total_price': line['total'],
+                'ptr': medicine.ptr if medicine else line['ptr'],
+                'gst': medicine.gst if medicine else 0.0,
+                'store_id': store_id,
+                'sync_uid': new_sync_uid(),
+                'updated_at': now,
+            })
+            try:
+                reminder_days = int(line['reminder_days'] or 0)
+            except (TypeError, ValueError):
+                reminder_days = 0
+            if reminder_days > 0:
+                reminder_rows.append({
+                    'customer_name': customer.get('name', 'N/A'),
+                    'customer_phone': customer.get('phone', 'N/A'),
+                    'medicine_name': line['name'],
+                    'reminder_date': bill['bill_date'].date() + timedelta(days=reminder_days),
+                    'status': 'Pending',
+                    'created_at': now,
+                    'invoice_id': invoice_id,
+                    'store_id': store_id,
+                    'sync_uid': new_sync_uid(),
+                    'updated_at': now,
+                })
+
+    db.session.execute(insert(CustomerInvoiceItem), item_rows)
+    if reminder_rows:
+        db.session.execute(insert(Reminder), reminder_rows)
+
+    record_bulk_inserts(db.session, CustomerInvoice, invoice_rows)
+    record_bulk_inserts(db.session, CustomerInvoiceItem, item_rows)
+    record_bulk_inserts(db.session, Reminder, reminder_rows)
+    # Bulk INSERTs aren't flushed either, so their change stamps are bumped explicitly
+    mark_tables(db.session, [stamp_name(model.__tablename__, store_id) for model, rows in
+                             ((CustomerInvoice, invoice_rows), (CustomerInvoiceItem, item_rows), (Reminder, reminder_rows)) if rows])
+    # Late (offline) bills dated before today change reports of closed periods
+    mark_closed_periods(db.session, [row['bill_date'] for row in invoice_rows], store_id)
+    return invoice_ids
+
+
+def _process_chunk(chunk, results):
+    keys = [bill['key'] for _, bill in chunk]
+    # Archived invoices leave the unique index, so the lookup covers them too; the index spans every store
+    Invoice, _Item = sales_entities()
+    existing = {key: (invoice_id, invoice_store_id) for key, invoice_id, invoice_store_id in
+                db.session.query(Invoice.idempotency_key, Invoice.id, Invoice.store_id)
+                .filter(Invoice.idempotency_key.in_(keys)).execution_options(all_stores=True)}
+    store_id = default_store_id()
+    pending = []
+    for index, bill in chunk:
+        invoice_id, invoice_store_id = existing.get(bill['key'], (None, None))
+        if invoice_id is None:
+            pending.append((index, bill))
+        elif invoice_store_id == store_id:
+            results[index] = _result(index, bill['key'], 'duplicate', invoiceId=invoice_id)
+        else:
+            results[index] = _result(index, bill['key'], 'conflict', error="This idempotency_key was already used by another store")
+
+    accepted, medicines = _allocate_stock(pending, results)
+    if accepted:
+        _add_manual_medicines(accepted)
+        db.session.flush()
+        invoice_ids = _insert_bills(accepted, medicines)
+        for index, bill in accepted:
+            results[index] = _result(index, bill['key'], 'created', invoiceId=invoice_ids[bill['key']])
+    db.session.commit()
+
+
+def ingest_bills(bills, chunk_size):
+    """Bills the list of bill dicts in chunks. Returns one result dict per bill, in order."""
+    results = [None] * len(bills)
+    parsed = []
+    first_index_by_key = {}
+    for index, bill in enumerate(bills):
+        try:
+            parsed_bill = parse_bill(bill)
+        except InvalidBill as e:
+            key = bill.get('idempotency_key') if isinstance(bill, dict) else None
+            results[index] = _result(index, key, 'invalid', error=str(e))
+            continue
+        if parsed_bill['key'] in first_index_by_key:
+            results[index] = _result(index, parsed_bill['key'], 'duplicate', duplicateOf=first_index_by_key[parsed_bill['key']])
+            continue
+        first_index_by_key[parsed_bill['key']] = index
+        parsed.append((index, parsed_bill))
+
+    for start in range(0, len(parsed), chunk_size):
+        chunk = parsed[start:start + chunk_size]
+        for attempt in range(2):
+            try:
+                _process_chunk(chunk, results)
+                break
+            except IntegrityError as e:
+                # Another request committed one of these keys first; the retry reports it as a duplicate
+                db.session.rollback()
+                if attempt:
+                    logger.error("Error ingesting bill batch: %s", e)
+                    for index, bill in chunk:
+                        results[index] = _result(index, bill['key'], 'error', error="Could not save this bill, please retry.")
+            except Exception:
+                db.session.rollback()
+                logger.exception("Error ingesting bill batch")
+                for index, bill in chunk:
+                    results[index] = _result(index, bill['key'], 'error', error="Could not save this bill, please retry.")
+                break
+
+    for result in results:
+        if 'duplicateOf' in result and 'invoiceId' in results[result['duplicateOf']]:
+            result['invoiceId'] = results[result['duplicateOf']]['invoiceId']
+    return results
@@ -0,0 +1,18 @@
+# backend/curepharma/blueprints/__init__.py
+
+from . import auth, inventory, catalog, billing, reports, exports, orders, reminders, stores, sync, frontend
+
+# The frontend catch-all must stay last.
+ALL_BLUEPRINTS = [
+    auth.bp,
+    inventory.bp,
+    catalog.bp,
+    billing.bp,
+    reports.bp,
+    exports.bp,
+    orders.bp,
+    reminders.bp,
+    stores.bp,
+    sync.bp,
+    frontend.bp,
+]
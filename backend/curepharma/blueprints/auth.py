@@ -0,0 +1,83 @@
+# backend/curepharma/blueprints/auth.py
+
+from flask import Blueprint, current_app, request, jsonify, session
+
+from ..extensions import db
+from ..models import Store, User
+from ..rate_limit import rate_limited
+
+bp = Blueprint('auth', __name__)
+
+
+def _requested_store(data):
+    """The active Store named by data['store_id'], else the default store; None if the id is unknown."""
+    store_id = data.get('store_id') or current_app.config.get('DEFAULT_STORE_ID', 1)
+    try:
+        store = db.session.get(Store, int(store_id))
+    except (TypeError, ValueError):
+        return None
+    return store if store is not None and store.is_active else None
+
+
+def _user_data(user=None):
+    if user is None:
+        return {"id": session['user_id'], "name": session['user_name'], "role": session.get('user_role', 'customer'),
+                "store_id": session.get('store_id')}
+    return {"id": user.id, "name": user.name, "role": user.role, "store_id": session.get('store_id')}
+
+
+# --- AUTHENTICATION ROUTES ---
+@bp.route("/api/signup", methods=["POST"])
+@rate_limited('login')
+def signup():
+    data = request.get_json()
+    if not data or not all(k in data for k in ['name', 'phone', 'password']):
+        return jsonify({"error": "Missing name, phone, or password"}), 400
+    if User.query.filter_by(phone=data['phone']).first():
+        return jsonify({"error": "Phone number already registered"}), 409
+    store = _requested_store(data)
+    if store is None:
+        return jsonify({"error": "Unknown store"}), 400
+
+    new_user = User(name=data['name'], phone=data['phone'], store_id=store.id)
+    new_user.set_password(data['password'])
+
+    # Each store lists its own admins' numbers
+    if data['phone'] in store.admin_phone_numbers():
+        new_user.role = 'admin'
+
+    db.session.add(new_user)
+    db.session.commit()
+    return jsonify({"message": "User created successfully"}), 201
+
+@bp.route("/api/login", methods=["POST"])
+@rate_limited('login')
+def login():
+    data = request.get_json()
+    if not data or not all(k in data for k in ['phone', 'password']):
+        return jsonify({"error": "Missing phone or password"}), 400
+        
+    user = User.query.filter_by(phone=data['phone']).first()
+    if user and user.check_password(data['password']):
+        # Admins may log in to any store; everyone else works in their own
+        store = _requested_store(data if user.role == 'admin' else {'store_id': user.store_id})
+        if store is None:
+            return jsonify({"error": "Unknown store"}), 400
+        session['user_id'] = user.id
+        session['user_name'] = user.name
+        session['user_role'] = user.role
+        session['store_id'] = store.id
+        return jsonify({"message": "Login successful", "user": _user_data(user)}), 200
+    
+    return jsonify({"error": "Invalid phone or password"}), 401
+
+@bp.route("/api/logout", methods=["POST"])
+def logout():
+    session.clear()
+    return jsonify({"message": "Logout successful"}), 200
+
+@bp.route("/api/check_session")
+def check_session():
+    if 'user_id' in session:
+        return jsonify({"isLoggedIn": True, "user": _user_data()}), 200
+    return jsonify({"isLoggedIn": False}), 401
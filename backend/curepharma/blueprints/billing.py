@@ -0,0 +1,343 @@
+# backend/curepharma/blueprints/billing.py
+
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import Blueprint, abort, current_app, request, jsonify, render_template_string
+from sqlalchemy import func, or_
+
+from ..archive import load_bills
+from ..batch_billing import ingest_bills
+from ..extensions import db
+from ..helpers import login_required, safe_int
+from ..models import Medicine, Reminder, CustomerInvoice, CustomerInvoiceItem
+from ..rate_limit import rate_limited
+from ..salts import suggest_substitutes
+from ..stores import all_stores
+
+bp = Blueprint('billing', __name__)
+logger = logging.getLogger(__name__)
+
+
+# --- BILLING ROUTES ---
+@bp.route("/api/billing", methods=["POST"])
+@login_required
+def create_bill():
+    data = request.get_json()
+    customer_info = data.get('customer')
+    items = data.get('items')
+    payment_mode = data.get('paymentMode', 'Cash')
+    address_info = data.get('address')
+
+    if not all([customer_info, items]):
+        return jsonify({"error": "Missing customer information or items"}), 400
+
+    try:
+        grand_total = 0
+        invoice_items = []
+        
+        # --- THIS IS THE FIX: Track new medicines within this single transaction ---
+        newly_added_medicines = set()
+
+        for item in items:
+            if item.get('isManual', False) and item.get('saveToInventory', False):
+                item_name = item['name']
+                # Check if we already processed this name OR if it's already in the DB
+                if item_name not in newly_added_medicines and not Medicine.query.filter_by(name=item_name).first():
+                    new_inventory_item = Medicine(
+                        name=item_name,
+                        mrp=float(item.get('mrp', 0.0)),
+                        ptr=float(item.get('ptr', 0.0)),
+                        gst=0.0,
+                        quantity=0
+                    )
+                    db.session.add(new_inventory_item)
+                    # Add the name to our tracker to prevent duplicates in the same bill
+                    newly_added_medicines.add(item_name)
+            
+            item_ptr = float(item.get('ptr', 0.0))
+            item_gst = 0.0
+
+            if not item.get('isManual', False):
+                medicine = Medicine.query.get(item['id'])
+                if not medicine or medicine.quantity < int(item['quantity']):
+                    db.session.rollback()
+                    substitutes = suggest_substitutes(medicine_id=medicine.id if medicine else None, name=item['name'],
+                                                      min_quantity=int(item['quantity']))
+                    return jsonify({"error": f"Not enough stock for {item['name']}", "substitutes": substitutes}), 400
+                medicine.quantity -= int(item['quantity'])
+                item_ptr = medicine.ptr
+                item_gst = medicine.gst
+
+            amount = int(item['quantity']) * float(item['mrp'])
+            discount = float(item.get('discount', 0))
+            discounted_amount = amount * (1 - discount / 100)
+            grand_total += discounted_amount
+            
+            invoice_items.append(CustomerInvoiceItem(
+                medicine_name=item['name'],
+                quantity=int(item['quantity']),
+                mrp=float(item['mrp']),
+                discount_percent=discount,
+                total_price=discounted_amount,
+                ptr=item_ptr,
+                gst=item_gst
+            ))
+        
+        invoice_data = {
+            'customer_name': customer_info.get('name', 'N/A'),
+            'customer_phone': customer_info.get('phone', 'N/A'),
+            'grand_total': grand_total,
+            'items': invoice_items,
+            'payment_mode': payment_mode,
+        }
+
+        # Safely add address info only if it exists
+        if address_info:
+            invoice_data['address'] = address_info.get('address')
+            invoice_data['pincode'] = address_info.get('pincode')
+            invoice_data['latitude'] = address_info.get('lat')
+            invoice_data['longitude'] = address_info.get('lng')
+
+        # Create the invoice from the dictionary
+        new_invoice = CustomerInvoice(**invoice_data)
+        db.session.add(new_invoice)
+
+        today = datetime.now().date()
+        for item in items:
+            reminder_days_str = item.get('reminder_days')
+            if reminder_days_str:
+                try:
+                    reminder_days = int(reminder_days_str)
+                    if reminder_days > 0:
+                        reminder_date = today + timedelta(days=reminder_days)
+                        new_reminder = Reminder(customer_name=customer_info.get('name', 'N/A'), customer_phone=customer_info.get('phone', 'N/A'), medicine_name=item['name'], reminder_date=reminder_date, invoice_id=new_invoice.id)
+                        db.session.add(new_reminder)
+                except (ValueError, TypeError):
+                    pass
+        
+        db.session.commit()
+        return jsonify({"message": "Bill created successfully", "invoiceId": new_invoice.id}), 201
+
+    except Exception:
+        db.session.rollback()
+        logger.exception("Error creating bill")
+        return jsonify({"error": "An internal server error occurred."}), 500
+
+
+@bp.route("/api/billing/batch", methods=["POST"])
+@login_required
+def create_bills_batch():
+    """
+    Bills many invoices at once. Body: {"bills": [...], "chunk_size": n?}, where
+    each bill is a /api/billing body plus a unique "idempotency_key" (and
+    optionally "bill_date"). Returns one result per bill, in order.
+    """
+    data = request.get_json(silent=True) or {}
+    bills = data.get('bills')
+    if not isinstance(bills, list) or not bills:
+        return jsonify({"error": "Provide a non-empty list of bills"}), 400
+
+    max_bills = current_app.config.get('BILLING_BATCH_MAX_BILLS', 2000)
+    if len(bills) > max_bills:
+        return jsonify({"error": f"At most {max_bills} bills per batch"}), 400
+    chunk_size = safe_int(data.get('chunk_size')) or current_app.config.get('BILLING_BATCH_CHUNK_SIZE', 200)
+    chunk_size = min(max(chunk_size, 1), max_bills)
+
+    results = ingest_bills(bills, chunk_size)
+    summary = Counter(result['status'] for result in results)
+    return jsonify({"results": results, "summary": dict(summary)}), 200
+
+
+@bp.route("/api/customer-bills", methods=["GET"])
+@login_required
+def get_customer_bills():
+    query = request.args.get('q', '').strip()
+
+    def matching(Invoice):
+        if not query:
+            return []
+        search_term = f"%{query}%"
+        return [or_(Invoice.customer_name.ilike(search_term), Invoice.customer_phone.ilike(search_term))]
+
+    invoices = load_bills(matching)
+    
+    bill_list = [{
+        'id': inv.id,
+        'customer_name': inv.customer_name,
+        'customer_phone': inv.customer_phone,
+        'bill_date': inv.bill_date.strftime('%Y-%m-%d %H:%M'),
+        'grand_total': inv.grand_total,
+        'items': [{
+            'medicine_name': item.medicine_name, 
+            'quantity': item.quantity, 
+            'mrp': item.mrp, 
+            'discount_percent': item.discount_percent, 
+            'total_price': item.total_price
+        } for item in inv.items]
+    } for inv in invoices]
+        
+    return jsonify(bill_list)
+
+@bp.route("/api/customer-bills/<int:bill_id>", methods=["DELETE"])
+@login_required
+def delete_customer_bill(bill_id):
+    invoice = CustomerInvoice.query.get_or_404(bill_id)
+    db.session.delete(invoice)
+    db.session.commit()
+    return jsonify({"message": "Bill deleted successfully"}), 200
+
+@bp.route("/api/customers/search")
+@login_required
+def search_customers():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify([])
+
+    search_term = f"%{query}%"
+    customers = (db.session.query(
+        CustomerInvoice.customer_phone, 
+        CustomerInvoice.customer_name
+    ).filter(or_(
+        CustomerInvoice.customer_phone.like(search_term), 
+        CustomerInvoice.customer_name.like(search_term)
+    )).group_by(CustomerInvoice.customer_phone)
+      .order_by(func.max(CustomerInvoice.bill_date).desc())
+      .limit(10).all())
+      
+    return jsonify([{'phone': c.customer_phone, 'name': c.customer_name} for c in customers])
+
+@bp.route("/api/customers/history/<phone>")
+@login_required
+def get_customer_history(phone):
+    invoices = load_bills(lambda Invoice: [Invoice.customer_phone == phone])
+    history = [{
+        'id': inv.id, 
+        'date': inv.bill_date.strftime('%Y-%m-%d %H:%M'), 
+        'total': inv.grand_total, 
+        'items': [{
+            'name': item.medicine_name, 
+            'qty': item.quantity, 
+            'price': item.total_price
+        } for item in inv.items]
+    } for inv in invoices]
+    return jsonify(history)
+
+@bp.route("/api/customer-history-by-phone/<string:phone>")
+@login_required
+def get_customer_history_by_phone(phone):
+    """Gets purchase count and bill details for a specific phone number."""
+    logger.debug("Searching for customer history with phone number: %r", phone)
+
+    # --- MORE ROBUST QUERY ---
+    # We now trim any potential whitespace from the database column for a better match.
+    invoices = load_bills(lambda Invoice: [func.trim(Invoice.customer_phone) == phone])
+    
+    if not invoices:
+        # If no invoices are found, return a clear "not found" response.
+        return jsonify({"customer_name": "", "bill_count": 0, "bills": []})
+
+    # Get the name from the most recent invoice
+    customer_name = invoices[0].customer_name
+    bill_count = len(invoices)
+    
+    bill_list = [{
+        'id': inv.id,
+        'bill_date': inv.bill_date.strftime('%Y-%m-%d %H:%M'),
+        'grand_total': inv.grand_total,
+        'items': [{'medicine_name': item.medicine_name, 'quantity': item.quantity} for item in inv.items]
+    } for inv in invoices]
+        
+    return jsonify({
+        "customer_name": customer_name,
+        "bill_count": bill_count,
+        "bills": bill_list
+    })
+
+
+@bp.route("/api/customers/all-phones")
+@login_required
+def get_all_customer_phones():
+    """Fetches a list of all unique and valid Indian customer phone numbers."""
+    
+    all_phones_query = db.session.query(CustomerInvoice.customer_phone).distinct().all()
+    all_phones = [phone[0] for phone in all_phones_query if phone[0]]
+    
+    # --- NEW: More Intelligent Filtering Logic ---
+    valid_indian_phones = set() # Use a set to automatically handle duplicates
+    for phone in all_phones:
+        # 1. Clean the number by removing all non-digit characters
+        cleaned_phone = "".join(filter(str.isdigit, phone))
+        
+        # 2. If the number is 10 digits, add '91' to the front
+        if len(cleaned_phone) == 10:
+            valid_indian_phones.add("91" + cleaned_phone)
+        # 3. If the number is already 12 digits and starts with '91', add it
+        elif len(cleaned_phone) == 12 and cleaned_phone.startswith('91'):
+            valid_indian_phones.add(cleaned_phone)
+            
+    return jsonify(list(valid_indian_phones))
+
+
+# --- PUBLIC BILL VIEW ---
+@bp.route("/bill/view/<int:invoice_id>")
+@rate_limited('public')
+@all_stores
+def view_public_bill(invoice_id):
+    """Renders a simple, mobile-friendly HTML page for a specific invoice."""
+    invoices = load_bills(lambda Invoice: [Invoice.id == invoice_id])
+    if not invoices:
+        abort(404)
+    invoice = invoices[0]
+    
+    html_template = """
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Invoice #{{ invoice.id }}</title>
+        <style>
+            body { font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif; margin: 0; padding: 20px; background-color: #f7fafc; color: #1a202c; }
+            .container { max-width: 600px; margin: auto; background: white; padding: 25px; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.1); }
+            h1 { color: #2d3748; text-align: center; margin-bottom: 0; }
+            .header-sub { text-align: center; color: #718096; margin-top: 5px; margin-bottom: 30px;}
+            .details { border-bottom: 1px solid #e2e8f0; padding-bottom: 15px; margin-bottom: 15px; }
+            .details p { margin: 6px 0; color: #4a5568; display: flex; justify-content: space-between; }
+            .details p strong { color: #2d3748; }
+            .items { width: 100%; border-collapse: collapse; }
+            .items th, .items td { padding: 10px; text-align: left; border-bottom: 1px solid #e2e8f0; }
+            .items th { color: #718096; font-weight: 600; }
+            .items .align-right { text-align: right; }
+            .total { text-align: right; font-weight: bold; font-size: 1.25em; margin-top: 20px; color: #2d3748;}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <h1>CurePharma X</h1>
+            <p class="header-sub">Medical Invoice</p>
+            <div class="details">
+                <p><strong>Invoice #:</strong> <span>{{ invoice.id }}</span></p>
+                <p><strong>Customer:</strong> <span>{{ invoice.customer_name }}</span></p>
+                <p><strong>Date:</strong> <span>{{ invoice.bill_date.strftime('%d %b %Y, %I:%M %p') }}</span></p>
+            </div>
+            <table class="items">
+                <thead><tr><th>Item</th><th class="align-right">Qty</th><th class="align-right">MRP</th><th class="align-right">Total</th></tr></thead>
+                <tbody>
+                    {% for item in invoice.items %}
+                    <tr>
+                        <td>{{ item.medicine_name }}</td>
+                        <td class="align-right">{{ item.quantity }}</td>
+                        <td class="align-right">₹{{ "%.2f"|format(item.mrp) }}</td>
+                        <td class="align-right">₹{{ "%.2f"|format(item.total_price) }}</td>
+                    </tr>
+                    {% endfor %}
+                </tbody>
+            </table>
+            <p class="total">Grand Total: ₹{{ "%.2f"|format(invoice.grand_total) }}</p>
+        </div>
+    </body>
+    </html>
+    """
+    return render_template_string(html_template, invoice=invoice)
@@ -0,0 +1,41 @@
+# backend/curepharma/blueprints/catalog.py
+# Whole-catalogue snapshot and deltas for clients that cache medicines locally; see curepharma.catalog.
+
+import gzip
+
+from flask import Blueprint, current_app, request, jsonify
+from werkzeug.http import is_resource_modified
+
+from ..catalog import get_snapshot, build_delta
+
+bp = Blueprint('catalog', __name__)
+
+
+# --- CATALOGUE ROUTES ---
+@bp.route("/api/catalog/snapshot")
+def get_catalog_snapshot():
+    snapshot = get_snapshot()
+    response_class = current_app.response_class
+    if not is_resource_modified(request.environ, etag=snapshot.etag):
+        response = response_class(status=304)
+    elif request.accept_encodings['gzip']:
+        response = response_class(snapshot.body, mimetype='application/json')
+        response.content_encoding = 'gzip'
+    else:
+        response = response_class(gzip.decompress(snapshot.body), mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Catalog-Version'] = str(snapshot.version)
+    response.set_etag(snapshot.etag)
+    return response
+
+@bp.route("/api/catalog/delta")
+def get_catalog_delta():
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        return jsonify({"error": "'since' must be a catalogue version"}), 400
+    delta = build_delta(since)
+    if delta is None:
+        # Tombstones before `since` are gone (or the database was restored): start over from a snapshot
+        return jsonify({"error": "Catalogue version too old, fetch a new snapshot.", "reset": True}), 410
+    return jsonify(delta)
@@ -0,0 +1,248 @@
+# backend/curepharma/blueprints/exports.py
+
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func, select
+
+from ..archive import sales_entities
+from ..extensions import db
+from ..exports import EXPORT_FORMATS, Sheet, export_response
+from ..helpers import login_required
+from ..postgres_profile import use_read_replica, statement_timeout
+from ..rate_limit import rate_limited
+from ..models import Medicine, PurchaseInvoice
+
+bp = Blueprint('exports', __name__)
+
+# Rows fetched per round trip; on Postgres this is a server-side cursor
+EXPORT_YIELD_PER = 1000
+
+
+# --- QUERIES ---
+def _gst_rate(Item):
+    return func.coalesce(Item.gst, 0)
+
+
+def _taxable_value(Item):
+    # Selling prices are MRP-based, i.e. GST-inclusive
+    return Item.total_price / (1 + _gst_rate(Item) / 100)
+
+
+def _sales_filter(Invoice, start_date, end_date):
+    return (
+        Invoice.bill_date >= start_date,
+        Invoice.bill_date < end_date + timedelta(days=1),
+        Invoice.status == 'Approved',
+    )
+
+
+def _stream(statement):
+    """Executes `statement` and yields its rows without loading the whole result."""
+    return db.session.execute(statement.execution_options(yield_per=EXPORT_YIELD_PER))
+
+
+def _money(value):
+    return round(float(value or 0), 2)
+
+
+def sales_line_rows(start_date, end_date):
+    Invoice, Item = sales_entities(start_date)
+    statement = select(
+        Invoice.id,
+        Invoice.bill_date,
+        Invoice.customer_name,
+        Invoice.customer_phone,
+        Invoice.payment_mode,
+        Invoice.order_type,
+        Item.medicine_name,
+        Item.quantity,
+        Item.mrp,
+        Item.discount_percent,
+        Item.ptr,
+        _gst_rate(Item),
+        Item.total_price,
+        _taxable_value(Item),
+    ).join(Item, Invoice.id == Item.invoice_id)\
+     .where(*_sales_filter(Invoice, start_date, end_date))\
+     .order_by(Invoice.bill_date, Invoice.id, Item.id)
+
+    for (invoice_id, bill_date, name, phone, payment_mode, order_type, medicine,
+         quantity, mrp, discount, ptr, gst, total, taxable) in _stream(statement):
+        yield (invoice_id, bill_date, name, phone, payment_mode, order_type, medicine,
+               quantity, _money(mrp), float(discount or 0), _money(ptr), float(gst),
+               _money(total), _money(taxable), _money(total - taxable))
+
+
+SALES_LINE_HEADER = [
+    'Invoice No', 'Bill Date', 'Customer', 'Phone', 'Payment Mode', 'Order Type', 'Medicine',
+    'Quantity', 'MRP', 'Discount %', 'PTR', 'GST %', 'Line Total', 'Taxable Value', 'GST Amount',
+]
+
+
+def gst_summary_rows(start_date, end_date):
+    """One row per GST slab, aggregated in the database."""
+    Invoice, Item = sales_entities(start_date)
+    rate = _gst_rate(Item)
+    statement = select(
+        rate,
+        func.count(Item.id),
+        func.count(func.distinct(Invoice.id)),
+        func.sum(Item.quantity),
+        func.sum(Item.total_price),
+        func.sum(_taxable_value(Item)),
+    ).join(Item, Invoice.id == Item.invoice_id)\
+     .where(*_sales_filter(Invoice, start_date, end_date))\
+     .group_by(rate)\
+     .order_by(rate)
+
+    for gst, lines, invoices, quantity, gross, taxable in db.session.execute(statement):
+        tax = (gross or 0) - (taxable or 0)
+        yield (float(gst), lines, invoices, int(quantity or 0), _money(gross), _money(taxable),
+               _money(tax), _money(tax / 2), _money(tax / 2))
+
+
+GST_SUMMARY_HEADER = [
+    'GST %', 'Lines', 'Invoices', 'Quantity', 'Gross Sales', 'Taxable Value', 'GST Amount', 'CGST', 'SGST',
+]
+
+
+def inventory_valuation_rows():
+    statement = select(
+        Medicine.name, Medicine.category, Medicine.batch_no, Medicine.expiry_date,
+        Medicine.quantity, Medicine.freeqty, Medicine.mrp, Medicine.ptr, Medicine.gst,
+        Medicine.amount, Medicine.netvalue,
+        func.coalesce(Medicine.quantity, 0) * func.coalesce(Medicine.mrp, 0),
+    ).order_by(Medicine.name)
+
+    totals = [0, 0.0, 0.0, 0.0]
+    for (name, category, batch_no, expiry, quantity, freeqty, mrp, ptr, gst,
+         amount, netvalue, mrp_value) in _stream(statement):
+        totals[0] += quantity or 0
+        totals[1] += amount or 0
+        totals[2] += netvalue or 0
+        totals[3] += mrp_value or 0
+        yield (name, category, batch_no, expiry, quantity, freeqty, _money(mrp), _money(ptr),
+               float(gst or 0), _money(amount), _money(netvalue), _money(mrp_value))
+    yield ('TOTAL', None, None, None, totals[0], None, None, None, None,
+           _money(totals[1]), _money(totals[2]), _money(totals[3]))
+
+
+INVENTORY_HEADER = [
+    'Medicine', 'Category', 'Batch', 'Expiry', 'Quantity', 'Free Qty', 'MRP', 'PTR', 'GST %',
+    'Amount', 'Net Value', 'Value at MRP',
+]
+
+
+def purchase_invoice_rows(start_date=None, end_date=None):
+    statement = select(
+        PurchaseInvoice.invoice_date, PurchaseInvoice.agency_name,
+        PurchaseInvoice.invoice_number, PurchaseInvoice.amount,
+    ).order_by(PurchaseInvoice.invoice_date, PurchaseInvoice.id)
+    if start_date:
+        statement = statement.where(PurchaseInvoice.invoice_date >= start_date)
+    if end_date:
+        statement = statement.where(PurchaseInvoice.invoice_date <= end_date)
+
+    total = 0.0
+    for invoice_date, agency, number, amount in _stream(statement):
+        total += amount or 0
+        yield (invoice_date, agency, number, _money(amount))
+    yield (None, 'TOTAL', None, _money(total))
+
+
+PURCHASE_HEADER = ['Invoice Date', 'Agency', 'Invoice No', 'Amount']
+
+
+# --- REQUEST PARSING ---
+def _parse_range(required=True):
+    """(start_date, end_date) from the query string; (None, None) when optional and absent."""
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+    if not required and not start_date_str and not end_date_str:
+        return None, None
+    start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+    end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    return start_date, end_date
+
+
+RANGE_ERROR = "Invalid or missing date range. Please provide start_date and end_date in YYYY-MM-DD format."
+
+
+def _export_format():
+    export_format = request.args.get('format', 'csv').lower()
+    return export_format if export_format in EXPORT_FORMATS else None
+
+
+# --- EXPORT ROUTES ---
+@bp.route("/api/exports/sales-lines")
+@rate_limited('reports')
+@use_read_replica
+@statement_timeout('REPORT_STATEMENT_TIMEOUT_MS')
+@login_required
+def export_sales_lines():
+    """Every approved invoice line in the range. XLSX exports also get a GST summary sheet."""
+    try:
+        start_date, end_date = _parse_range()
+    except (ValueError, TypeError):
+        return jsonify({"error": RANGE_ERROR}), 400
+    export_format = _export_format()
+    if export_format is None:
+        return jsonify({"error": "format must be csv or xlsx"}), 400
+
+    sheets = [Sheet('Sales Lines', SALES_LINE_HEADER, sales_line_rows(start_date, end_date))]
+    if export_format == 'xlsx':
+        sheets.append(Sheet('GST Summary', GST_SUMMARY_HEADER, gst_summary_rows(start_date, end_date)))
+    return export_response(sheets, f"sales_lines_{start_date}_to_{end_date}", export_format)
+
+
+@bp.route("/api/exports/gst-summary")
+@rate_limited('reports')
+@use_read_replica
+@statement_timeout('REPORT_STATEMENT_TIMEOUT_MS')
+@login_required
+def export_gst_summary():
+    try:
+        start_date, end_date = _parse_range()
+    except (ValueError, TypeError):
+        return jsonify({"error": RANGE_ERROR}), 400
+    export_format = _export_format()
+    if export_format is None:
+        return jsonify({"error": "format must be csv or xlsx"}), 400
+
+    sheets = [Sheet('GST Summary', GST_SUMMARY_HEADER, gst_summary_rows(start_date, end_date))]
+    return export_response(sheets, f"gst_summary_{start_date}_to_{end_date}", export_format)
+
+
+@bp.route("/api/exports/inventory-valuation")
+@rate_limited('reports')
+@use_read_replica
+@statement_timeout('REPORT_STATEMENT_TIMEOUT_MS')
+@login_required
+def export_inventory_valuation():
+    export_format = _export_format()
+    if export_format is None:
+        return jsonify({"error": "format must be csv or xlsx"}), 400
+
+    sheets = [Sheet('Inventory Valuation', INVENTORY_HEADER, inventory_valuation_rows())]
+    return export_response(sheets, f"inventory_valuation_{datetime.now():%Y-%m-%d}", export_format)
+
+
+@bp.route("/api/exports/purchase-invoices")
+@rate_limited('reports')
+@use_read_replica
+@statement_timeout('REPORT_STATEMENT_TIMEOUT_MS')
+@login_required
+def export_purchase_invoices():
+    """All purchase invoices, or only those in start_date..end_date when given."""
+    try:
+        start_date, end_date = _parse_range(required=False)
+    except (ValueError, TypeError):
+        return jsonify({"error": RANGE_ERROR}), 400
+    export_format = _export_format()
+    if export_format is None:
+        return jsonify({"error": "format must be csv or xlsx"}), 400
+
+    sheets = [Sheet('Purchase Invoices', PURCHASE_HEADER, purchase_invoice_rows(start_date, end_date))]
+    suffix = f"{start_date}_to_{end_date}" if start_date else "all"
+    return export_response(sheets, f"purchase_invoices_{suffix}", export_format)
@@ -0,0 +1,17 @@
+# backend/curepharma/blueprints/frontend.py
+# Serves the React build. Registered last so the catch-all never shadows /api routes.
+
+from flask import Blueprint, abort
+
+from ..static_assets import get_index, asset_response
+
+bp = Blueprint('frontend', __name__)
+
+
+@bp.route('/', defaults={'path': ''})
+@bp.route('/<path:path>')
+def serve(path):
+    asset = get_index().lookup(path)
+    if asset is None:
+        abort(404)
+    return asset_response(asset)
@@ -0,0 +1,453 @@
+# backend/curepharma/blueprints/inventory.py
+
+import csv
+import logging
+import os
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, request, jsonify, session
+from werkzeug.utils import secure_filename
+from sqlalchemy import or_
+
+from ..barcodes import get_code_index, normalize_code, normalize_hsn
+from ..change_stamps import conditional
+from ..extensions import db
+from ..helpers import login_required, calculate_net_value, parse_date, safe_int, safe_float, minute_text, rows_as_dicts
+from ..models import Medicine, ImportRecord, Shortage, PurchaseInvoice
+from ..rate_limit import rate_limited
+from ..revisions import apply_revisions, rows_from_csv
+from ..salts import get_salt_index, normalize_medicine_name, suggest_substitutes
+from ..shortages import resolve_requests
+
+bp = Blueprint('inventory', __name__)
+logger = logging.getLogger(__name__)
+
+# Suggestions attached to each pending shortage
+SHORTAGE_SUBSTITUTES = 3
+
+
+# --- MEDICINE ROUTES ---
+@bp.route("/api/medicines", methods=["GET"])
+@rate_limited('search', staff_group='billing_search')
+@conditional('medicine')
+def get_medicines():
+    query_term = request.args.get('q', '').strip()
+    category_param = request.args.get('category', '')
+    filter_param = request.args.get('filter', '')
+    
+    base_query = Medicine.query
+    
+    # --- MODIFIED: Unified Search Logic ---
+    if query_term:
+        search_term_like = f'%{query_term}%'
+        matches = [Medicine.name.ilike(search_term_like), Medicine.formula.ilike(search_term_like)]
+        # A scanned code typed into the search box finds its medicine too
+        barcode = normalize_code(query_term)
+        if barcode:
+            matches.append(Medicine.barcode == barcode)
+        base_query = base_query.filter(or_(*matches))
+
+    if category_param:
+        base_query = base_query.filter(Medicine.category == category_param)
+
+    today = datetime.now().date()
+    if filter_param == 'low_stock':
+        base_query = base_query.filter(Medicine.quantity < 3)
+    elif filter_param == 'expired':
+        base_query = base_query.filter(Medicine.expiry_date < today)
+    elif filter_param == 'expiring_soon':
+        sixty_days_later = today + timedelta(days=60)
+        base_query = base_query.filter(Medicine.expiry_date.between(today, sixty_days_later))
+
+   # Order the results
+    base_query = base_query.order_by(Medicine.name)
+
+    # If it's a search, limit to 10 for autocomplete-style results
+    if query_term:
+        base_query = base_query.limit(10)
+    # ELSE IF it's the default home page (no search, category, or filter), limit to 50
+    elif not category_param and not filter_param:
+        base_query = base_query.limit(50)
+    
+    # Plain rows instead of ORM instances; orjson writes expiry_date as YYYY-MM-DD
+    medicines = base_query.with_entities(*[getattr(Medicine, name) for name in Medicine.API_COLUMNS])
+    return jsonify(rows_as_dicts(medicines))
+
+
+
+
+def _code_error(data, barcode, hsn_code, med_id=None):
+    """A 400/409 response if the submitted barcode or HSN code can't be saved, else None."""
+    if data.get('barcode') and barcode is None:
+        return jsonify({"error": "Invalid barcode"}), 400
+    if data.get('hsn_code') and hsn_code is None:
+        return jsonify({"error": "HSN code must be 2 to 8 digits"}), 400
+    if barcode:
+        owner = Medicine.query.filter(Medicine.barcode == barcode, Medicine.id != med_id).first()
+        if owner:
+            return jsonify({"error": f"Barcode already assigned to {owner.name}"}), 409
+    return None
+
+
+@bp.route("/api/medicines", methods=["POST"])
+@login_required
+def add_medicine():
+    data = request.get_json()
+    if not data or not data.get('name'):
+        return jsonify({"error": "Medicine name is required"}), 400
+
+    # --- THIS IS THE CORRECTED LOGIC ---
+    # We now handle empty strings by defaulting to '0' before converting to a number.
+    ptr_str = data.get('ptr') or '0'
+    gst_str = data.get('gst') or '0'
+    quantity_str = data.get('quantity') or '0'
+    freeqty_str = data.get('freeqty') or '0'
+    mrp_str = data.get('mrp') or '0'
+
+    ptr = float(ptr_str)
+    gst = float(gst_str)
+    quantity = int(quantity_str)
+
+    barcode = normalize_code(data.get('barcode'))
+    hsn_code = normalize_hsn(data.get('hsn_code'))
+    error = _code_error(data, barcode, hsn_code)
+    if error:
+        return error
+
+    new_med = Medicine(
+        name=data['name'],
+        quantity=quantity,
+        freeqty=int(freeqty_str),
+        batch_no=data.get('batch_no'),
+        expiry_date=parse_date(data.get('expiry_date')),
+        mrp=float(mrp_str),
+        ptr=ptr,
+        gst=gst,
+        category=data.get('category', 'General'),
+        formula=data.get('formula'),
+        barcode=barcode,
+        hsn_code=hsn_code
+    )
+    # 'Amount' is the purchase value of this quantity before GST, 'netvalue' after it
+    new_med.update_value()
+    db.session.add(new_med)
+    db.session.commit()
+    return jsonify(new_med.to_dict()), 201
+
+
+@bp.route("/api/medicines/<int:med_id>", methods=["PUT"])
+@login_required
+def update_medicine(med_id):
+    med = Medicine.query.get_or_404(med_id)
+    data = request.get_json()
+
+    barcode = normalize_code(data.get('barcode')) if 'barcode' in data else med.barcode
+    hsn_code = normalize_hsn(data.get('hsn_code')) if 'hsn_code' in data else med.hsn_code
+    error = _code_error(data, barcode, hsn_code, med_id=med.id)
+    if error:
+        return error
+
+    try:
+        # --- Explicitly update each field to ensure correct data types ---
+        med.name = data.get('name', med.name)
+        med.quantity = int(data.get('quantity', med.quantity))
+        med.freeqty = int(data.get('freeqty', med.freeqty))
+        med.batch_no = data.get('batch_no', med.batch_no)
+        med.mrp = float(data.get('mrp', med.mrp))
+        med.ptr = float(data.get('ptr', med.ptr))
+        med.gst = float(data.get('gst', med.gst))
+        med.category = data.get('category', med.category)
+        med.formula = data.get('formula', med.formula)
+        med.barcode = barcode
+        med.hsn_code = hsn_code
+        
+        # This line now correctly handles both empty and valid date strings
+        med.expiry_date = parse_date(data.get('expiry_date'))
+
+        # Recalculate the purchase value (amount, netvalue) automatically
+        # using the newly updated values
+        med.update_value()
+
+        db.session.commit()
+        return jsonify(med.to_dict())
+        
+    except Exception:
+        db.session.rollback()
+        logger.exception("Error updating medicine")
+        return jsonify({"error": "An internal server error occurred during update."}), 500
+    
+
+@bp.route("/api/medicines/revisions", methods=["POST"])
+@login_required
+def revise_medicines():
+    """
+    Bulk MRP/PTR/GST/stock revision: a JSON list (or {"items": [...]}) of
+    {id|name, mrp, ptr, gst, quantity}, or a CSV upload in `file`. Applied in
+    one transaction; ?dry_run=1 returns the diff without saving.
+    """
+    if 'file' in request.files:
+        try:
+            rows = rows_from_csv(request.files['file'].read().decode('utf-8-sig'))
+        except (UnicodeDecodeError, csv.Error):
+            return jsonify({"error": "Please upload a UTF-8 CSV file"}), 400
+    else:
+        data = request.get_json(silent=True)
+        rows = data.get('items') if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            return jsonify({"error": "Send a list of revisions, or a CSV file"}), 400
+
+    max_rows = current_app.config.get('MEDICINE_REVISION_MAX_ROWS', 5000)
+    if len(rows) > max_rows:
+        return jsonify({"error": f"At most {max_rows} rows per revision"}), 413
+
+    dry_run = request.args.get('dry_run') in ('1', 'true')
+    try:
+        return jsonify(apply_revisions(rows, dry_run=dry_run))
+    except Exception:
+        db.session.rollback()
+        logger.exception("Error applying medicine revisions")
+        return jsonify({"error": "An internal server error occurred during the revision."}), 500
+
+
+@bp.route("/api/medicines/<int:med_id>", methods=["GET"])
+@rate_limited('public')
+@conditional('medicine')
+def get_medicine_details(med_id):
+    """Fetches specific details for a single medicine by its ID."""
+    medicine = Medicine.query.get_or_404(med_id)
+    
+    # Manually build the response with only the required fields
+    medicine_details = {
+        "id": medicine.id,
+        "name": medicine.name,
+        "formula": medicine.formula or None,
+        "mrp": medicine.mrp,
+        "quantity": medicine.quantity,
+        "category": medicine.category
+    }
+    
+    return jsonify(medicine_details)
+
+
+@bp.route("/api/medicines/by-code/<code>", methods=["GET"])
+@rate_limited('search', staff_group='billing_search')
+def get_medicine_by_code(code):
+    """Exact barcode match for the scanner at the counter, served from memory (see curepharma.barcodes)."""
+    medicine = get_code_index().lookup(code)
+    if medicine is None:
+        return jsonify({"error": "No medicine with this barcode"}), 404
+    return jsonify(medicine)
+
+
+@bp.route("/api/substitutes", methods=["GET"])
+@rate_limited('billing_search')
+@login_required
+def get_substitutes():
+    """In-stock alternatives for ?medicine_id=, ?name= or ?formula=, ranked by salt match then margin."""
+    medicine_id = request.args.get('medicine_id', type=int)
+    name = request.args.get('name', '').strip()
+    formula = request.args.get('formula', '').strip()
+    if medicine_id is None and not name and not formula:
+        return jsonify({"error": "Pass medicine_id, name or formula"}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    index = get_salt_index()
+    _, composition = index.composition_for(medicine_id, name, formula)
+    substitutes = index.substitutes(medicine_id=medicine_id, name=name, formula=formula,
+                                    min_quantity=request.args.get('min_quantity', 1, type=int), limit=limit)
+    components = sorted((salt, strength or '') for salt, strength in composition)
+    return jsonify({
+        "components": [{"salt": salt, "strength": strength or None} for salt, strength in components],
+        "substitutes": substitutes,
+    })
+
+
+@bp.route("/api/medicines/<int:med_id>", methods=["DELETE"])
+@login_required
+def delete_medicine(med_id):
+    med = Medicine.query.get_or_404(med_id)
+    db.session.delete(med)
+    db.session.commit()
+    return jsonify({"message": f"Medicine '{med.name}' deleted"}), 200
+
+
+# --- CSV IMPORT ROUTE ---
+@bp.route("/api/medicines/import", methods=["POST"])
+@login_required
+def import_medicines_csv():
+    if 'file' not in request.files:
+        return jsonify({"error": "No file part in the request"}), 400
+    file = request.files['file']
+    if not file or not file.filename.endswith('.csv'):
+        return jsonify({"error": "Please select a valid CSV file"}), 400
+        
+    original_filename = secure_filename(file.filename)
+    saved_filename = f"{datetime.now().timestamp()}_{original_filename}"
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    os.makedirs(upload_folder, exist_ok=True)
+    filepath = os.path.join(upload_folder, saved_filename)
+    file.save(filepath)
+
+    imported_count = 0
+    updated_count = 0
+    skipped_barcodes = 0
+    try:
+        # Barcodes already in use, so a clashing row keeps its stock but not the barcode
+        taken_barcodes = {code for (code,) in db.session.query(Medicine.barcode).filter(Medicine.barcode.isnot(None))}
+        with open(filepath, mode='r', encoding='utf-8-sig') as csv_file:
+            csv_reader = csv.DictReader(csv_file)
+            for row in csv_reader:
+                medicine_name = row.get('name', '').strip()
+                if not medicine_name:
+                    continue
+
+                existing_medicine = Medicine.query.filter(Medicine.name.ilike(medicine_name)).first()
+                quantity = safe_int(row.get('quantity', '0') or 0)
+                amount = safe_float(row.get('amount', '0').replace('%', '').strip() or 0.0)
+                gst_percent = safe_float(row.get('gst', '0').replace('%', '').strip() or 0.0)
+                formula = row.get('formula', '').strip()
+                barcode = normalize_code(row.get('barcode') or row.get('gtin'))
+                hsn_code = normalize_hsn(row.get('hsn_code') or row.get('hsn'))
+                if existing_medicine and existing_medicine.barcode:
+                    barcode = None  # an assigned barcode is kept
+                elif barcode in taken_barcodes:
+                    barcode = None
+                    skipped_barcodes += 1
+                elif barcode:
+                    taken_barcodes.add(barcode)
+
+                
+                if existing_medicine:
+                    existing_medicine.quantity += quantity
+                    existing_medicine.barcode = barcode or existing_medicine.barcode
+                    existing_medicine.hsn_code = existing_medicine.hsn_code or hsn_code
+                    updated_count += 1
+                else:
+                    new_med = Medicine(
+                        name=medicine_name,
+                        quantity=quantity,
+                        freeqty=safe_int(row.get('freeqty', '0') or 0),
+                        batch_no=row.get('batch_no'),
+                        expiry_date=parse_date(row.get('expiry_date')),
+                        mrp=safe_float(row.get('mrp', '0.0') or 0.0),
+                        ptr=safe_float(row.get('ptr', '0.0') or 0.0),
+                        amount=amount,
+                        gst=gst_percent,
+                        netvalue=calculate_net_value(amount, gst_percent),
+                        formula=formula,
+                        barcode=barcode,
+                        hsn_code=hsn_code
+                    )
+                    db.session.add(new_med)
+                    imported_count += 1
+        
+        record = ImportRecord(
+            original_filename=original_filename, 
+            saved_filename=saved_filename, 
+            imported_count=(imported_count + updated_count), 
+            user_id=session['user_id']
+        )
+        db.session.add(record)
+        db.session.commit()
+        
+        message = f"Success! Added: {imported_count}, Updated: {updated_count}."
+        if skipped_barcodes:
+            message += f" Barcodes already in use (not saved): {skipped_barcodes}."
+        return jsonify({"message": message}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"An error occurred during import: {str(e)}"}), 500
+
+
+# --- NEW --- Shortage Endpoints ---
+@bp.route("/api/shortages", methods=["GET", "POST"])
+@conditional('shortage', 'medicine')
+def manage_shortages():
+    if 'user_id' not in session: return jsonify({"error": "Unauthorized"}), 401
+    
+    if request.method == "POST":
+        data = request.get_json()
+        normalized_name = normalize_medicine_name(data['medicine_name'])
+        # A customer asking again for the same medicine is still one request
+        if data.get('customer_phone'):
+            existing = Shortage.query.filter_by(normalized_name=normalized_name, customer_phone=data['customer_phone'],
+                                                status='Pending').first()
+            if existing:
+                return jsonify({**existing.to_dict(), 'substitutes': suggest_substitutes(name=existing.normalized_name)}), 200
+        new_shortage = Shortage(
+    medicine_name=data['medicine_name'],
+    customer_name=data.get('customer_name'), # <-- ADD THIS
+    customer_phone=data.get('customer_phone'),  # <-- ADD THIS
+    normalized_name=normalized_name
+)
+        
+        db.session.add(new_shortage)
+        db.session.commit()
+        return jsonify({**new_shortage.to_dict(), 'substitutes': suggest_substitutes(name=normalized_name)}), 201
+
+    # GET request returns the pending requests, one entry per medicine: the
+    # latest request's fields, the demand and the customers waiting
+    shortages = Shortage.query.with_entities(
+        Shortage.id, Shortage.medicine_name, Shortage.normalized_name, Shortage.customer_name, Shortage.customer_phone,
+        minute_text(Shortage.requested_date).label('requested_date'), Shortage.status
+    ).filter_by(status='Pending').order_by(Shortage.requested_date.desc(), Shortage.id.desc())
+    groups = {}
+    for row in rows_as_dicts(shortages):
+        group = groups.get(row['normalized_name'])
+        if group is None:
+            group = groups[row['normalized_name']] = {**row, 'demand': 0, 'customers': []}
+        group['demand'] += 1
+        group['first_requested_date'] = row['requested_date']
+        group['customers'].append({key: row[key] for key in ('id', 'customer_name', 'customer_phone', 'requested_date')})
+    # Most wanted first; ties keep the latest request first
+    shortages = sorted(groups.values(), key=lambda group: -group['demand'])
+    # What could be offered instead, from the in-memory salt index (no query per row)
+    for shortage in shortages:
+        shortage['substitutes'] = suggest_substitutes(name=shortage['normalized_name'], limit=SHORTAGE_SUBSTITUTES)
+    return jsonify(shortages)
+
+@bp.route("/api/shortages/<int:id>/resolve", methods=["PUT"])
+def resolve_shortage(id):
+    """Resolves the request and every other pending request for the same medicine."""
+    if 'user_id' not in session: return jsonify({"error": "Unauthorized"}), 401
+    
+    shortage = Shortage.query.get_or_404(id)
+    if shortage.status != 'Pending':
+        return jsonify({"message": "Shortage already resolved.", "resolved": 0})
+    resolved = resolve_requests(db.session, [shortage.normalized_name], shortage.store_id)
+    db.session.commit()
+    
+    return jsonify({"message": "Shortage marked as resolved.", "resolved": len(resolved)})
+
+
+# --- PURCHASE INVOICE ROUTES ---
+@bp.route("/api/purchase-invoices", methods=["GET", "POST"])
+@login_required
+@conditional('purchase_invoice')
+def manage_purchase_invoices():
+    if request.method == "POST":
+        data = request.get_json()
+        new_inv = PurchaseInvoice(
+            agency_name=data.get('agency_name'),
+            invoice_number=data.get('invoice_number'),
+            invoice_date=parse_date(data.get('invoice_date')),
+            amount=float(data.get('amount', 0.0))
+        )
+        db.session.add(new_inv)
+        db.session.commit()
+        return jsonify(new_inv.to_dict()), 201
+    
+    # GET request
+    invoices = PurchaseInvoice.query.with_entities(
+        PurchaseInvoice.id, PurchaseInvoice.agency_name, PurchaseInvoice.invoice_number,
+        PurchaseInvoice.invoice_date, PurchaseInvoice.amount
+    ).order_by(PurchaseInvoice.invoice_date.desc())
+    return jsonify(rows_as_dicts(invoices))
+
+@bp.route("/api/purchase-invoices/<int:inv_id>", methods=["DELETE"])
+@login_required
+def delete_purchase_invoice(inv_id):
+    inv = PurchaseInvoice.query.get_or_404(inv_id)
+    db.session.delete(inv)
+    db.session.commit()
+    return jsonify({"message": "Purchase invoice deleted"}), 200
@@ -0,0 +1,88 @@
+# backend/curepharma/blueprints/reminders.py
+
+import logging
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify, session
+
+from ..change_stamps import conditional
+from ..extensions import db
+from ..helpers import login_required, minute_text, rows_as_dicts
+from ..models import Reminder, AdvancePayment
+from ..scheduler import scheduled_job
+
+bp = Blueprint('reminders', __name__)
+logger = logging.getLogger(__name__)
+
+
+# This will run the check every day at 10:00 AM
+@scheduled_job('cron', hour=10)
+def send_whatsapp_reminders():
+    today = datetime.now().date()
+    due_reminders = Reminder.query.filter_by(reminder_date=today, status='Pending').all()
+
+    for reminder in due_reminders:
+        # In a real app, you would use a WhatsApp API service here.
+        # For now, we'll just log it and update the status.
+        logger.info("Sending reminder to %s for %s", reminder.customer_phone, reminder.medicine_name)
+        # This is a placeholder for the actual WhatsApp sending logic.
+        # You would construct a message and send it via an API like Twilio.
+
+        reminder.status = 'Sent'
+        db.session.commit()
+
+
+# --- REMINDER ROUTES ---
+@bp.route("/api/reminders", methods=["GET"])
+@login_required
+@conditional('reminder')
+def get_reminders():
+    reminders = Reminder.query.with_entities(
+        Reminder.id, Reminder.customer_name, Reminder.customer_phone,
+        Reminder.medicine_name, Reminder.reminder_date, Reminder.status
+    ).filter(Reminder.status != 'Dismissed').order_by(Reminder.reminder_date.asc())
+    return jsonify(rows_as_dicts(reminders))
+
+@bp.route("/api/reminders/<int:id>/dismiss", methods=["PUT"])
+@login_required
+def dismiss_reminder(id):
+    reminder = Reminder.query.get_or_404(id)
+    reminder.status = 'Dismissed'
+    db.session.commit()
+    return jsonify({"message": "Reminder dismissed."})
+
+
+# --- NEW --- Advance Payment Endpoints ---
+@bp.route("/api/advances", methods=["GET", "POST"])
+@conditional('advance_payment')
+def manage_advances():
+    if 'user_id' not in session: return jsonify({"error": "Unauthorized"}), 401
+    
+    if request.method == "POST":
+        data = request.get_json()
+        new_advance = AdvancePayment(
+            customer_name=data['customer_name'],
+            customer_phone=data['customer_phone'],
+            amount=float(data['amount']),
+            notes=data.get('notes')
+        )
+        db.session.add(new_advance)
+        db.session.commit()
+        return jsonify(new_advance.to_dict()), 201
+
+    # GET request returns all pending (not delivered) advances
+    advances = AdvancePayment.query.with_entities(
+        AdvancePayment.id, AdvancePayment.customer_name, AdvancePayment.customer_phone, AdvancePayment.amount,
+        AdvancePayment.notes, minute_text(AdvancePayment.created_date).label('created_date'), AdvancePayment.is_delivered
+    ).filter_by(is_delivered=False).order_by(AdvancePayment.created_date.desc())
+    return jsonify(rows_as_dicts(advances))
+
+@bp.route("/api/advances/<int:id>/deliver", methods=["PUT"])
+def deliver_advance(id):
+    if 'user_id' not in session: return jsonify({"error": "Unauthorized"}), 401
+    
+    advance = AdvancePayment.query.get_or_404(id)
+    advance.is_delivered = True
+    db.session.commit()
+    
+    return jsonify({"message": "Advance marked as delivered."})
@@ -0,0 +1,516 @@
+# backend/curepharma/blueprints/reports.py
+
+import logging
+from datetime import datetime, timedelta
+from functools import partial
+
+from flask import Blueprint, current_app, request, jsonify
+from sqlalchemy import Date, String, and_, case, cast, func, literal, null, or_, select, union_all
+
+from ..archive import sales_entities
+from ..extensions import db
+from ..helpers import current_store_id, login_required, safe_int
+from ..postgres_profile import use_read_replica, statement_timeout
+from ..rate_limit import rate_limited
+from ..report_cache import get_report_cache
+from ..report_snapshots import HISTORY, STANDARD_PERIODS, load_report, refresh_snapshot, standard_period
+from ..models import Medicine, Reminder, Shortage, CustomerInvoice, CustomerInvoiceItem
+from ..scheduler import scheduled_job
+from ..stores import active_store_ids, store_context
+
+bp = Blueprint('reports', __name__)
+logger = logging.getLogger(__name__)
+
+
+# --- ADVANCED REPORT QUERY ---
+REPORT_GRANULARITIES = ('day', 'week', 'month')
+
+
+def _period_start(column, granularity):
+    """First day of the day/week/month containing `column`, as a YYYY-MM-DD value on either backend."""
+    if db.engine.dialect.name == 'postgresql':
+        return cast(func.date_trunc(granularity, column), Date)
+    if granularity == 'week':
+        # Weeks start on Monday, like date_trunc('week')
+        return func.date(column, 'weekday 0', '-6 days', type_=String)
+    if granularity == 'month':
+        return func.strftime('%Y-%m-01', column, type_=String)
+    return func.date(column, type_=String)
+
+
+def _sales_report_query(start_date, end_date, granularity, category=None, top_n=5):
+    """
+    Builds the advanced report as one statement: a CTE aggregates the period's
+    invoice lines by (period, category, medicine) in a single scan, and the
+    totals, trend, category breakdown and top-N rankings are all rolled up from
+    that CTE. Rows come back tagged with their `kind`.
+    """
+    Invoice, Item = sales_entities(start_date)
+    sale_value = Item.total_price
+    line_profit = case(
+        (Medicine.id.is_(None), 0),
+        else_=(Item.mrp * (1 - func.coalesce(Item.discount_percent, 0) / 100) - func.coalesce(Medicine.ptr, 0)) * Item.quantity
+    )
+    category_col = func.coalesce(Medicine.category, 'Uncategorized')
+    period_col = _period_start(Invoice.bill_date, granularity)
+
+    lines = db.session.query(
+        period_col.label('period'),
+        category_col.label('category'),
+        Item.medicine_name.label('name'),
+        func.sum(sale_value).label('sales'),
+        func.sum(line_profit).label('profit'),
+        func.sum(Item.quantity).label('quantity'),
+    ).select_from(Item)\
+     .join(Invoice, Invoice.id == Item.invoice_id)\
+     .outerjoin(Medicine, Item.medicine_name == Medicine.name)\
+     .filter(Invoice.bill_date >= start_date, Invoice.bill_date < end_date + timedelta(days=1))
+    if category:
+        lines = lines.filter(category_col == category)
+    lines = lines.group_by(period_col, category_col, Item.medicine_name).cte('lines')
+
+    def rollup(kind, *keys):
+        # Typed NULLs so every branch of the UNION agrees on column types
+        columns = {key: cast(null(), lines.c[key].type) for key in ('period', 'category', 'name')}
+        columns.update({key: lines.c[key] for key in keys})
+        return select(
+            literal(kind).label('kind'),
+            *[value.label(key) for key, value in columns.items()],
+            func.sum(lines.c.sales).label('sales'),
+            func.sum(lines.c.profit).label('profit'),
+            func.sum(lines.c.quantity).label('quantity'),
+        ).group_by(*[lines.c[key] for key in keys])
+
+    products = rollup('product', 'name').add_columns(
+        func.row_number().over(order_by=(func.sum(lines.c.quantity).desc(), lines.c.name)).label('quantity_rank'),
+        func.row_number().over(order_by=(func.sum(lines.c.profit).desc(), lines.c.name)).label('profit_rank'),
+    ).subquery('products')
+    top_products = select(*[products.c[key] for key in ('kind', 'period', 'category', 'name', 'sales', 'profit', 'quantity')])\
+        .where(or_(products.c.quantity_rank <= top_n, products.c.profit_rank <= top_n))
+
+    return union_all(
+        rollup('total'),
+        rollup('trend', 'period'),
+        rollup('category', 'category'),
+        top_products,
+    )
+
+
+# --- MARGIN QUERIES ---
+MARGIN_RANKINGS = ('margin', 'margin_percent', 'revenue', 'quantity')
+
+
+def _margin_lines(start_date, end_date, category=None, customer=None):
+    """
+    Per-SKU quantity, revenue and cost over a date range, grouped in SQL. Each
+    line is costed at the PTR (plus GST) saved on it when it was billed, else
+    at the medicine's current PTR; lines with neither count as revenue only
+    (costed_revenue excludes them, so margins aren't inflated).
+    """
+    Invoice, Item = sales_entities(start_date)
+    unit_cost = case(
+        (Item.ptr > 0, Item.ptr * (1 + func.coalesce(Item.gst, 0) / 100)),
+        (Medicine.ptr > 0, Medicine.ptr * (1 + func.coalesce(Medicine.gst, 0) / 100)),
+        else_=null(),
+    )
+    costed = unit_cost.isnot(None)
+    category_col = func.coalesce(Medicine.category, 'Uncategorized')
+
+    lines = select(
+        Item.medicine_name.label('name'),
+        func.max(category_col).label('category'),
+        func.coalesce(func.max(Medicine.mrp), func.max(Item.mrp)).label('mrp'),
+        func.sum(Item.quantity).label('quantity'),
+        func.sum(Item.total_price).label('revenue'),
+        func.sum(case((costed, Item.quantity), else_=0)).label('costed_quantity'),
+        func.sum(case((costed, Item.total_price), else_=0)).label('costed_revenue'),
+        func.coalesce(func.sum(unit_cost * Item.quantity), 0).label('cost'),
+    ).select_from(Item)\
+     .join(Invoice, Invoice.id == Item.invoice_id)\
+     .outerjoin(Medicine, Item.medicine_name == Medicine.name)\
+     .where(Invoice.bill_date >= start_date, Invoice.bill_date < end_date + timedelta(days=1))
+    if category:
+        lines = lines.where(category_col == category)
+    if customer:
+        lines = lines.where(Invoice.customer_phone == customer)
+    return lines.group_by(Item.medicine_name)
+
+
+def _margin_report_query(start_date, end_date, category=None, customer=None, rank_by='margin', top_n=10):
+    """
+    The top and bottom top_n SKUs by rank_by, picked with window functions,
+    each row also carrying the range's totals; SKUs without a cost rank last
+    either way.
+    """
+    skus = _margin_lines(start_date, end_date, category, customer).cte('skus')
+    margin = skus.c.costed_revenue - skus.c.cost
+    margin_percent = margin * 100 / func.nullif(skus.c.costed_revenue, 0)
+    metric = {
+        'margin': margin,
+        'margin_percent': margin_percent,
+        'revenue': skus.c.revenue,
+        'quantity': skus.c.quantity,
+    }[rank_by]
+    uncosted_last = case((skus.c.costed_quantity > 0, 0), else_=1)
+
+    ranked = select(
+        skus.c.name, skus.c.category, skus.c.quantity, skus.c.revenue, skus.c.cost,
+        margin.label('margin'), margin_percent.label('margin_percent'),
+        func.row_number().over(order_by=(uncosted_last, metric.desc(), skus.c.name)).label('top_rank'),
+        func.row_number().over(order_by=(uncosted_last, metric.asc(), skus.c.name)).label('bottom_rank'),
+        func.count().over().label('total_skus'),
+        func.sum(skus.c.quantity).over().label('total_quantity'),
+        func.sum(skus.c.revenue).over().label('total_revenue'),
+        func.sum(skus.c.costed_revenue).over().label('total_costed_revenue'),
+        func.sum(skus.c.cost).over().label('total_cost'),
+    ).subquery('ranked')
+    return select(ranked).where(or_(ranked.c.top_rank <= top_n, ranked.c.bottom_rank <= top_n))
+
+
+def _margin_row(row):
+    return {
+        "name": row.name,
+        "category": row.category,
+        "quantity": int(row.quantity or 0),
+        "revenue": round(float(row.revenue or 0), 2),
+        "cost": round(float(row.cost or 0), 2),
+        "margin": round(float(row.margin or 0), 2),
+        "margin_percent": round(float(row.margin_percent), 1) if row.margin_percent is not None else None,
+    }
+
+
+def _margin_report(start_date, end_date, category, customer, rank_by, top_n):
+    rows = db.session.execute(_margin_report_query(start_date, end_date, category, customer, rank_by, top_n)).all()
+    first = rows[0] if rows else None
+    costed_revenue = float(first.total_costed_revenue or 0) if first else 0.0
+    cost = float(first.total_cost or 0) if first else 0.0
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "category": category,
+        "customer": customer,
+        "rank_by": rank_by,
+        "totals": {
+            "skus": first.total_skus if first else 0,
+            "quantity": int(first.total_quantity or 0) if first else 0,
+            "revenue": round(float(first.total_revenue or 0), 2) if first else 0.0,
+            "cost": round(cost, 2),
+            "margin": round(costed_revenue - cost, 2),
+            "margin_percent": round((costed_revenue - cost) * 100 / costed_revenue, 1) if costed_revenue else None,
+            "uncosted_revenue": round(float(first.total_revenue or 0) - costed_revenue, 2) if first else 0.0,
+        },
+        "top": [_margin_row(r) for r in sorted(rows, key=lambda r: r.top_rank) if r.top_rank <= top_n],
+        "bottom": [_margin_row(r) for r in sorted(rows, key=lambda r: r.bottom_rank) if r.bottom_rank <= top_n],
+    }
+
+
+def _advanced_sales_report(start_date, end_date, granularity='day', category=None, top_n=5):
+    rows = db.session.execute(_sales_report_query(start_date, end_date, granularity, category, top_n)).all()
+
+    totals = next((r for r in rows if r.kind == 'total'), None)
+    trends = sorted((r for r in rows if r.kind == 'trend'), key=lambda r: str(r.period))
+    categories = sorted((r for r in rows if r.kind == 'category'), key=lambda r: -(r.sales or 0))
+    products = [r for r in rows if r.kind == 'product']
+
+    return {
+        "granularity": granularity,
+        "category": category,
+        "period_totals": {
+            "total_sales": float(totals.sales or 0) if totals else 0.0,
+            "total_profit": float(totals.profit or 0) if totals else 0.0
+        },
+        # Key kept for the frontend; holds weekly/monthly buckets when asked for
+        "daily_trends": [
+            {"date": str(t.period)[:10], "sales": float(t.sales or 0), "profit": float(t.profit or 0)} for t in trends
+        ],
+        "category_breakdown": [
+            {"category": c.category, "sales": float(c.sales or 0), "profit": float(c.profit or 0), "quantity": int(c.quantity or 0)} for c in categories
+        ],
+        "top_selling_products": [
+            {"name": p.name, "value": int(p.quantity or 0)}
+            for p in sorted(products, key=lambda p: (-(p.quantity or 0), p.name))[:top_n]
+        ],
+        "top_profitable_products": [
+            {"name": p.name, "value": float(p.profit or 0)}
+            for p in sorted(products, key=lambda p: (-(p.profit or 0), p.name))[:top_n]
+        ]
+    }
+
+
+def _sales_report_params(granularity, top_n):
+    return f"granularity={granularity}&top={top_n}"
+
+
+def _daily_sales_summary(start_date=None, end_date=None):
+    """Bill count, sales and profit per day, newest first, for bills dated start_date..end_date (None: open-ended)."""
+    Invoice, Item = sales_entities(start_date)
+    # One row per bill first, so a bill's total and count aren't repeated for each of its lines
+    bills = db.session.query(
+        Invoice.bill_date.label('bill_date'),
+        Invoice.grand_total.label('grand_total'),
+        func.sum(
+            ((Item.mrp * (1 - Item.discount_percent / 100)) - (Medicine.ptr * (1 + Medicine.gst / 100))) * Item.quantity
+        ).label('profit')
+    ).select_from(Invoice)\
+     .outerjoin(Item, Invoice.id == Item.invoice_id)\
+     .outerjoin(Medicine, and_(Item.medicine_name == Medicine.name, Medicine.ptr > 0))
+    if start_date is not None:
+        bills = bills.filter(Invoice.bill_date >= start_date)
+    if end_date is not None:
+        bills = bills.filter(Invoice.bill_date < end_date + timedelta(days=1))
+    bills = bills.group_by(Invoice.id, Invoice.bill_date, Invoice.grand_total).subquery('bills')
+
+    sale_date = func.date(bills.c.bill_date)
+    sales_by_day = db.session.query(
+        sale_date.label('sale_date'),
+        func.count().label('bill_count'),
+        func.sum(bills.c.grand_total).label('total_sales'),
+        func.sum(bills.c.profit).label('total_profit')
+    ).group_by(sale_date).order_by(sale_date.desc()).all()
+
+    return [{'date': sale.sale_date, 'bill_count': sale.bill_count, 'total_sales': float(sale.total_sales or 0), 'total_profit': float(sale.total_profit or 0)} for sale in sales_by_day]
+
+
+# --- STANDARD PERIODS ---
+# Precomputed with the frontend's defaults; other parameters are cached on first use
+STANDARD_GRANULARITY = 'day'
+STANDARD_TOP_N = 5
+
+
+def _standard_reports():
+    """(report, period, params, build) for every report the scheduler precomputes."""
+    reports = [
+        ('advanced_sales', period, _sales_report_params(STANDARD_GRANULARITY, STANDARD_TOP_N),
+         partial(_advanced_sales_report, granularity=STANDARD_GRANULARITY, top_n=STANDARD_TOP_N))
+        for period in STANDARD_PERIODS
+    ]
+    reports.append(('daily_sales_summary', HISTORY, '', _daily_sales_summary))
+    return reports
+
+
+@scheduled_job('interval', minutes=5, max_instances=1, coalesce=True)
+def precompute_standard_reports():
+    try:
+        for store_id in active_store_ids():
+            with store_context(store_id):
+                refreshed = [f"{report}/{period}" for report, period, params, build in _standard_reports()
+                             if refresh_snapshot(report, period, params, build)]
+            if refreshed:
+                logger.info("Precomputed reports for store %s: %s", store_id, ', '.join(refreshed))
+    except Exception:
+        db.session.rollback()
+        logger.exception("Error precomputing standard reports")
+
+
+# --- REPORT ROUTES ---
+@bp.route("/api/advanced-sales-report")
+@rate_limited('reports')
+@use_read_replica
+@statement_timeout('REPORT_STATEMENT_TIMEOUT_MS')
+@login_required
+def get_advanced_sales_report():
+    """
+    Generates a comprehensive sales and profit report for a given date range.
+    Optional: granularity=day|week|month for the trend, category=<name> to
+    restrict the report to one category, top=<n> for the product rankings.
+    Standard periods (today, this week, ...) are served precomputed.
+    """
+    try:
+        start_date_str = request.args.get('start_date')
+        end_date_str = request.args.get('end_date')
+
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid or missing date range. Please provide start_date and end_date in YYYY-MM-DD format."}), 400
+
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in REPORT_GRANULARITIES:
+        return jsonify({"error": f"granularity must be one of: {', '.join(REPORT_GRANULARITIES)}"}), 400
+    top_n = min(max(safe_int(request.args.get('top'), 5), 1), 50)
+    category = request.args.get('category') or None
+
+    today = datetime.now().date()
+    period = standard_period(start_date, end_date, today) if category is None else None
+    if period is None:
+        return jsonify(_advanced_sales_report(start_date, end_date, granularity, category, top_n))
+    payload = load_report('advanced_sales', period, _sales_report_params(granularity, top_n),
+                          partial(_advanced_sales_report, granularity=granularity, top_n=top_n), today)
+    return current_app.response_class(payload, mimetype='application/json')
+
+
+@bp.route("/api/daily-sales-summary")
+@rate_limited('reports')
+@use_read_replica
+@statement_timeout('REPORT_STATEMENT_TIMEOUT_MS')
+@login_required
+def get_daily_sales_summary():
+    """Groups all invoices by date and calculates daily totals and profits."""
+    today = datetime.now().date()
+    # Days before today come precomputed; only today's bills are summed here
+    history = load_report('daily_sales_summary', HISTORY, '', _daily_sales_summary, today)
+    current = _daily_sales_summary(today, None)
+    if not current:
+        return current_app.response_class(history, mimetype='application/json')
+    return jsonify(current + current_app.json.loads(history))
+
+
+@bp.route("/api/daily-sales/<string:date_str>")
+@rate_limited('reports')
+@use_read_replica
+@statement_timeout('REPORT_STATEMENT_TIMEOUT_MS')
+@login_required
+def get_daily_sales_for_date(date_str):
+    """Gets all individual invoices for a specific date."""
+    try:
+        target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+    # Column queries rather than entities, since the day may be in the archive
+    Invoice, Item = sales_entities(target_date)
+    invoices = db.session.query(
+        Invoice.id, Invoice.customer_name, Invoice.grand_total, Invoice.order_type
+    ).filter(
+        Invoice.bill_date >= target_date, Invoice.bill_date < target_date + timedelta(days=1)
+    ).order_by(Invoice.bill_date.desc()).all()
+
+    items = {}
+    if invoices:
+        for invoice_id, medicine_name, quantity in db.session.query(Item.invoice_id, Item.medicine_name, Item.quantity)\
+                .filter(Item.invoice_id.in_([inv.id for inv in invoices])).order_by(Item.id):
+            items.setdefault(invoice_id, []).append({'medicine_name': medicine_name, 'quantity': quantity})
+
+    bill_list = [{
+        'id': inv.id,
+        'customer_name': inv.customer_name,
+        'grand_total': inv.grand_total,
+        'order_type': inv.order_type,
+        'items': items.get(inv.id, [])
+    } for inv in invoices]
+
+    return jsonify(bill_list)
+
+
+@bp.route("/api/dashboard-stats")
+@rate_limited('reports')
+@use_read_replica
+@statement_timeout('REPORT_STATEMENT_TIMEOUT_MS')
+@login_required
+def dashboard_stats():
+    today = datetime.now().date()
+    thirty_days_ago = today - timedelta(days=30)
+    
+    # --- THIS IS THE FIX: Use a CASE statement for the profit query ---
+    profit_today_query = db.session.query(
+        func.sum(
+            ((CustomerInvoiceItem.mrp * (1 - CustomerInvoiceItem.discount_percent / 100)) - (Medicine.ptr * (1 + Medicine.gst / 100))) * CustomerInvoiceItem.quantity
+        )
+    ).join(CustomerInvoice, CustomerInvoice.id == CustomerInvoiceItem.invoice_id)\
+     .join(Medicine, CustomerInvoiceItem.medicine_name == Medicine.name)\
+     .filter(func.date(CustomerInvoice.bill_date) == today)\
+     .filter(Medicine.ptr > 0)\
+     .scalar() or 0
+
+    profit_today = float(profit_today_query)
+
+    # The rest of the function remains the same...
+    total_medicines_count = db.session.query(func.count(Medicine.id)).scalar()
+    low_stock_count = Medicine.query.filter(Medicine.quantity < 3).count()
+    expired_count = Medicine.query.filter(Medicine.expiry_date < today).count()
+    expiring_soon_count = Medicine.query.filter(Medicine.expiry_date.between(today, today + timedelta(days=60))).count()
+    pending_reminders = Reminder.query.filter_by(status='Pending').count()
+    # Medicines short, as listed on /api/shortages, rather than requests
+    shortage_count = db.session.query(func.count(func.distinct(Shortage.normalized_name)))\
+        .filter(Shortage.status == 'Pending').scalar()
+    sales_today = db.session.query(func.sum(CustomerInvoice.grand_total)).filter(func.date(CustomerInvoice.bill_date) == today).scalar() or 0
+    
+    sales_data = (db.session.query(
+        func.date(CustomerInvoice.bill_date), func.sum(CustomerInvoice.grand_total)
+    ).filter(
+        CustomerInvoice.bill_date >= thirty_days_ago
+    ).group_by(
+        func.date(CustomerInvoice.bill_date)
+    ).order_by(
+        func.date(CustomerInvoice.bill_date)
+    ).all())
+
+    sales_chart = [{'date': date_obj.strftime('%b %d'), 'sales': float(total)} for date_obj, total in sales_data]
+    
+    stats = {
+        "totalMedicines": total_medicines_count,
+        "lowStockCount": low_stock_count,
+        "expiredCount": expired_count,
+        "expiringSoonCount": expiring_soon_count,
+        "salesToday": sales_today,
+        "salesChart": sales_chart,
+        "pendingReminders": pending_reminders,
+        "shortageCount": shortage_count,
+        "profitToday": profit_today
+    }
+    return jsonify(stats)
+
+@bp.route("/api/profit-today-details")
+@rate_limited('reports')
+@use_read_replica
+@statement_timeout('REPORT_STATEMENT_TIMEOUT_MS')
+@login_required
+def get_profit_today_details():
+    """
+    Gets a detailed breakdown of items sold today, correctly accounting for discounts
+    and only calculating profit for items with a valid purchase price (PTR > 0).
+    """
+    today = datetime.now().date()
+    skus = _margin_lines(today, today).order_by('name')
+    details = []
+    for row in db.session.execute(skus):
+        profit = float(row.costed_revenue or 0) - float(row.cost or 0)
+        details.append({
+            'medicine_name': row.name,
+            'quantity_sold': int(row.quantity or 0),
+            'mrp': row.mrp,
+            # Average cost per unit over the day's costed sales
+            'cost_price': float(row.cost) / row.costed_quantity if row.costed_quantity else 0,
+            'total_profit': profit,
+            'profit_per_item': profit / row.quantity if row.quantity else 0,
+        })
+    return jsonify(details)
+
+
+@bp.route("/api/margin-analytics")
+@rate_limited('reports')
+@use_read_replica
+@statement_timeout('REPORT_STATEMENT_TIMEOUT_MS')
+@login_required
+def get_margin_analytics():
+    """
+    Quantity, revenue, cost and margin for start_date..end_date (default:
+    today), optionally for one category= or customer= (phone), with the
+    top=<n> best and worst SKUs by rank_by=margin|margin_percent|revenue|quantity.
+    Periods that ended before today are served from the report cache.
+    """
+    today = datetime.now().date()
+    try:
+        start_date = datetime.strptime(request.args.get('start_date', today.isoformat()), '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.args.get('end_date', today.isoformat()), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({"error": "Invalid date range. Please provide start_date and end_date in YYYY-MM-DD format."}), 400
+    if end_date < start_date:
+        return jsonify({"error": "end_date is before start_date."}), 400
+    rank_by = request.args.get('rank_by', 'margin')
+    if rank_by not in MARGIN_RANKINGS:
+        return jsonify({"error": f"rank_by must be one of: {', '.join(MARGIN_RANKINGS)}"}), 400
+    top_n = min(max(safe_int(request.args.get('top'), 10), 1), 100)
+    category = request.args.get('category') or None
+    customer = request.args.get('customer', '').strip() or None
+
+    if end_date >= today:
+        return jsonify(_margin_report(start_date, end_date, category, customer, rank_by, top_n))
+
+    cache = get_report_cache()
+    key = ('margins', current_store_id(), start_date, end_date, category, customer, rank_by, top_n)
+    report = cache.get(key)
+    if report is None:
+        report = _margin_report(start_date, end_date, category, customer, rank_by, top_n)
+        cache.put(key, report)
+    return jsonify(report)
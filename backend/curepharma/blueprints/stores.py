@@ -0,0 +1,96 @@
+# backend/curepharma/blueprints/stores.py
+# Outlets, switching between them and stock transfers; see curepharma.stores.
+
+import logging
+
+from flask import Blueprint, request, jsonify, session
+from sqlalchemy import or_
+
+from ..extensions import db
+from ..helpers import admin_required, current_store_id, login_required
+from ..models import Store, StockTransfer
+from ..stores import InvalidTransfer, transfer_stock
+
+bp = Blueprint('stores', __name__)
+logger = logging.getLogger(__name__)
+
+STORE_FIELDS = ('name', 'address', 'phone', 'latitude', 'longitude', 'admin_phones', 'is_active')
+# Transfers listed per request, newest first
+TRANSFER_PAGE_SIZE = 100
+
+
+# --- STORE ROUTES ---
+@bp.route("/api/stores", methods=["GET"])
+@login_required
+def get_stores():
+    stores = Store.query.filter_by(is_active=True).order_by(Store.id).all()
+    return jsonify({"current": current_store_id(), "stores": [store.to_dict() for store in stores]})
+
+@bp.route("/api/stores", methods=["POST"])
+@admin_required
+def add_store():
+    data = request.get_json(silent=True) or {}
+    code = str(data.get('code') or '').strip().upper()
+    if not code or not data.get('name'):
+        return jsonify({"error": "Store code and name are required"}), 400
+    if Store.query.filter_by(code=code).first():
+        return jsonify({"error": f"Store code {code} is already in use"}), 409
+    store = Store(code=code, **{field: data[field] for field in STORE_FIELDS if field in data})
+    db.session.add(store)
+    db.session.commit()
+    return jsonify(store.to_dict()), 201
+
+@bp.route("/api/stores/<int:store_id>", methods=["PUT"])
+@admin_required
+def update_store(store_id):
+    store = Store.query.get_or_404(store_id)
+    data = request.get_json(silent=True) or {}
+    for field in STORE_FIELDS:
+        if field in data:
+            setattr(store, field, data[field])
+    db.session.commit()
+    return jsonify(store.to_dict())
+
+@bp.route("/api/stores/select", methods=["POST"])
+@admin_required
+def select_store():
+    """Switches the admin's session to another store; every list and report follows it."""
+    data = request.get_json(silent=True) or {}
+    store = db.session.get(Store, data.get('store_id')) if isinstance(data.get('store_id'), int) else None
+    if store is None or not store.is_active:
+        return jsonify({"error": "Unknown store"}), 404
+    session['store_id'] = store.id
+    return jsonify({"message": f"Now working in {store.name}", "store": store.to_dict()})
+
+
+# --- TRANSFER ROUTES ---
+@bp.route("/api/stores/transfers", methods=["GET"])
+@login_required
+def get_transfers():
+    store_id = current_store_id()
+    transfers = StockTransfer.query.filter(or_(StockTransfer.from_store_id == store_id, StockTransfer.to_store_id == store_id))\
+        .order_by(StockTransfer.created_at.desc(), StockTransfer.id.desc()).limit(TRANSFER_PAGE_SIZE).all()
+    return jsonify([transfer.to_dict() for transfer in transfers])
+
+@bp.route("/api/stores/transfers", methods=["POST"])
+@admin_required
+def create_transfer():
+    """
+    Sends stock from the current store to another: {"to_store_id": 2, "items":
+    [{"medicine_id": 5, "quantity": 10}, ...], "notes": "..."}. All or nothing.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        to_store_id = int(data.get('to_store_id'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "to_store_id is required"}), 400
+    try:
+        transfer = transfer_stock(to_store_id, data.get('items'), notes=data.get('notes'), user_id=session.get('user_id'))
+    except InvalidTransfer as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception:
+        db.session.rollback()
+        logger.exception("Error transferring stock")
+        return jsonify({"error": "An internal server error occurred during the transfer."}), 500
+    return jsonify(transfer.to_dict()), 201
@@ -0,0 +1,47 @@
+# backend/curepharma/blueprints/sync.py
+# Server side of desktop <-> cloud replication; see curepharma.sync.
+
+import hmac
+from functools import wraps
+
+from flask import Blueprint, current_app, request, jsonify
+
+from ..stores import all_stores
+from ..sync import apply_changes, pull_batch
+
+bp = Blueprint('sync', __name__)
+
+
+def sync_token_required(f):
+    """Peers authenticate with the shared SYNC_TOKEN instead of a user session."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = current_app.config.get('SYNC_TOKEN')
+        supplied = request.headers.get('X-Sync-Token', '')
+        if not expected or not hmac.compare_digest(expected, supplied):
+            return jsonify({"error": "Invalid sync token."}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+# --- SYNC ROUTES ---
+@bp.route("/api/sync/push", methods=["POST"])
+@sync_token_required
+@all_stores
+def push_changes():
+    data = request.get_json()
+    if not data or not data.get('node'):
+        return jsonify({"error": "Missing node or changes"}), 400
+    outcomes = apply_changes(data.get('changes') or [], origin=data['node'])
+    return jsonify(outcomes)
+
+@bp.route("/api/sync/pull")
+@sync_token_required
+@all_stores
+def pull_changes():
+    since = request.args.get('since', 0, type=int)
+    limit = min(request.args.get('limit', 500, type=int), 5000)
+    node = request.args.get('node', '')
+    # Desktops predating stores pull the default store's changes
+    store_id = request.args.get('store', current_app.config.get('DEFAULT_STORE_ID', 1), type=int)
+    return jsonify(pull_batch(since, limit, node, store_id))
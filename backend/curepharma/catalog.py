@@ -0,0 +1,336 @@
+# backend/curepharma/catalog.py
+"""
+Catalogue versioning for client-side caching of the medicine list.
+
+Every committing transaction that inserts, updates or deletes a Medicine
+bumps its store's 'medicine@<store>' change stamp (see
+curepharma.change_stamps) and writes the new value to the changed rows'
+catalog_version. Deletions leave a CatalogTombstone with that version.
+Versions are therefore per store, as are snapshots and deltas, which cover
+the current store's medicines. A client can then:
+- fetch /api/catalog/snapshot once: every row plus the version it reflects,
+  gzipped and cached here per version;
+- poll /api/catalog/delta?since=<version>: only rows changed after that
+  version, and the ids deleted after it.
+
+Stamps are bumped last and held until commit, so versions become visible in
+commit order and a delta never skips a transaction that committed late.
+Readers fetch the version before the rows; a row committed in between is
+only ever sent twice, never missed.
+
+Bulk UPDATE/INSERT statements bypass the flush, so their callers report the
+affected ids with mark_changed().
+
+CatalogMirror is the base for in-process indexes over one store's catalogue
+(barcode and salt lookups), kept in a StoreMirrors per kind of index. They
+follow it the same way a client does: a commit in
+this process that touches medicines marks them stale, writes from other
+processes are noticed by re-reading the stamp at most every
+CATALOG_MIRROR_RECHECK_SECONDS, and a refresh applies only the delta.
+"""
+
+import gzip
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+
+from .change_stamps import on_stamped, mark_tables, read_stamp, stamp_name, store_stamp
+from .extensions import db
+from .helpers import default_store_id
+from .models import Medicine, ChangeStamp, CatalogTombstone
+from .postgres_profile import RoutingSession
+from .scheduler import scheduled_job
+
+logger = logging.getLogger(__name__)
+
+# Highest tombstone version pruned so far (per store); deltas from before it need a new snapshot
+TOMBSTONE_FLOOR_STAMP = 'catalog_tombstones'
+PENDING_KEY = 'catalog_pending'
+STALE_KEY = 'catalog_mirrors_stale'
+ID_CHUNK = 500
+
+
+def catalog_stamp(store_id=None):
+    """The change stamp holding the store's (default: the current store's) catalogue version."""
+    return stamp_name(Medicine.__tablename__, store_id)
+
+
+def current_version(store_id=None):
+    return read_stamp(catalog_stamp(store_id))
+
+
+def _store_rows(store_id, *criteria):
+    """The store's medicines (API_COLUMNS) matching criteria, whatever store is current."""
+    return select(*_columns()).where(Medicine.store_id == store_id, *criteria)\
+        .order_by(Medicine.id).execution_options(all_stores=True)
+
+
+# --- CHANGE TRACKING ---
+def mark_changed(session, ids=(), deleted=(), store_id=None):
+    """Queues the store's Medicine ids changed (or deleted) in this transaction for its next catalogue version."""
+    store_id = store_id if store_id is not None else default_store_id()
+    pending = session.info.setdefault(PENDING_KEY, {}).setdefault(store_id, {'changed': set(), 'deleted': set()})
+    pending['changed'].update(ids)
+    pending['deleted'].update(deleted)
+    mark_tables(session, [catalog_stamp(store_id)])
+
+
+def _collect_changes(session, _flush_context):
+    """after_flush: remembers which medicines this flush touched (ids are assigned by now), by store."""
+    changed, deleted = defaultdict(list), defaultdict(list)
+    for obj in session.new:
+        if isinstance(obj, Medicine):
+            changed[obj.store_id].append(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Medicine) and session.is_modified(obj, include_collections=False):
+            changed[obj.store_id].append(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Medicine):
+            deleted[obj.store_id].append(obj.id)
+    for store_id in changed.keys() | deleted.keys():
+        mark_changed(session, changed[store_id], deleted[store_id], store_id)
+
+
+def _chunks(ids):
+    ids = sorted(ids)
+    for start in range(0, len(ids), ID_CHUNK):
+        yield ids[start:start + ID_CHUNK]
+
+
+@on_stamped
+def _stamp_changes(session, connection, versions):
+    """Assigns each store's new catalogue version to the rows this transaction changed there."""
+    pending = session.info.pop(PENDING_KEY, None) or {}
+    table = Medicine.__table__
+    now = datetime.utcnow()
+    tombstones = []
+    for store_id, changes in sorted(pending.items()):
+        version = versions.get(catalog_stamp(store_id))
+        if version is None:
+            continue
+        session.info.setdefault(STALE_KEY, set()).add(store_id)
+        for ids in _chunks(changes['changed'] - changes['deleted']):
+            # updated_at is set to itself so the column's onupdate doesn't move it; this isn't a sync-visible edit
+            connection.execute(
+                table.update().where(table.c.id.in_(ids))
+                .values(catalog_version=version, updated_at=table.c.updated_at)
+            )
+        for ids in _chunks(changes['deleted']):
+            # A delete undone by a rolled-back savepoint leaves the row in place
+            still_there = set(connection.execute(select(table.c.id).where(table.c.id.in_(ids))).scalars())
+            tombstones += [{'medicine_id': medicine_id, 'store_id': store_id, 'version': version, 'deleted_at': now}
+                           for medicine_id in ids if medicine_id not in still_there]
+    if tombstones:
+        connection.execute(CatalogTombstone.__table__.insert(), tombstones)
+
+
+def _after_commit(session):
+    session.info.pop(PENDING_KEY, None)
+    # Only now is the write visible, so the mirrors' next lookup refreshes
+    stale = session.info.pop(STALE_KEY, None)
+    if stale and has_app_context():
+        for mirrors in current_app.extensions.get('catalog_mirrors', ()):
+            mirrors.mark_stale(stale)
+
+
+def _forget_changes(session, *_args):
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(STALE_KEY, None)
+
+
+def init_app(app):
+    app.extensions.setdefault('catalog_mirrors', [])
+    for name, listener in (('after_flush', _collect_changes), ('after_commit', _after_commit),
+                           ('after_rollback', _forget_changes)):
+        if not event.contains(RoutingSession, name, listener):
+            event.listen(RoutingSession, name, listener)
+
+
+# --- SNAPSHOT & DELTA ---
+def _columns():
+    return [getattr(Medicine, name) for name in Medicine.API_COLUMNS]
+
+
+class Snapshot:
+    """A store's whole catalogue at one version, as gzipped JSON."""
+
+    __slots__ = ('version', 'etag', 'body', 'size')
+
+    def __init__(self, version, etag, body, size):
+        self.version = version
+        self.etag = etag
+        self.body = body
+        self.size = size
+
+
+def build_snapshot(store_id):
+    version = current_version(store_id)
+    rows = db.session.execute(_store_rows(store_id))
+    raw = current_app.json.dumps({
+        'version': version,
+        'columns': Medicine.API_COLUMNS,
+        'rows': [tuple(row) for row in rows],
+    }).encode()
+    return Snapshot(version, hashlib.sha256(raw).hexdigest()[:32], gzip.compress(raw, compresslevel=6, mtime=0), len(raw))
+
+
+def get_snapshot(store_id=None):
+    """The store's cached snapshot if its catalogue hasn't changed since it was built, else a fresh one."""
+    store_id = store_id if store_id is not None else default_store_id()
+    snapshots = current_app.extensions.setdefault('catalog_snapshots', {})
+    cached = snapshots.get(store_id)
+    if cached is not None and cached.version == current_version(store_id):
+        return cached
+    snapshot = build_snapshot(store_id)
+    snapshots[store_id] = snapshot
+    return snapshot
+
+
+def build_delta(since, store_id=None):
+    """The store's rows changed and ids deleted after version `since`, or None if the client must re-snapshot."""
+    store_id = store_id if store_id is not None else default_store_id()
+    version = current_version(store_id)
+    if since > version or since < read_stamp(store_stamp(TOMBSTONE_FLOOR_STAMP, store_id)):
+        return None
+    rows = db.session.execute(_store_rows(store_id, Medicine.catalog_version > since)).all()
+    row_ids = {row.id for row in rows}
+    deleted = db.session.execute(
+        select(CatalogTombstone.medicine_id)
+        .where(CatalogTombstone.store_id == store_id, CatalogTombstone.version > since).distinct()
+    ).scalars()
+    return {
+        'version': version,
+        'since': since,
+        'columns': Medicine.API_COLUMNS,
+        'rows': [tuple(row) for row in rows],
+        # An id re-used by a newer row (SQLite can) is an update, not a deletion
+        'deleted': sorted(set(deleted) - row_ids),
+    }
+
+
+# --- IN-PROCESS MIRRORS ---
+class CatalogMirror:
+    """
+    An in-process index over one store's Medicine rows (dicts of API_COLUMNS),
+    kept current from catalogue deltas. Subclasses implement clear(), put(row)
+    and discard(medicine_id), and may narrow the rows loaded by rebuild().
+    """
+
+    def __init__(self, recheck_seconds, store_id):
+        self.recheck_seconds = recheck_seconds
+        self.store_id = store_id
+        self.version = None
+        self.stale = True
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        raise NotImplementedError
+
+    def put(self, row):
+        raise NotImplementedError
+
+    def discard(self, medicine_id):
+        raise NotImplementedError
+
+    def rebuild_criteria(self):
+        """WHERE criteria for the rows a full rebuild loads; rows failing them must be ignored by put()."""
+        return ()
+
+    def rebuild(self):
+        version = current_version(self.store_id)
+        rows = db.session.execute(_store_rows(self.store_id, *self.rebuild_criteria())).all()
+        # Filled on the side and swapped in, so lookups never see a half-built index.
+        # `fresh` skips __init__, so its __dict__ holds only what clear() creates.
+        fresh = object.__new__(type(self))
+        fresh.clear()
+        for row in rows:
+            fresh.put(row._asdict())
+        self.__dict__.update(fresh.__dict__)
+        self.version = version
+
+    def refresh(self):
+        delta = build_delta(self.version, self.store_id) if self.version is not None else None
+        if delta is None:
+            self.rebuild()
+            return
+        for medicine_id in delta['deleted']:
+            self.discard(medicine_id)
+        for row in delta['rows']:
+            self.put(dict(zip(delta['columns'], row)))
+        self.version = delta['version']
+
+    def ensure_current(self):
+        if self.stale or time.monotonic() - self.checked_at >= self.recheck_seconds:
+            with self._lock:
+                if self.stale or time.monotonic() - self.checked_at >= self.recheck_seconds:
+                    # Cleared first: a commit landing during the refresh marks it stale again
+                    self.stale = False
+                    if self.version is None or current_version(self.store_id) != self.version:
+                        self.refresh()
+                    self.checked_at = time.monotonic()
+        return self
+
+
+class StoreMirrors:
+    """One mirror_class index per store, built on the store's first lookup."""
+
+    def __init__(self, mirror_class, recheck_seconds):
+        self.mirror_class = mirror_class
+        self.recheck_seconds = recheck_seconds
+        self._mirrors = {}
+        self._lock = threading.Lock()
+
+    def for_store(self, store_id=None):
+        store_id = store_id if store_id is not None else default_store_id()
+        mirror = self._mirrors.get(store_id)
+        if mirror is None:
+            with self._lock:
+                mirror = self._mirrors.get(store_id)
+                if mirror is None:
+                    mirror = self._mirrors[store_id] = self.mirror_class(self.recheck_seconds, store_id)
+        return mirror
+
+    def mark_stale(self, store_ids):
+        for store_id in store_ids:
+            mirror = self._mirrors.get(store_id)
+            if mirror is not None:
+                mirror.stale = True
+
+
+def register_mirror(app, name, mirror_class):
+    mirrors = StoreMirrors(mirror_class, app.config.get('CATALOG_MIRROR_RECHECK_SECONDS', 2))
+    app.extensions[name] = mirrors
+    app.extensions.setdefault('catalog_mirrors', []).append(mirrors)
+    return mirrors
+
+
+@scheduled_job('cron', hour=3, minute=15)
+def prune_catalog_tombstones():
+    """Drops tombstones older than CATALOG_TOMBSTONE_DAYS and raises each store's delta floor to match."""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config.get('CATALOG_TOMBSTONE_DAYS', 30))
+    try:
+        newest_by_store = db.session.query(CatalogTombstone.store_id, func.max(CatalogTombstone.version))\
+            .filter(CatalogTombstone.deleted_at < cutoff).group_by(CatalogTombstone.store_id).all()
+        if not newest_by_store:
+            return
+        for store_id, newest in newest_by_store:
+            CatalogTombstone.query.filter(CatalogTombstone.store_id == store_id, CatalogTombstone.version <= newest)\
+                .delete(synchronize_session=False)
+            name = store_stamp(TOMBSTONE_FLOOR_STAMP, store_id)
+            floor = db.session.get(ChangeStamp, name)
+            if floor is None:
+                db.session.add(ChangeStamp(name=name, version=newest))
+            else:
+                floor.version = max(floor.version, newest)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("Error pruning catalogue tombstones")
@@ -0,0 +1,184 @@
+# backend/curepharma/change_stamps.py
+"""
+Per-table change stamps, and conditional GETs built on them.
+
+Every committing transaction bumps the ChangeStamp named after each table
+it wrote, once per table, in before_commit after the final flush. A view
+decorated with @conditional('reminder', ...) reads those stamps (one
+primary-key query) and answers If-None-Match / If-Modified-Since with a
+304 before running its own query.
+
+The stamps are taken last, in name order, and held until commit. Versions
+therefore become visible in commit order and two writers can't deadlock on
+them. Writes that don't go through the ORM flush (bulk INSERT/UPDATE
+statements) report their tables with mark_tables(); writes from outside
+the app (scripts, manual SQL) are not seen until the next ORM write.
+
+Store-scoped tables (models.StoreScoped) have one stamp per store, named
+'<table>@<store id>': a bill in one outlet neither invalidates another
+outlet's cached lists nor waits on its stamp row. @conditional reads the
+current store's stamps.
+
+Hooks registered with @on_stamped run right after the bump, inside the
+same transaction, with the new versions (see curepharma.catalog).
+"""
+
+import hashlib
+import hmac
+from datetime import date, datetime, time, timedelta, timezone
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from sqlalchemy import event
+from werkzeug.http import is_resource_modified
+
+from .extensions import db
+from .helpers import default_store_id
+from .models import ChangeStamp, CatalogTombstone, ReportSnapshot, StoreScoped, SyncChange, SyncCursor
+from .postgres_profile import RoutingSession
+
+PENDING_KEY = 'stamp_tables'
+# Bookkeeping tables no view depends on
+UNSTAMPED_MODELS = (ChangeStamp, CatalogTombstone, ReportSnapshot, SyncChange, SyncCursor)
+CACHE_CONTROL = 'private, no-cache'
+STORE_TABLES = frozenset(
+    mapper.class_.__tablename__ for mapper in db.Model.registry.mappers if issubclass(mapper.class_, StoreScoped)
+)
+
+_stamp_hooks = []
+
+
+# --- STAMPS ---
+def store_stamp(name, store_id):
+    """The name of one store's copy of a stamp."""
+    return f"{name}@{store_id}"
+
+
+def stamp_name(table, store_id=None):
+    """The stamp a write to table bumps: the row's (else the current) store's for store-scoped tables."""
+    if table in STORE_TABLES:
+        return store_stamp(table, store_id if store_id is not None else default_store_id())
+    return table
+
+
+def bump_stamp(connection, name):
+    """Increments the named ChangeStamp (creating it at 1) and returns the new version."""
+    table = ChangeStamp.__table__
+    now = datetime.utcnow()
+    version = connection.execute(
+        table.update().where(table.c.name == name)
+        .values(version=table.c.version + 1, changed_at=now)
+        .returning(table.c.version)
+    ).scalar()
+    if version is None:
+        version = 1
+        connection.execute(table.insert().values(name=name, version=version, changed_at=now))
+    return version
+
+
+def read_stamps(names):
+    """{name: (version, changed_at)}; a stamp never bumped reads as (0, None)."""
+    rows = db.session.query(ChangeStamp.name, ChangeStamp.version, ChangeStamp.changed_at)\
+        .filter(ChangeStamp.name.in_(names))
+    stamps = {name: (version, changed_at) for name, version, changed_at in rows}
+    return {name: stamps.get(name, (0, None)) for name in names}
+
+
+def read_stamp(name):
+    return read_stamps([name])[name][0]
+
+
+def mark_tables(session, names):
+    """Queues stamps (stamp_name of each table) written in this transaction without a flush (bulk statements)."""
+    session.info.setdefault(PENDING_KEY, set()).update(names)
+
+
+def on_stamped(hook):
+    """Registers hook(session, connection, versions) to run after each commit's stamps are bumped."""
+    _stamp_hooks.append(hook)
+    return hook
+
+
+def _collect_tables(session, _flush_context):
+    """after_flush: remembers which tables this flush wrote."""
+    tables = {stamp_name(obj.__tablename__, getattr(obj, 'store_id', None))
+              for obj in session.new | session.deleted if not isinstance(obj, UNSTAMPED_MODELS)}
+    tables.update(stamp_name(obj.__tablename__, getattr(obj, 'store_id', None)) for obj in session.dirty
+                  if not isinstance(obj, UNSTAMPED_MODELS) and session.is_modified(obj, include_collections=False))
+    if tables:
+        mark_tables(session, tables)
+
+
+def _stamp_tables(session):
+    """before_commit: bumps the stamp of every table written in this transaction."""
+    session.flush()
+    tables = session.info.pop(PENDING_KEY, None)
+    if not tables:
+        return
+    connection = session.connection()
+    versions = {name: bump_stamp(connection, name) for name in sorted(tables)}
+    for hook in _stamp_hooks:
+        hook(session, connection, versions)
+
+
+def _forget_tables(session, *_args):
+    session.info.pop(PENDING_KEY, None)
+
+
+def init_app(app):
+    for name, listener in (('after_flush', _collect_tables), ('before_commit', _stamp_tables),
+                           ('after_commit', _forget_tables), ('after_rollback', _forget_tables)):
+        if not event.contains(RoutingSession, name, listener):
+            event.listen(RoutingSession, name, listener)
+
+
+# --- CONDITIONAL GET ---
+def _validators(tables):
+    """(etag, last_modified) for the current request given the tables' stamps."""
+    tables = [stamp_name(table) for table in tables]
+    stamps = read_stamps(tables)
+    today = date.today()
+    # Keyed by the user and today's date too: some lists depend on the date (expiring, due) or the session
+    key = '|'.join([request.full_path, str(session.get('user_id')), today.isoformat()]
+                   + [f"{name}:{stamps[name][0]}" for name in tables])
+    etag = hmac.new(current_app.secret_key.encode(), key.encode(), hashlib.sha256).hexdigest()[:32]
+
+    changed = [changed_at for _version, changed_at in stamps.values()]
+    last_modified = None
+    if None not in changed:
+        midnight = datetime.combine(today, time.min).astimezone(timezone.utc).replace(tzinfo=None)
+        last_modified = max(changed + [midnight])
+        # HTTP dates have whole seconds: a stamp from the current second could still move within it
+        if datetime.utcnow() - last_modified < timedelta(seconds=1):
+            last_modified = None
+    return etag, last_modified
+
+
+def _tag(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def conditional(*tables):
+    """
+    Serves a GET view with an ETag/Last-Modified derived from the tables'
+    change stamps, and answers a matching revalidation with 304 without
+    calling the view. Other methods pass straight through.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+            etag, last_modified = _validators(tables)
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                return _tag(current_app.response_class(status=304), etag, last_modified)
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                _tag(response, etag, last_modified)
+            return response
+        return decorated_function
+    return decorator
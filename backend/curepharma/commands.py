@@ -0,0 +1,43 @@
+# backend/curepharma/commands.py
+
+import click
+from flask.cli import with_appcontext
+
+from .analytics_export import export_analytics
+from .archive import archive_closed_records
+from .extensions import db
+from .models import Store
+
+
+# --- UTILITY COMMAND ---
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """Initializes the database and creates all tables."""
+    db.create_all()
+    # Rows default to store 1 (see models.StoreScoped)
+    if db.session.get(Store, 1) is None:
+        db.session.add(Store(id=1, code='MAIN', name='Main Store'))
+        db.session.commit()
+    print("✅ Initialized the database and created all tables.")
+
+
+@click.command("archive-records")
+@with_appcontext
+def archive_records_command():
+    """Moves closed records older than ARCHIVE_AFTER_DAYS to the archive tables now."""
+    print(f"Archived: {archive_closed_records()}")
+
+
+@click.command("export-analytics")
+@click.option("--folder", default=None, help="Defaults to ANALYTICS_FOLDER.")
+@with_appcontext
+def export_analytics_command(folder):
+    """Appends new invoices, invoice lines and stock movements to the Parquet analytics export."""
+    print(f"Exported: {export_analytics(folder)}")
+
+
+def register_commands(app):
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(archive_records_command)
+    app.cli.add_command(export_analytics_command)
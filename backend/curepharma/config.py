@@ -0,0 +1,172 @@
+# backend/curepharma/config.py
+
+import os
+
+# --- CONFIGURATION ---
+class Config:
+    """Application configuration."""
+    SECRET_KEY = os.environ.get("SECRET_KEY", "a-more-secure-and-refactored-secret-key")
+
+    # Use DATABASE_URL from environment if available, otherwise fallback to SQLite
+    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        "DATABASE_URL",
+        f"sqlite:///{os.path.join(BASE_DIR, 'inventory.db')}"
+    )
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # 'orjson' (faster) or 'stdlib'; both write dates as ISO 8601 (see curepharma.json_provider)
+    JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "orjson")
+
+    # Uploads folder (created on first upload, not at startup)
+    UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+
+    # React build served by the frontend blueprint
+    STATIC_FOLDER = os.path.join(BASE_DIR, 'build', 'static')
+    TEMPLATE_FOLDER = os.path.join(BASE_DIR, 'build')
+    # Build files up to this size are kept in memory (see curepharma.static_assets)
+    STATIC_MEMORY_MAX_BYTES = 512 * 1024
+    # Cache lifetime for unhashed root files (manifest, icons); build/static is immutable
+    STATIC_DEFAULT_MAX_AGE = 3600
+
+    # Store for anonymous requests without ?store= and for sessions from before stores
+    # existed. Admin phone numbers are set per store (Store.admin_phones).
+    DEFAULT_STORE_ID = int(os.environ.get("DEFAULT_STORE_ID", 1))
+
+    # /api/billing/batch: one transaction per chunk of bills
+    BILLING_BATCH_CHUNK_SIZE = int(os.environ.get("BILLING_BATCH_CHUNK_SIZE", 200))
+    BILLING_BATCH_MAX_BILLS = 2000
+
+    # /api/medicines/revisions: rows per bulk price/stock revision
+    MEDICINE_REVISION_MAX_ROWS = 5000
+
+    # /api/catalog/delta: deletions are remembered this long, older clients re-fetch the snapshot
+    CATALOG_TOMBSTONE_DAYS = int(os.environ.get("CATALOG_TOMBSTONE_DAYS", 30))
+
+    # How often in-process catalogue indexes (barcodes, salts) check for other processes' writes
+    CATALOG_MIRROR_RECHECK_SECONDS = float(os.environ.get("CATALOG_MIRROR_RECHECK_SECONDS", 2))
+
+    # /api/delivery/routes: runs start and end at the store (Store.latitude/longitude,
+    # else these). Without coordinates, the centroid of the day's orders is used instead.
+    STORE_LATITUDE = os.environ.get("STORE_LATITUDE")
+    STORE_LONGITUDE = os.environ.get("STORE_LONGITUDE")
+    DELIVERY_MAX_STOPS = int(os.environ.get("DELIVERY_MAX_STOPS", 15))
+
+    # Closed invoices, reminders, shortages and advances older than this move to
+    # archive tables overnight (curepharma.archive), a bounded number of batches per run
+    ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 365))
+    ARCHIVE_BATCH_SIZE = 500
+    ARCHIVE_MAX_BATCHES = 20
+
+    # Nightly Parquet export for offline analytics (curepharma.analytics_export).
+    # Needs pandas and pyarrow, which the app itself doesn't.
+    ANALYTICS_EXPORT_ENABLED = os.environ.get("ANALYTICS_EXPORT_ENABLED", "0") == "1"
+    ANALYTICS_FOLDER = os.environ.get("ANALYTICS_FOLDER", os.path.join(BASE_DIR, 'analytics'))
+    ANALYTICS_EXPORT_CHUNK_ROWS = 20000
+
+    # Reports over closed periods are cached in process (curepharma.report_cache)
+    REPORT_CACHE_SECONDS = int(os.environ.get("REPORT_CACHE_SECONDS", 6 * 3600))
+    REPORT_CACHE_MAX_ENTRIES = 256
+    # Standard-period reports are precomputed (curepharma.report_snapshots); an
+    # open period's snapshot is served this long after newer bills
+    REPORT_OPEN_MAX_AGE_SECONDS = int(os.environ.get("REPORT_OPEN_MAX_AGE_SECONDS", 360))
+    FINANCIAL_YEAR_START_MONTH = 4
+
+    # Rate limiting for public and expensive endpoints (curepharma.rate_limit).
+    # Per group: token bucket refill `rate` (requests/second) and `burst`, per
+    # client IP and per user session; `concurrency` caps a group's in-flight requests
+    # per worker process and should stay below the worker's thread count.
+    RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") != "0"
+    # 'memory', 'sqlite:////path/to/rate_limit.db' (shared by one host's workers) or 'redis://...'
+    RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", "memory")
+    # Proxies in front of the app that append to X-Forwarded-For (0: use the connecting address).
+    # Required behind nginx or a load balancer: at 0 every client shares the proxy's bucket.
+    RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", 0))
+    RATE_LIMITS = {
+        'search': {'rate': 10, 'burst': 60, 'concurrency': 4},    # medicine search and lookups
+        'billing_search': {'rate': 10, 'burst': 60, 'concurrency': 4},  # the same, logged in at the counter
+        'public': {'rate': 2, 'burst': 30, 'concurrency': 4},     # medicine details, shared bill links
+        'login': {'rate': 0.2, 'burst': 10, 'concurrency': 2},    # password hashing
+        'reports': {'rate': 2, 'burst': 30, 'concurrency': 2},    # reports and exports
+    }
+
+    # JSON-lines logging through a background writer thread (curepharma.logs).
+    # LOG_FILE '-' writes to stdout; file rotation is for one process only (the
+    # desktop build), see curepharma.logs. LOG_LEVELS overrides levels per logger,
+    # e.g. "curepharma.sync=DEBUG,curepharma.access=WARNING".
+    LOG_FILE = os.environ.get("LOG_FILE", os.path.join(BASE_DIR, 'logs', 'curepharma.jsonl'))
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT = 5
+    LOG_QUEUE_SIZE = 10000
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+    LOG_LEVELS = os.environ.get("LOG_LEVELS", "werkzeug=WARNING")
+
+    # The background scheduler starts on the first request, in one process only.
+    # Set SCHEDULER_ENABLED=0 for extra gunicorn nodes, CLI use and benchmarks.
+    SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "1") != "0"
+    SCHEDULER_LOCK_FILE = os.path.join(BASE_DIR, '.scheduler.lock')
+
+    # Desktop <-> cloud replication (curepharma.sync). The cloud only needs
+    # SYNC_TOKEN; a desktop also sets SYNC_REMOTE_URL to the cloud's base URL.
+    SYNC_NODE_ID = os.environ.get("SYNC_NODE_ID")
+    SYNC_REMOTE_URL = os.environ.get("SYNC_REMOTE_URL")
+    SYNC_TOKEN = os.environ.get("SYNC_TOKEN")
+    SYNC_BATCH_SIZE = int(os.environ.get("SYNC_BATCH_SIZE", 500))
+
+
+class DesktopConfig(Config):
+    """Profile for the pywebview build (run.py) on the local inventory.db."""
+    SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(Config.BASE_DIR, 'inventory.db')}"
+
+    # Keep a few warm connections instead of reconnecting per request;
+    # `timeout` is the Python-level busy wait on top of PRAGMA busy_timeout.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 5,
+        'max_overflow': 5,
+        'connect_args': {'timeout': 5, 'check_same_thread': False},
+    }
+
+    # Applied to every new connection by sqlite_profile.init_app
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64000,  # negative = KiB, so ~64 MB
+        'temp_store': 'MEMORY',
+    }
+    SQLITE_INCREMENTAL_VACUUM_PAGES = 2000
+    SQLITE_BACKUP_FOLDER = os.path.join(Config.BASE_DIR, 'backups')
+    SQLITE_BACKUP_KEEP = 14
+
+
+class PostgresConfig(Config):
+    """Profile for the hosted build with DATABASE_URL pointing at Postgres (e.g. a pooled Neon endpoint)."""
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': True,
+        'pool_size': int(os.environ.get("DB_POOL_SIZE", 5)),
+        'max_overflow': int(os.environ.get("DB_MAX_OVERFLOW", 5)),
+        'pool_timeout': 10,
+        # Neon closes idle connections; recycle before it does
+        'pool_recycle': 300,
+        'connect_args': {'application_name': os.environ.get("PG_APPLICATION_NAME", "curepharma")},
+    }
+
+    # Several gunicorn workers would each rotate the one file; log to stdout for the host to collect
+    LOG_FILE = os.environ.get("LOG_FILE", "-")
+
+    # Default per-transaction limit; views override it with @statement_timeout
+    POSTGRES_STATEMENT_TIMEOUT_MS = int(os.environ.get("PG_STATEMENT_TIMEOUT_MS", 15000))
+    REPORT_STATEMENT_TIMEOUT_MS = int(os.environ.get("PG_REPORT_STATEMENT_TIMEOUT_MS", 60000))
+
+    # Optional read replica used by views marked @use_read_replica
+    SQLALCHEMY_BINDS = (
+        {'replica': os.environ["READ_DATABASE_URL"]} if os.environ.get("READ_DATABASE_URL") else {}
+    )
+
+
+def default_config():
+    """PostgresConfig when DATABASE_URL points at Postgres, otherwise the plain Config."""
+    if Config.SQLALCHEMY_DATABASE_URI.startswith("postgres"):
+        return PostgresConfig
+    return Config
@@ -0,0 +1,163 @@
+# backend/curepharma/delivery.py
+"""
+Delivery runs for online orders (/api/delivery/routes), computed locally.
+
+1. Orders: online, Pending or Approved, billed in the last `days` days and
+   geocoded; optionally only those whose geohash starts with `area` (an
+   indexed prefix query, see curepharma.geo).
+2. Stops: orders sharing an 8-character geohash (the same building, ~20 m)
+   are delivered as one stop.
+3. Batches: stops are swept by bearing around the store, starting after the
+   widest empty angle, and cut into one contiguous sector per rider. A
+   sector longer than max_stops becomes several runs back to the store.
+4. Each run is ordered nearest-neighbour from the store, then improved with
+   2-opt on the closed tour (including the ride back), for a bounded number
+   of passes.
+
+The store is the current Store's latitude/longitude, else
+STORE_LATITUDE/STORE_LONGITUDE; without either, the centroid of the orders
+stands in and the response says so.
+"""
+
+import math
+from datetime import datetime, time, timedelta
+
+from .extensions import db
+from .geo import as_coordinates, bearing, distance_matrix
+from .models import CustomerInvoice
+
+STOP_GEOHASH_LENGTH = 8
+TWO_OPT_MAX_PASSES = 50
+
+
+# --- ORDERS & STOPS ---
+def fetch_orders(days, area=None):
+    since = datetime.combine(datetime.now().date() - timedelta(days=days - 1), time.min)
+    query = db.session.query(
+        CustomerInvoice.id, CustomerInvoice.customer_name, CustomerInvoice.customer_phone,
+        CustomerInvoice.address, CustomerInvoice.pincode, CustomerInvoice.latitude,
+        CustomerInvoice.longitude, CustomerInvoice.geohash, CustomerInvoice.grand_total,
+        CustomerInvoice.status,
+    ).filter(
+        CustomerInvoice.order_type == 'Online',
+        CustomerInvoice.status.in_(('Pending', 'Approved')),
+        CustomerInvoice.bill_date >= since,
+    )
+    if area:
+        query = query.filter(CustomerInvoice.geohash.like(f"{area}%"))
+    return query.order_by(CustomerInvoice.id).all()
+
+
+def group_stops(orders):
+    """[(point, [order, ...]), ...]; orders without coordinates are returned separately."""
+    stops, unplaced = {}, []
+    for order in orders:
+        point = as_coordinates(order.latitude, order.longitude)
+        if point is None or not order.geohash:
+            unplaced.append(order)
+            continue
+        stops.setdefault(order.geohash[:STOP_GEOHASH_LENGTH], (point, []))[1].append(order)
+    return list(stops.values()), unplaced
+
+
+def centroid(points):
+    return (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+
+
+# --- BATCHING ---
+def sweep(stops, depot, parts):
+    """Splits stops into `parts` contiguous, equally sized angular sectors around the depot."""
+    angles = sorted(((bearing(depot, point), index) for index, (point, _orders) in enumerate(stops)))
+    if len(angles) > 1:
+        # Start right after the widest gap, so no sector straddles a dense cluster
+        gaps = [((angles[(i + 1) % len(angles)][0] - angles[i][0]) % (2 * math.pi), i) for i in range(len(angles))]
+        start = (max(gaps)[1] + 1) % len(angles)
+        angles = angles[start:] + angles[:start]
+    ordered = [stops[index] for _angle, index in angles]
+    size, extra = divmod(len(ordered), parts)
+    sectors, position = [], 0
+    for part in range(parts):
+        length = size + (1 if part < extra else 0)
+        sectors.append(ordered[position:position + length])
+        position += length
+    return sectors
+
+
+# --- ROUTING ---
+def nearest_neighbour(matrix):
+    """A closed tour [0, ..., 0] over every node, always visiting the closest unvisited one next."""
+    unvisited = set(range(1, len(matrix)))
+    tour = [0]
+    while unvisited:
+        last = matrix[tour[-1]]
+        closest = min(unvisited, key=last.__getitem__)
+        unvisited.remove(closest)
+        tour.append(closest)
+    tour.append(0)
+    return tour
+
+
+def two_opt(tour, matrix, max_passes=TWO_OPT_MAX_PASSES):
+    """Reverses tour segments while that shortens the closed tour; the depot stays at both ends."""
+    tour = list(tour)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, len(tour) - 2):
+            a, b = tour[i - 1], tour[i]
+            for j in range(i + 1, len(tour) - 1):
+                c, d = tour[j], tour[j + 1]
+                if matrix[a][c] + matrix[b][d] < matrix[a][b] + matrix[c][d] - 1e-9:
+                    tour[i:j + 1] = reversed(tour[i:j + 1])
+                    b = tour[i]
+                    improved = True
+        if not improved:
+            break
+    return tour
+
+
+def route_run(stops, depot):
+    """The run's stops in visiting order, with leg distances, and its total (back to the store)."""
+    matrix = distance_matrix([depot] + [point for point, _orders in stops])
+    tour = two_opt(nearest_neighbour(matrix), matrix)
+    ordered = []
+    for sequence, (previous, node) in enumerate(zip(tour, tour[1:-1]), start=1):
+        point, orders = stops[node - 1]
+        ordered.append({
+            'sequence': sequence,
+            'latitude': point[0],
+            'longitude': point[1],
+            'leg_km': round(matrix[previous][node], 2),
+            'orders': [{
+                'id': order.id,
+                'customer_name': order.customer_name,
+                'customer_phone': order.customer_phone,
+                'address': order.address,
+                'pincode': order.pincode,
+                'grand_total': order.grand_total,
+                'status': order.status,
+            } for order in orders],
+        })
+    distance = sum(matrix[a][b] for a, b in zip(tour, tour[1:]))
+    return {'distance_km': round(distance, 2), 'return_km': round(matrix[tour[-2]][0], 2), 'stops': ordered}
+
+
+def plan_routes(orders, riders, max_stops, store=None):
+    stops, unplaced = group_stops(orders)
+    depot = store or (centroid([point for point, _orders in stops]) if stops else None)
+    plan = {
+        'store': {'latitude': depot[0], 'longitude': depot[1], 'estimated': store is None} if depot else None,
+        'orders': len(orders) - len(unplaced),
+        'stops': len(stops),
+        'unplaced_orders': [order.id for order in unplaced],
+        'riders': [],
+    }
+    if not stops:
+        return plan
+    for rider, sector in enumerate(sweep(stops, depot, riders), start=1):
+        runs = [route_run(sector[start:start + max_stops], depot) for start in range(0, len(sector), max_stops)]
+        plan['riders'].append({
+            'rider': rider,
+            'distance_km': round(sum(run['distance_km'] for run in runs), 2),
+            'runs': runs,
+        })
+    return plan
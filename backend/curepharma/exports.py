@@ -0,0 +1,107 @@
+# backend/curepharma/exports.py
+"""
+Streaming file exports for the accountant (see blueprints/exports.py).
+
+Rows are consumed one at a time from a generator, so memory stays flat no
+matter how long the period is:
+- CSV is written into a small buffer that is flushed to the response every
+  CSV_ROWS_PER_CHUNK rows.
+- XLSX is written with XlsxWriter in constant_memory mode (each row goes
+  straight to a temp file) and the finished workbook is streamed from disk.
+  XlsxWriter is imported only when an XLSX export is requested.
+"""
+
+import csv
+import io
+import tempfile
+from datetime import date, datetime
+
+from flask import Response, stream_with_context
+
+CSV_ROWS_PER_CHUNK = 500
+FILE_CHUNK_BYTES = 64 * 1024
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+
+class Sheet:
+    """One table of an export: a title, a header row and an iterable of row tuples."""
+
+    def __init__(self, title, header, rows):
+        self.title = title
+        self.header = header
+        self.rows = rows
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def csv_chunks(sheets):
+    """Yields the sheets as CSV text, one blank line between sheets."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the file as UTF-8
+    buffer.write('\ufeff')
+    for index, sheet in enumerate(sheets):
+        if index:
+            writer.writerow([])
+        writer.writerow(sheet.header)
+        for count, row in enumerate(sheet.rows, 1):
+            writer.writerow([_csv_value(value) for value in row])
+            if count % CSV_ROWS_PER_CHUNK == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue()
+
+
+def xlsx_chunks(sheets):
+    """Writes the sheets to a temp-file workbook row by row, then yields the file in chunks."""
+    import xlsxwriter
+
+    with tempfile.TemporaryFile() as output:
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'remove_timezone': True})
+        bold = workbook.add_format({'bold': True})
+        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+        datetime_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm'})
+
+        for sheet in sheets:
+            worksheet = workbook.add_worksheet(sheet.title[:31])
+            worksheet.write_row(0, 0, sheet.header, bold)
+            for row_index, row in enumerate(sheet.rows, 1):
+                for col_index, value in enumerate(row):
+                    if isinstance(value, datetime):
+                        worksheet.write_datetime(row_index, col_index, value, datetime_format)
+                    elif isinstance(value, date):
+                        worksheet.write_datetime(row_index, col_index, value, date_format)
+                    else:
+                        worksheet.write(row_index, col_index, value)
+        workbook.close()
+
+        output.seek(0)
+        while True:
+            chunk = output.read(FILE_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+
+def export_response(sheets, filename, export_format='csv'):
+    """
+    A streamed download of `sheets`. `sheets` may be a generator function's
+    result; it is only iterated once the response starts streaming.
+    """
+    if export_format == 'xlsx':
+        body = xlsx_chunks(sheets)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        body = csv_chunks(sheets)
+        mimetype = 'text/csv'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,13 @@
+# backend/curepharma/extensions.py
+# Extension objects are created unbound here and attached in create_app(),
+# so importing a model or blueprint never builds an app or opens a database.
+
+from flask_cors import CORS
+from flask_migrate import Migrate
+from flask_sqlalchemy import SQLAlchemy
+
+from .postgres_profile import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = Migrate()
+cors = CORS()
@@ -0,0 +1,77 @@
+# backend/curepharma/geo.py
+"""
+Geohash encoding and distances for delivery planning. Pure functions, no map services.
+
+A geohash names a lat/lng cell; every extra character narrows it (6 chars is
+roughly 1.2 x 0.6 km, 8 chars roughly 38 x 19 m), and nearby points share a
+prefix. CustomerInvoice.geohash stores the 9-character hash of the delivery
+address, so "orders in this area" is an indexed LIKE 'prefix%' query.
+"""
+
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+
+
+def as_coordinates(latitude, longitude):
+    """(lat, lng) as floats, or None if either is missing or out of range."""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """The geohash of a point, or None if it has no valid coordinates."""
+    coordinates = as_coordinates(latitude, longitude)
+    if coordinates is None:
+        return None
+    latitude, longitude = coordinates
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def haversine_km(a, b):
+    """Great-circle distance between two (lat, lng) points."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def distance_matrix(points):
+    """Pairwise haversine distances (km) as a list of lists."""
+    count = len(points)
+    matrix = [[0.0] * count for _ in range(count)]
+    for i in range(count):
+        for j in range(i + 1, count):
+            matrix[i][j] = matrix[j][i] = haversine_km(points[i], points[j])
+    return matrix
+
+
+def bearing(origin, point):
+    """Compass bearing (radians, 0 = north, clockwise) from origin to point."""
+    lat1, lat2 = math.radians(origin[0]), math.radians(point[0])
+    delta = math.radians(point[1] - origin[1])
+    y = math.sin(delta) * math.cos(lat2)
+    x = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(delta)
+    return math.atan2(y, x) % (2 * math.pi)
@@ -0,0 +1,98 @@
+# backend/curepharma/helpers.py
+
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, g, has_app_context, jsonify, session
+from sqlalchemy import String, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+
+# --- DECORATORS & HELPERS ---
+def login_required(f):
+    """Decorator to protect routes that require authentication."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({"error": "Unauthorized access. Please log in."}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+def admin_required(f):
+    """Decorator for routes only admins may use (store setup, switching stores)."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({"error": "Unauthorized access. Please log in."}), 401
+        if session.get('user_role') != 'admin':
+            return jsonify({"error": "Admins only."}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def current_store_id():
+    """The store the current request (or store_context block) works in; None when it spans every store."""
+    return g.get('store_id') if has_app_context() else None
+
+def default_store_id():
+    """The store a new row belongs to unless given: the current store, else DEFAULT_STORE_ID."""
+    store_id = current_store_id()
+    if store_id is None and has_app_context():
+        store_id = current_app.config.get('DEFAULT_STORE_ID')
+    return store_id or 1
+
+def calculate_net_value(amount, gst_percent):
+    """Calculates the net value from amount and GST percentage."""
+    return float(amount) * (1 + float(gst_percent) / 100)
+
+def parse_date(date_string):
+    """Safely parses a date string in YYYY-MM-DD format."""
+    if not date_string:
+        return None
+    try:
+        return datetime.strptime(date_string, '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return None
+
+def safe_int(value, default=0):
+    try:
+        return int(str(value).strip() or default)
+    except (ValueError, TypeError):
+        return default
+
+def safe_float(value, default=0.0):
+    try:
+        return float(str(value).replace('%', '').strip() or default)
+    except (ValueError, TypeError):
+        return default
+
+def sanitize_phone(phone_number):
+    """
+    A robust helper to clean and standardize phone numbers.
+    It removes all non-digit characters.
+    """
+    if not phone_number:
+        return ""
+    return "".join(filter(str.isdigit, phone_number))
+
+
+# --- QUERY SERIALIZATION ---
+class minute_text(FunctionElement):
+    """A DateTime column rendered as 'YYYY-MM-DD HH:MM' text by the database itself."""
+    type = String()
+    inherit_cache = True
+
+
+@compiles(minute_text)
+def _minute_text_sqlite(element, compiler, **kw):
+    return compiler.process(func.strftime('%Y-%m-%d %H:%M', *element.clauses), **kw)
+
+
+@compiles(minute_text, 'postgresql')
+def _minute_text_postgres(element, compiler, **kw):
+    return compiler.process(func.to_char(*element.clauses, 'YYYY-MM-DD HH24:MI'), **kw)
+
+
+def rows_as_dicts(rows):
+    """Projected rows (query.with_entities / select) as plain dicts, ready for jsonify."""
+    return [row._asdict() for row in rows]
@@ -0,0 +1,77 @@
+# backend/curepharma/json_provider.py
+"""
+orjson-backed JSON for jsonify() and request.get_json().
+
+orjson serializes dates and datetimes natively as ISO 8601 (a date becomes
+"2025-01-31"), which is what the list endpoints rely on when they return
+projected rows without formatting every value in Python. Anything orjson
+doesn't know goes through _default, mirroring Flask's DefaultJSONProvider.
+
+JSON_PROVIDER = 'orjson' (the default) or 'stdlib'. The stdlib provider is
+Flask's own with ISO dates, so both produce the same output; it is also
+used when orjson isn't installed.
+"""
+
+import dataclasses
+import decimal
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    mimetype = 'application/json'
+
+    def _options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        # Same rule as Flask: pretty output only while debugging
+        if self._app.debug:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Skips the bytes -> str -> bytes round trip of dumps()
+        body = orjson.dumps(obj, default=_default, option=self._options())
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def _iso_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+
+class StdlibProvider(DefaultJSONProvider):
+    """Flask's provider, but dates as ISO 8601 like orjson instead of HTTP dates."""
+    default = staticmethod(_iso_default)
+
+
+def init_app(app):
+    if app.config.get('JSON_PROVIDER', 'orjson') == 'orjson' and orjson is not None:
+        app.json = OrjsonProvider(app)
+    else:
+        app.json = StdlibProvider(app)
@@ -0,0 +1,194 @@
+# backend/curepharma/logs.py
+"""
+Structured, non-blocking logging.
+
+Modules log through logging.getLogger(__name__), i.e. under 'curepharma'
+(Flask's app.logger is the same logger). Records are handed to a bounded
+in-memory queue by a QueueHandler on the calling thread; a QueueListener
+thread writes them out as JSON lines:
+
+    {"time": "2026-10-19T10:02:03.512Z", "level": "INFO", "logger": "curepharma.access",
+     "message": "POST /api/billing 201", "request_id": "5f0c1e2a9b7d4e61", "elapsed_ms": 41.7, ...}
+
+- LOG_FILE is rotated at LOG_MAX_BYTES, keeping LOG_BACKUP_COUNT old files;
+  '-' writes to stdout instead (hosted deployments that collect stdout).
+  Rotation is single-process only: with several processes on one file, one
+  renames it while the others keep writing to the renamed file (or, on
+  Windows, the rename fails). The hosted profile (PostgresConfig) therefore
+  logs to stdout by default, and multi-worker deployments that want files
+  should give each process its own LOG_FILE.
+- A request gets an id (the caller's X-Request-ID, or a new one), returned
+  in the X-Request-ID response header. Every record logged while serving it
+  carries the id and the milliseconds since the request started, and each
+  request ends with one 'curepharma.access' line with its status and timing.
+- Extra fields passed as logger.info(..., extra={...}) become JSON keys.
+- Levels: LOG_LEVEL for 'curepharma', LOG_LEVELS for any logger by name,
+  e.g. "curepharma.sync=DEBUG,curepharma.access=WARNING". werkzeug's own
+  access lines are redundant with 'curepharma.access' and are off by default.
+
+Nothing on a request thread waits for the disk: when the queue is full
+(the disk stalled), new records are dropped and counted, and the count is
+logged once the writer catches up.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, has_request_context, request
+
+ACCESS_LOGGER = 'curepharma.access'
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Loggers the pipeline takes over; anything else keeps Python's defaults
+MANAGED_LOGGERS = ('curepharma', 'werkzeug')
+
+# LogRecord attributes that are not extra fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+_queue_handler = None
+
+
+# --- RECORDS ---
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.message if hasattr(record, 'message') else record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RequestQueueHandler(QueueHandler):
+    """Tags records with the current request and queues them without ever blocking."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Runs on the thread that logged: anything needing the request context,
+        # and arguments that might change after the call, is resolved here
+        if has_request_context() and 'request_id' in g:
+            record.request_id = g.request_id
+            record.elapsed_ms = round((time.perf_counter() - g.request_started) * 1000, 1)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.dropped and self.queue.empty():
+                dropped, self.dropped = self.dropped, 0
+                self.queue.put_nowait(logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f"Log queue was full, dropped {dropped} records",
+                }))
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _RotatingFile(RotatingFileHandler):
+    """A RotatingFileHandler that creates its folder, on the first record rather than at startup."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+def _output_handler(config):
+    path = config.get('LOG_FILE') or '-'
+    if path == '-':
+        handler = logging.StreamHandler(sys.stdout)
+    else:
+        handler = _RotatingFile(
+            path, maxBytes=config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=config.get('LOG_BACKUP_COUNT', 5), encoding='utf-8', delay=True,
+        )
+    handler.setFormatter(JsonLinesFormatter())
+    return handler
+
+
+def parse_levels(levels):
+    """{logger name: level} from a dict or a "name=LEVEL,name=LEVEL" string."""
+    if isinstance(levels, dict):
+        return dict(levels)
+    parsed = {}
+    for item in (levels or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            parsed[name.strip()] = level.strip().upper()
+    return parsed
+
+
+# --- REQUESTS ---
+def _start_request():
+    g.request_id = (request.headers.get(REQUEST_ID_HEADER) or '')[:64] or uuid.uuid4().hex[:16]
+    g.request_started = time.perf_counter()
+
+
+def _finish_request(response):
+    if 'request_id' in g:
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+        logging.getLogger(ACCESS_LOGGER).info(
+            "%s %s %s", request.method, request.path, response.status_code,
+            extra={'method': request.method, 'path': request.path, 'status': response.status_code,
+                   'remote_addr': request.remote_addr},
+        )
+    return response
+
+
+# --- SETUP ---
+def stop():
+    """Flushes queued records and stops the writer thread."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+    if _queue_handler is not None:
+        for name in MANAGED_LOGGERS:
+            logging.getLogger(name).removeHandler(_queue_handler)
+    _listener = _queue_handler = None
+
+
+def init_app(app):
+    global _listener, _queue_handler
+    config = app.config
+    # One pipeline per process: a second app (tests, CLI) takes it over
+    stop()
+    log_queue = queue.Queue(maxsize=config.get('LOG_QUEUE_SIZE', 10000))
+    _queue_handler = RequestQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, _output_handler(config), respect_handler_level=False)
+    _listener.start()
+
+    levels = {'curepharma': config.get('LOG_LEVEL', 'INFO'), **parse_levels(config.get('LOG_LEVELS'))}
+    for name in MANAGED_LOGGERS:
+        logger = logging.getLogger(name)
+        logger.addHandler(_queue_handler)
+        logger.propagate = False
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+atexit.register(stop)
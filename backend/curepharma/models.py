@@ -0,0 +1,411 @@
+# backend/curepharma/models.py
+
+import uuid
+from datetime import datetime
+
+import pytz
+from sqlalchemy.orm import declared_attr
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from .extensions import db
+from .geo import encode_geohash
+from .helpers import calculate_net_value, default_store_id
+
+
+def new_sync_uid():
+    return uuid.uuid4().hex
+
+
+def default_geohash(context):
+    params = context.get_current_parameters()
+    return encode_geohash(params.get('latitude'), params.get('longitude'))
+
+
+class SyncTracked:
+    """Columns the sync engine uses to identify a row across databases and order its edits."""
+    sync_uid = db.Column(db.String(36), unique=True, index=True, default=new_sync_uid)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class StoreScoped:
+    """Rows partitioned by outlet. ORM queries only see the current store's rows, see curepharma.stores."""
+
+    @declared_attr
+    def store_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('store.id'), nullable=False, default=default_store_id, server_default='1')
+
+
+# Tables whose rows curepharma.archive moves out: on SQLite a deleted id would
+# otherwise be reused, and collide with the archived row keyed on it
+NO_ID_REUSE = {'sqlite_autoincrement': True}
+
+
+# --- DATABASE MODELS ---
+class Store(db.Model):
+    """One outlet. Store 1 holds everything from before there was more than one."""
+    id = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(20), nullable=False, unique=True)
+    name = db.Column(db.String(100), nullable=False)
+    address = db.Column(db.Text, nullable=True)
+    phone = db.Column(db.String(20), nullable=True)
+    # Route start/end for /api/delivery/routes; STORE_LATITUDE/LONGITUDE when unset
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    # Comma-separated phone numbers that sign up as this store's admins
+    admin_phones = db.Column(db.Text, nullable=True)
+    is_active = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def admin_phone_numbers(self):
+        return {phone.strip() for phone in (self.admin_phones or '').split(',') if phone.strip()}
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'code': self.code,
+            'name': self.name,
+            'address': self.address,
+            'phone': self.phone,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'is_active': self.is_active,
+        }
+
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    phone = db.Column(db.String(20), unique=True, nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
+
+    role = db.Column(db.String(20), nullable=False, default='customer')
+    # The store a login starts in; admins may switch to any other
+    store_id = db.Column(db.Integer, db.ForeignKey('store.id'), nullable=True)
+
+    def set_password(self, password):
+        self.password_hash = generate_password_hash(password)
+
+    def check_password(self, password):
+        return check_password_hash(self.password_hash, password)
+    
+class Medicine(StoreScoped, SyncTracked, db.Model):
+    # Names and barcodes are unique within a store; every outlet stocks the same products
+    __table_args__ = (
+        db.UniqueConstraint('store_id', 'name', name='uq_medicine_store_name'),
+        db.Index('ix_medicine_store_barcode', 'store_id', 'barcode', unique=True),
+        db.Index('ix_medicine_store_catalog_version', 'store_id', 'catalog_version'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    quantity = db.Column(db.Integer, default=0)
+    freeqty = db.Column(db.Integer, default=0)
+    batch_no = db.Column(db.String(80))
+    expiry_date = db.Column(db.Date)
+    mrp = db.Column(db.Float)
+    ptr = db.Column(db.Float)
+    amount = db.Column(db.Float)
+    gst = db.Column(db.Float)
+    netvalue = db.Column(db.Float)
+    category = db.Column(db.String(50), nullable=True, default='General')
+    formula = db.Column(db.String(255), nullable=True)
+    image_url = db.Column(db.String(255), nullable=True) # <-- ADD THIS LINE
+    # GTIN in the form barcodes.normalize_code stores it; HSN code for GST returns
+    barcode = db.Column(db.String(20), nullable=True)
+    hsn_code = db.Column(db.String(8), nullable=True, index=True)
+    # Catalogue version of this row's last change; local only, see curepharma.catalog
+    catalog_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # What the API exposes; list endpoints select just these columns
+    API_COLUMNS = ('id', 'name', 'quantity', 'freeqty', 'batch_no', 'expiry_date', 'mrp', 'ptr',
+                   'amount', 'gst', 'netvalue', 'category', 'formula', 'image_url', 'barcode', 'hsn_code')
+
+    def to_dict(self):
+        """Serializes the object to a dictionary."""
+        data = {name: getattr(self, name) for name in self.API_COLUMNS}
+        if self.expiry_date:
+            data['expiry_date'] = self.expiry_date.strftime('%Y-%m-%d')
+        return data
+
+    def update_value(self):
+        """amount (PTR x quantity, before GST) and netvalue (after GST), as the CSV import stores them."""
+        self.amount = (self.ptr or 0) * (self.quantity or 0)
+        self.netvalue = calculate_net_value(self.amount, self.gst or 0)
+
+# --- ADD THIS NEW MODEL ---
+class Reminder(StoreScoped, SyncTracked, db.Model):
+    __table_args__ = (db.Index('ix_reminder_store_status_date', 'store_id', 'status', 'reminder_date'), NO_ID_REUSE)
+
+    id = db.Column(db.Integer, primary_key=True)
+    customer_name = db.Column(db.String(100), nullable=False)
+    customer_phone = db.Column(db.String(20), nullable=False)
+    medicine_name = db.Column(db.String(120), nullable=False)
+    reminder_date = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), default='Pending') # Pending, Sent, Dismissed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    invoice_id = db.Column(db.Integer, db.ForeignKey('customer_invoice.id'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'customer_name': self.customer_name,
+            'customer_phone': self.customer_phone,
+            'medicine_name': self.medicine_name,
+            'reminder_date': self.reminder_date.strftime('%Y-%m-%d'),
+            'status': self.status
+        }
+    
+
+
+class CustomerInvoice(StoreScoped, SyncTracked, db.Model):
+    __table_args__ = (
+        db.Index('ix_customer_invoice_store_bill_date', 'store_id', 'bill_date'),
+        db.Index('ix_customer_invoice_store_customer_phone', 'store_id', 'customer_phone'),
+        db.Index('ix_customer_invoice_store_status', 'store_id', 'status'),
+        NO_ID_REUSE,
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    customer_name = db.Column(db.String(100))
+    customer_phone = db.Column(db.String(20))
+    bill_date = db.Column(db.DateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
+    grand_total = db.Column(db.Float, nullable=False)
+    payment_mode = db.Column(db.String(20), default='Cash') 
+    address = db.Column(db.Text, nullable=True)
+    pincode = db.Column(db.String(10), nullable=True)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    # Derived from latitude/longitude on insert (curepharma.geo); prefix queries find nearby orders
+    geohash = db.Column(db.String(12), nullable=True, index=True, default=default_geohash)
+    order_type = db.Column(db.String(20), nullable=False, default='In-Store') # Values: 'In-Store', 'Online'
+    status = db.Column(db.String(20), nullable=False, default='Approved') # Values: 'Pending', 'Approved', 'Rejected'
+    # Client-supplied key for /api/billing/batch; unique so a retried bill can't be inserted twice
+    idempotency_key = db.Column(db.String(64), unique=True, index=True, nullable=True)
+    items = db.relationship('CustomerInvoiceItem', backref='invoice', lazy=True, cascade="all, delete-orphan")
+
+    
+
+class CustomerInvoiceItem(StoreScoped, SyncTracked, db.Model):
+    # The invoice's store, repeated so line queries are partitioned without the join
+    __table_args__ = (db.Index('ix_customer_invoice_item_store_invoice', 'store_id', 'invoice_id'), NO_ID_REUSE)
+
+    id = db.Column(db.Integer, primary_key=True)
+    invoice_id = db.Column(db.Integer, db.ForeignKey('customer_invoice.id'), nullable=False)
+    medicine_name = db.Column(db.String(120), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    mrp = db.Column(db.Float, nullable=False)
+    discount_percent = db.Column(db.Float, default=0)
+    total_price = db.Column(db.Float, nullable=False)
+    ptr = db.Column(db.Float, default=0.0) # <-- ADD THIS LINE
+    gst = db.Column(db.Float, default=0.0)
+
+class PurchaseInvoice(StoreScoped, SyncTracked, db.Model):
+    __table_args__ = (db.Index('ix_purchase_invoice_store_date', 'store_id', 'invoice_date'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    agency_name = db.Column(db.String(100), nullable=False)
+    invoice_number = db.Column(db.String(50))
+    invoice_date = db.Column(db.Date, nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'agency_name': self.agency_name,
+            'invoice_number': self.invoice_number,
+            'invoice_date': self.invoice_date.strftime('%Y-%m-%d'),
+            'amount': self.amount
+        }
+
+class ImportRecord(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    original_filename = db.Column(db.String(255), nullable=False)
+    saved_filename = db.Column(db.String(255), nullable=False, unique=True)
+    upload_date = db.Column(db.DateTime, default=datetime.utcnow)
+    imported_count = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'original_filename': self.original_filename,
+            'upload_date': self.upload_date.strftime('%Y-%m-%d %H:%M:%S'),
+            'imported_count': self.imported_count
+        }
+    
+class AdvancePayment(StoreScoped, SyncTracked, db.Model):
+    __table_args__ = (db.Index('ix_advance_payment_store_delivered_date', 'store_id', 'is_delivered', 'created_date'),
+                      NO_ID_REUSE)
+
+    id = db.Column(db.Integer, primary_key=True)
+    customer_name = db.Column(db.String(100), nullable=False)
+    customer_phone = db.Column(db.String(20), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    notes = db.Column(db.Text)
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    is_delivered = db.Column(db.Boolean, default=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'customer_name': self.customer_name,
+            'customer_phone': self.customer_phone,
+            'amount': self.amount,
+            'notes': self.notes,
+            'created_date': self.created_date.strftime('%Y-%m-%d %H:%M'),
+            'is_delivered': self.is_delivered
+        }
+class Shortage(StoreScoped, SyncTracked, db.Model):
+    __table_args__ = (
+        db.Index('ix_shortage_store_status_date', 'store_id', 'status', 'requested_date'),
+        db.Index('ix_shortage_store_name_status', 'store_id', 'normalized_name', 'status'),
+        NO_ID_REUSE,
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    medicine_name = db.Column(db.String(120), nullable=False)
+    customer_name = db.Column(db.String(100), nullable=True) # <-- ADD THIS
+    customer_phone = db.Column(db.String(20), nullable=True)  # <-- ADD THIS
+    requested_date = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), default='Pending')
+    # salts.normalize_medicine_name(medicine_name), kept current on flush (see curepharma.shortages)
+    normalized_name = db.Column(db.String(120), nullable=True)
+    resolved_date = db.Column(db.DateTime, nullable=True)
+    # Queued when a restock resolved the request, then Sent; never replicated
+    notify_status = db.Column(db.String(20), nullable=True, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'medicine_name': self.medicine_name,
+            'customer_name': self.customer_name, # <-- ADD THIS
+            'customer_phone': self.customer_phone, # <-- ADD THIS
+            'requested_date': self.requested_date.strftime('%Y-%m-%d %H:%M'),
+            'status': self.status
+        }
+
+
+# --- SYNC BOOKKEEPING ---
+class SyncChange(db.Model):
+    """One row-level change to a SyncTracked table, in commit order. See curepharma.sync."""
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_uid = db.Column(db.String(36), nullable=False)
+    operation = db.Column(db.String(10), nullable=False) # 'upsert' or 'delete'
+    payload = db.Column(db.Text)
+    origin = db.Column(db.String(64), nullable=False, index=True)
+    # The logged row's store; desktops pull their own store's changes only
+    store_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'table': self.table_name,
+            'uid': self.row_uid,
+            'op': self.operation,
+            'payload': self.payload,
+            'origin': self.origin,
+        }
+
+class SyncCursor(db.Model):
+    """How far this database has pushed to / pulled from a peer."""
+    peer = db.Column(db.String(255), primary_key=True)
+    last_pushed_id = db.Column(db.Integer, nullable=False, default=0)
+    last_pulled_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# --- CATALOGUE VERSIONING ---
+class ChangeStamp(db.Model):
+    """A named, monotonically increasing version counter, bumped once per committing transaction."""
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CatalogTombstone(db.Model):
+    """A deleted Medicine, kept so /api/catalog/delta can tell clients to drop it."""
+    __table_args__ = (db.Index('ix_catalog_tombstone_store_version', 'store_id', 'version'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    medicine_id = db.Column(db.Integer, nullable=False)
+    store_id = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    version = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# --- ARCHIVE ---
+def archive_table(model, *indexed):
+    """
+    A table with model's columns and none of its constraints, holding the
+    closed rows curepharma.archive moves out of the hot table. Column order
+    matches, so hot and archive rows can be UNION ALLed.
+    """
+    return db.Table(
+        f"{model.__tablename__}_archive",
+        *(db.Column(column.name, column.type, primary_key=column.primary_key, autoincrement=False,
+                    index=column.name in indexed)
+          for column in model.__table__.columns),
+    )
+
+customer_invoice_archive = archive_table(CustomerInvoice, 'bill_date', 'customer_phone', 'idempotency_key')
+customer_invoice_item_archive = archive_table(CustomerInvoiceItem, 'invoice_id')
+reminder_archive = archive_table(Reminder, 'reminder_date')
+shortage_archive = archive_table(Shortage, 'requested_date')
+advance_payment_archive = archive_table(AdvancePayment, 'created_date')
+
+
+# --- REPORT SNAPSHOTS ---
+class ReportSnapshot(db.Model):
+    """A report precomputed for a standard period, as its serialized JSON (see curepharma.report_snapshots)."""
+    store_id = db.Column(db.Integer, primary_key=True, autoincrement=False, default=1, server_default='1')
+    report = db.Column(db.String(40), primary_key=True)
+    period = db.Column(db.String(40), primary_key=True)
+    params = db.Column(db.String(200), primary_key=True, default='')
+    start_date = db.Column(db.Date)
+    end_date = db.Column(db.Date, nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    payload = db.Column(db.Text, nullable=False)
+
+
+# --- STOCK TRANSFERS ---
+class StockTransfer(db.Model):
+    """Stock moved from one store to another in one transaction (see curepharma.stores)."""
+    __table_args__ = (
+        db.Index('ix_stock_transfer_from_store_date', 'from_store_id', 'created_at'),
+        db.Index('ix_stock_transfer_to_store_date', 'to_store_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    from_store_id = db.Column(db.Integer, db.ForeignKey('store.id'), nullable=False)
+    to_store_id = db.Column(db.Integer, db.ForeignKey('store.id'), nullable=False)
+    notes = db.Column(db.Text, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    items = db.relationship('StockTransferItem', backref='transfer', lazy=True, cascade="all, delete-orphan")
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'from_store_id': self.from_store_id,
+            'to_store_id': self.to_store_id,
+            'notes': self.notes,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M'),
+            'items': [item.to_dict() for item in self.items],
+        }
+
+class StockTransferItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    transfer_id = db.Column(db.Integer, db.ForeignKey('stock_transfer.id'), nullable=False, index=True)
+    medicine_name = db.Column(db.String(120), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    from_medicine_id = db.Column(db.Integer, nullable=True)
+    to_medicine_id = db.Column(db.Integer, nullable=True)
+
+    def to_dict(self):
+        return {
+            'medicine_name': self.medicine_name,
+            'quantity': self.quantity,
+            'from_medicine_id': self.from_medicine_id,
+            'to_medicine_id': self.to_medicine_id,
+        }
@@ -0,0 +1,79 @@
+# backend/curepharma/postgres_profile.py
+"""
+Connection handling for the hosted (Postgres/Neon) deployment, see PostgresConfig.
+
+- Statement timeouts are applied with SET LOCAL at the start of every
+  transaction, which is safe behind a transaction-pooling endpoint where a
+  session-level SET would leak to other clients. Views can ask for a
+  different limit with @statement_timeout(ms).
+- Views decorated with @use_read_replica run their queries on the optional
+  'replica' bind (READ_DATABASE_URL) so heavy reports don't compete with
+  checkout for primary connections. Flushes always go to the primary.
+
+Both work the same against a SQLite stand-in (the timeout is simply skipped),
+so routing can be exercised without a Postgres server.
+"""
+
+from functools import wraps
+
+from flask import current_app, g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = 'replica'
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica bind while a read-only view is running."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _replica_requested():
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _replica_requested():
+    return has_request_context() and g.get('use_read_replica', False)
+
+
+def use_read_replica(f):
+    """Routes the view's queries to the replica bind when one is configured."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.use_read_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def statement_timeout(milliseconds):
+    """
+    Overrides POSTGRES_STATEMENT_TIMEOUT_MS for transactions started by this view.
+    Accepts a number of milliseconds or the name of a config key holding one.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if isinstance(milliseconds, str):
+                g.statement_timeout_ms = current_app.config.get(milliseconds)
+            else:
+                g.statement_timeout_ms = milliseconds
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def _set_local_timeout(_session, _transaction, connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    timeout = g.get('statement_timeout_ms') if has_request_context() else None
+    if timeout is None:
+        timeout = current_app.config.get('POSTGRES_STATEMENT_TIMEOUT_MS')
+    if timeout:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+
+def init_app(app):
+    if not event.contains(RoutingSession, 'after_begin', _set_local_timeout):
+        event.listen(RoutingSession, 'after_begin', _set_local_timeout)
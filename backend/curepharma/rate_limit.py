@@ -0,0 +1,263 @@
+# backend/curepharma/rate_limit.py
+"""
+Rate limiting and load shedding for public and expensive endpoints.
+
+Views join a group with @rate_limited('search'). A view that serves both
+the public and the shop counter names a separate group for logged-in
+requests, @rate_limited('search', staff_group='billing_search'), so
+anonymous traffic can't use up the counter's allowance or its concurrency
+slots. RATE_LIMITS configures, per group:
+- rate/burst: token buckets refilled at `rate` requests per second, up to
+  `burst`. Every request is charged to its client IP's bucket, and a
+  logged-in one to its user session's as well. It must have a token in
+  both, so new sessions don't buy more requests from one address; a request
+  turned away by either bucket takes nothing from the other.
+- concurrency: at most this many of the group's requests run at once in a
+  worker process. Keeping every group's cap below the worker's thread count
+  leaves threads free for billing however slow the searches and reports get.
+A request over either limit is answered 429 with Retry-After straight away,
+without touching the database.
+
+Buckets live in RATE_LIMIT_STORE:
+- 'memory': a dict in this process (each gunicorn worker counts separately);
+- 'sqlite:////path/to/file.db': a small SQLite file shared by the workers
+  on one host (not the app database, so limiting never waits on its locks);
+- 'redis://host:6379/0': any Redis-compatible server, shared by every host
+  (needs the redis package, imported only when this store is used).
+If the store fails, requests are let through and the error is logged.
+
+The client IP is the connecting address, or with RATE_LIMIT_TRUSTED_PROXIES
+set to the number of proxies in front of the app, the address those
+proxies recorded in X-Forwarded-For. Behind a reverse proxy that setting is
+required: left at 0, every client has the proxy's address and shares one
+bucket. A request forwarded while it is 0 logs a warning, once per process.
+"""
+
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request, session
+
+logger = logging.getLogger(__name__)
+
+# Memory store: at most this many buckets, least recently used dropped first
+MEMORY_MAX_KEYS = 10000
+# SQLite store: buckets idle this long are deleted, at most once a minute
+SQLITE_PRUNE_AFTER = 3600
+# Retry-After when a group is at its concurrency cap
+BUSY_RETRY_AFTER = 1
+
+_warned_unproxied = False
+
+
+def _take(tokens, stamp, now, rate, burst):
+    """(tokens left, seconds to wait) after taking one token from a bucket last seen at stamp."""
+    tokens = min(burst, tokens + max(0.0, now - stamp) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+# --- STORES ---
+# take(keys, rate, burst) takes one token from each bucket, or from none of them
+# if any is empty, and returns the longest wait (0: go ahead).
+class MemoryBucketStore:
+    def __init__(self):
+        self._buckets = OrderedDict()  # key -> (tokens, stamp), least recently used first
+        self._lock = threading.Lock()
+
+    def take(self, keys, rate, burst):
+        now = time.time()
+        with self._lock:
+            taken = {key: _take(*self._buckets.get(key, (burst, now)), now, rate, burst) for key in keys}
+            wait = max(wait for _tokens, wait in taken.values())
+            if wait:
+                return wait
+            for key, (tokens, _wait) in taken.items():
+                self._buckets[key] = (tokens, now)
+                self._buckets.move_to_end(key)
+            # A dropped bucket comes back full: the client that went longest without a request gains at most a burst
+            while len(self._buckets) > MEMORY_MAX_KEYS:
+                self._buckets.popitem(last=False)
+        return 0
+
+
+class SqliteBucketStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._pruned_at = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, stamp REAL NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def take(self, keys, rate, burst):
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            taken = {}
+            for key in keys:
+                row = connection.execute("SELECT tokens, stamp FROM bucket WHERE key = ?", (key,)).fetchone()
+                taken[key] = _take(*(row or (burst, now)), now, rate, burst)
+            wait = max(wait for _tokens, wait in taken.values())
+            if not wait:
+                connection.executemany(
+                    "INSERT INTO bucket (key, tokens, stamp) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, stamp = excluded.stamp",
+                    [(key, tokens, now) for key, (tokens, _wait) in taken.items()],
+                )
+            if now - self._pruned_at > 60:
+                self._pruned_at = now
+                connection.execute("DELETE FROM bucket WHERE stamp < ?", (now - SQLITE_PRUNE_AFTER,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return wait
+
+
+class RedisBucketStore:
+    # KEYS = buckets; ARGV = now, rate, burst. Returns the longest wait in seconds, as a string.
+    SCRIPT = """
+    local now, rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local tokens, wait = {}, 0
+    for i, key in ipairs(KEYS) do
+        local bucket = redis.call('HMGET', key, 'tokens', 'stamp')
+        local stamp = tonumber(bucket[2]) or now
+        tokens[i] = math.min(burst, (tonumber(bucket[1]) or burst) + math.max(0, now - stamp) * rate)
+        if tokens[i] < 1 then wait = math.max(wait, (1 - tokens[i]) / rate) end
+    end
+    if wait > 0 then return tostring(wait) end
+    for i, key in ipairs(KEYS) do
+        redis.call('HSET', key, 'tokens', tostring(tokens[i] - 1), 'stamp', ARGV[1])
+        redis.call('EXPIRE', key, math.ceil((burst - tokens[i] + 1) / rate) + 1)
+    end
+    return '0'
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, keys, rate, burst):
+        return float(self._script(keys=[f"curepharma:rate:{key}" for key in keys], args=[repr(time.time()), rate, burst]))
+
+
+def make_store(url):
+    if url.startswith('sqlite:///'):
+        return SqliteBucketStore(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBucketStore(url)
+    return MemoryBucketStore()
+
+
+# --- LIMITING ---
+class RateLimiter:
+    def __init__(self, store, rules):
+        self.store = store
+        self.rules = rules
+        self.slots = {
+            group: threading.BoundedSemaphore(rule['concurrency'])
+            for group, rule in rules.items() if rule.get('concurrency')
+        }
+
+    def wait(self, group, clients):
+        """Seconds before the next request in group charged to every one of clients; 0 means go ahead."""
+        rule = self.rules.get(group) or {}
+        if not rule.get('rate'):
+            return 0
+        try:
+            return self.store.take([f"{group}:{client}" for client in clients], rule['rate'], rule.get('burst', 1))
+        except Exception as e:
+            logger.warning("Rate limit store error, letting the request through: %s", e)
+            return 0
+
+
+def client_ip():
+    global _warned_unproxied
+    proxies = current_app.config.get('RATE_LIMIT_TRUSTED_PROXIES', 0)
+    forwarded = [address.strip() for address in request.headers.get('X-Forwarded-For', '').split(',') if address.strip()]
+    if proxies and forwarded:
+        return forwarded[-min(proxies, len(forwarded))]
+    if forwarded and not _warned_unproxied:
+        _warned_unproxied = True
+        logger.warning("Request forwarded by a proxy but RATE_LIMIT_TRUSTED_PROXIES is 0: "
+                       "all clients behind it share one rate limit bucket")
+    return request.remote_addr or 'unknown'
+
+
+def client_keys():
+    """The buckets a request is charged to: its client IP's, and its user session's when logged in."""
+    keys = [f"ip:{client_ip()}"]
+    user_id = session.get('user_id')
+    if user_id is not None:
+        keys.append(f"user:{user_id}")
+    return keys
+
+
+def _too_many(retry_after):
+    response = jsonify({"error": "Too many requests, please try again shortly."})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limited(group, staff_group=None):
+    """
+    Applies the group's token buckets and concurrency cap (RATE_LIMITS[group])
+    to the view; logged-in requests get staff_group's instead, if given.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            limiter = current_app.extensions.get('rate_limiter')
+            if limiter is None:
+                return f(*args, **kwargs)
+            request_group = staff_group if staff_group and session.get('user_id') is not None else group
+            wait = limiter.wait(request_group, client_keys())
+            if wait:
+                return _too_many(wait)
+            slot = limiter.slots.get(request_group)
+            if slot is None:
+                return f(*args, **kwargs)
+            if not slot.acquire(blocking=False):
+                return _too_many(BUSY_RETRY_AFTER)
+            try:
+                response = make_response(f(*args, **kwargs))
+            except BaseException:
+                slot.release()
+                raise
+            if response.is_streamed:
+                # Streamed exports run their query while the body is sent: hold the slot until then
+                response.call_on_close(slot.release)
+            else:
+                slot.release()
+            return response
+        return decorated_function
+    return decorator
+
+
+def init_app(app):
+    if not app.config.get('RATE_LIMIT_ENABLED', True):
+        return
+    app.extensions['rate_limiter'] = RateLimiter(
+        make_store(app.config.get('RATE_LIMIT_STORE', 'memory')),
+        app.config.get('RATE_LIMITS', {}),
+    )
@@ -0,0 +1,58 @@
+# backend/curepharma/report_cache.py
+"""
+Finished report payloads kept in process memory.
+
+Only reports over closed periods (ending before today) are cached: new
+bills can't change them, so a repeat request is a dict lookup instead of a
+scan of a month of invoice lines. Entries expire after REPORT_CACHE_SECONDS,
+which bounds how long a correction to an old bill or a medicine's cost
+takes to show, and the least recently used entry is dropped once there are
+REPORT_CACHE_MAX_ENTRIES.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class ReportCache:
+    def __init__(self, max_entries=256, ttl=6 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires at, payload)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, payload):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_report_cache():
+    return current_app.extensions['report_cache']
+
+
+def init_app(app):
+    app.extensions['report_cache'] = ReportCache(
+        app.config.get('REPORT_CACHE_MAX_ENTRIES', 256),
+        app.config.get('REPORT_CACHE_SECONDS', 6 * 3600),
+    )
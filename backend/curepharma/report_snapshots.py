@@ -0,0 +1,198 @@
+# backend/curepharma/report_snapshots.py
+"""
+Reports precomputed for the standard periods.
+
+Admins keep opening the same windows: today, this week, month to date, last
+month and financial year to date (from FINANCIAL_YEAR_START_MONTH). A
+request whose range is exactly one of them is answered with a
+ReportSnapshot's stored JSON while the snapshot is valid for the period's
+current version:
+
+- closed periods (ended before today): the sum of the 'sales:YYYY-MM@<store>'
+  change stamps of the months they cover. Those are bumped only by writes
+  to bills dated before the day of the write (edits, late batch or synced
+  bills, see mark_closed_periods), so today's billing leaves last month's
+  snapshot alone, and a correction to an old bill invalidates the periods
+  it falls in;
+- open periods (ending today): the customer_invoice/customer_invoice_item
+  stamps, which every bill bumps. An older snapshot is still served for
+  REPORT_OPEN_MAX_AGE_SECONDS, so a busy counter doesn't turn every report
+  request into a recomputation.
+
+precompute_standard_reports (curepharma.blueprints.reports) refreshes the
+snapshots every few minutes: open ones when something was billed, closed
+ones when their version moved or they were computed before today (which
+also picks up PTR/category changes; reports read those from the current
+medicine rows). A request that finds no valid snapshot computes the report
+itself and keeps it in the in-process report cache under its version.
+
+Snapshots, stamps and cache keys are all per store: every function here
+works on the current store (see curepharma.stores), and the scheduler
+refreshes each active store in turn.
+
+HISTORY is the daily summary's period: every day before today.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import event, func, inspect, select
+
+from .change_stamps import mark_tables, read_stamps, stamp_name, store_stamp
+from .extensions import db
+from .helpers import default_store_id
+from .models import ChangeStamp, CustomerInvoice, CustomerInvoiceItem, ReportSnapshot
+from .postgres_profile import RoutingSession
+from .report_cache import get_report_cache
+
+STANDARD_PERIODS = ('today', 'this_week', 'month_to_date', 'last_month', 'financial_year_to_date')
+HISTORY = 'history'
+MONTH_STAMP_PREFIX = 'sales:'
+OPEN_PERIOD_TABLES = ('customer_invoice', 'customer_invoice_item')
+
+
+# --- PERIODS ---
+def period_bounds(period, today):
+    """(start, end) of a standard period, both inclusive; start is None for HISTORY."""
+    if period == 'today':
+        return today, today
+    if period == 'this_week':
+        # Weeks start on Monday, like the weekly report buckets
+        return today - timedelta(days=today.weekday()), today
+    if period == 'month_to_date':
+        return today.replace(day=1), today
+    if period == 'last_month':
+        end = today.replace(day=1) - timedelta(days=1)
+        return end.replace(day=1), end
+    if period == 'financial_year_to_date':
+        first_month = current_app.config.get('FINANCIAL_YEAR_START_MONTH', 4)
+        year = today.year if today.month >= first_month else today.year - 1
+        return date(year, first_month, 1), today
+    if period == HISTORY:
+        return None, today - timedelta(days=1)
+    raise ValueError(f"Unknown report period: {period}")
+
+
+def standard_period(start, end, today):
+    """The name of the standard period spanning exactly start..end, or None."""
+    return next((period for period in STANDARD_PERIODS if period_bounds(period, today) == (start, end)), None)
+
+
+# --- VERSIONS ---
+def month_stamp(day, store_id=None):
+    return store_stamp(f"{MONTH_STAMP_PREFIX}{day:%Y-%m}", store_id if store_id is not None else default_store_id())
+
+
+def _months(start, end):
+    month = start.replace(day=1)
+    while month <= end:
+        yield month_stamp(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def period_version(start, end, today):
+    if end >= today:
+        names = [stamp_name(table) for table in OPEN_PERIOD_TABLES]
+    elif start is None:
+        return db.session.query(func.coalesce(func.sum(ChangeStamp.version), 0))\
+            .filter(ChangeStamp.name.like(store_stamp(f"{MONTH_STAMP_PREFIX}%", default_store_id()))).scalar()
+    else:
+        names = list(_months(start, end))
+    return sum(version for version, _changed_at in read_stamps(names).values())
+
+
+def mark_closed_periods(session, bill_dates, store_id=None):
+    """Queues the store's month stamps of bills dated before today that this transaction wrote."""
+    today = datetime.now().date()
+    days = (value.date() if isinstance(value, datetime) else value for value in bill_dates if value is not None)
+    months = {month_stamp(day, store_id) for day in days if day < today}
+    if months:
+        mark_tables(session, months)
+
+
+def _mark_written_bills(session, _flush_context):
+    """after_flush: marks the closed months of the bills (and bill lines) this flush wrote."""
+    written = list(session.new) + list(session.deleted)
+    written += [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    bill_dates, invoice_ids = defaultdict(list), set()
+    for obj in written:
+        if isinstance(obj, CustomerInvoice):
+            # A bill moved to another day changes both days
+            bill_dates[obj.store_id] += [obj.bill_date, *inspect(obj).attrs.bill_date.history.deleted]
+        elif isinstance(obj, CustomerInvoiceItem):
+            invoice = inspect(obj).dict.get('invoice')
+            if invoice is not None:
+                bill_dates[invoice.store_id].append(invoice.bill_date)
+            elif obj.invoice_id is not None:
+                invoice_ids.add(obj.invoice_id)
+    if invoice_ids:
+        for store_id, bill_date in session.execute(
+            select(CustomerInvoice.store_id, CustomerInvoice.bill_date).where(CustomerInvoice.id.in_(invoice_ids))
+            .execution_options(all_stores=True)
+        ):
+            bill_dates[store_id].append(bill_date)
+    for store_id, dates in bill_dates.items():
+        mark_closed_periods(session, dates, store_id)
+
+
+# --- SNAPSHOTS ---
+def _read_snapshot(report, period, params):
+    return db.session.execute(
+        select(ReportSnapshot.start_date, ReportSnapshot.end_date, ReportSnapshot.version,
+               ReportSnapshot.computed_at, ReportSnapshot.payload)
+        .where(ReportSnapshot.store_id == default_store_id(), ReportSnapshot.report == report,
+               ReportSnapshot.period == period, ReportSnapshot.params == params)
+    ).first()
+
+
+def load_report(report, period, params, build, today=None):
+    """
+    The report's JSON for a standard period: the snapshot's when it is valid,
+    else build(start, end) serialized (and cached in process under its version).
+    """
+    today = today or datetime.now().date()
+    start, end = period_bounds(period, today)
+    version = period_version(start, end, today)
+    snapshot = _read_snapshot(report, period, params)
+    if snapshot is not None and (snapshot.start_date, snapshot.end_date) == (start, end):
+        if snapshot.version == version:
+            return snapshot.payload
+        max_age = current_app.config.get('REPORT_OPEN_MAX_AGE_SECONDS', 360)
+        if end >= today and datetime.utcnow() - snapshot.computed_at < timedelta(seconds=max_age):
+            return snapshot.payload
+
+    cache = get_report_cache()
+    key = ('snapshot', default_store_id(), report, period, params, start, end, version)
+    payload = cache.get(key)
+    if payload is None:
+        payload = current_app.json.dumps(build(start, end))
+        cache.put(key, payload)
+    return payload
+
+
+def refresh_snapshot(report, period, params, build, today=None):
+    """Recomputes the period's snapshot unless it is current; returns True if it did."""
+    today = today or datetime.now().date()
+    start, end = period_bounds(period, today)
+    # Read before building: a bill committed meanwhile leaves the snapshot one
+    # version behind, so it is recomputed next time rather than served as current
+    version = period_version(start, end, today)
+    snapshot = _read_snapshot(report, period, params)
+    if snapshot is not None and (snapshot.start_date, snapshot.end_date, snapshot.version) == (start, end, version):
+        midnight = datetime.combine(today, time.min).astimezone(timezone.utc).replace(tzinfo=None)
+        if end >= today or snapshot.computed_at >= midnight:
+            return False
+
+    payload = current_app.json.dumps(build(start, end))
+    db.session.merge(ReportSnapshot(
+        store_id=default_store_id(), report=report, period=period, params=params, start_date=start, end_date=end,
+        version=version, computed_at=datetime.utcnow(), payload=payload,
+    ))
+    db.session.commit()
+    return True
+
+
+def init_app(app):
+    if not event.contains(RoutingSession, 'after_flush', _mark_written_bills):
+        event.listen(RoutingSession, 'after_flush', _mark_written_bills)
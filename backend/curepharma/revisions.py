@@ -0,0 +1,188 @@
+# backend/curepharma/revisions.py
+"""
+Bulk price/stock revisions (/api/medicines/revisions): a distributor's new
+MRP/PTR/GST list, or a stock count, applied to thousands of medicines at once.
+
+Each row names a medicine by id or name and gives any of mrp, ptr, gst and
+quantity; a missing or blank field is left as it is. The whole revision is
+one transaction:
+1. one SELECT (FOR UPDATE on Postgres, in id order) reads the current values
+   of every medicine named, so a concurrent sale can't slip in between;
+2. rows that change nothing are dropped, the rest are written by a single
+   statement: UPDATE ... FROM unnest(<one array per column>) on Postgres,
+   an executemany on SQLite. amount (PTR x quantity) and netvalue (amount
+   plus GST) are recomputed in the same statement from the new values, as
+   the CSV import and the stock lists store them;
+3. the changed rows are logged for sync (quantity as a delta, so sales made
+   elsewhere meanwhile still add up) and queued for the next catalogue
+   version; restocked ones resolve their shortage requests (see
+   curepharma.shortages).
+
+The response is a compact diff: [old, new] for each field that changed.
+"""
+
+import csv
+import io
+
+from sqlalchemy import ARRAY, bindparam, cast, func, or_, select, update
+
+from .catalog import mark_changed
+from .extensions import db
+from .models import Medicine
+from .salts import normalize_medicine_name
+from .shortages import mark_restocked
+from .sync import record_bulk_updates
+
+REVISION_FIELDS = {'mrp': float, 'ptr': float, 'gst': float, 'quantity': int}
+
+
+class InvalidRevision(ValueError):
+    pass
+
+
+# --- PARSING ---
+def rows_from_csv(text):
+    """Revision rows from CSV text with a header (id and/or name, then any of mrp, ptr, gst, quantity)."""
+    reader = csv.DictReader(io.StringIO(text))
+    return [{(key or '').strip().lower(): value for key, value in row.items()} for row in reader]
+
+
+def parse_revision(row):
+    """(id or None, name or None, {field: value}) for one input row."""
+    if not isinstance(row, dict):
+        raise InvalidRevision("Each row must be an object.")
+    medicine_id = row.get('id')
+    name = str(row.get('name') or '').strip() or None
+    if medicine_id not in (None, ''):
+        try:
+            medicine_id = int(medicine_id)
+        except (TypeError, ValueError):
+            raise InvalidRevision(f"Invalid id: {medicine_id}")
+    else:
+        medicine_id = None
+    if medicine_id is None and name is None:
+        raise InvalidRevision("id or name is required.")
+
+    changes = {}
+    for field, convert in REVISION_FIELDS.items():
+        value = row.get(field)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        try:
+            value = convert(float(str(value).replace('%', '').strip()))
+        except (TypeError, ValueError):
+            raise InvalidRevision(f"Invalid {field}: {value}")
+        if value < 0 or (field == 'gst' and value > 100):
+            raise InvalidRevision(f"{field} out of range: {value}")
+        changes[field] = value
+    if not changes:
+        raise InvalidRevision("Nothing to change: give mrp, ptr, gst or quantity.")
+    return medicine_id, name, changes
+
+
+# --- APPLYING ---
+def _values(new):
+    """SET values: the revised fields, amount (before GST) and netvalue (after GST) from them."""
+    amount = func.coalesce(new['ptr'], 0) * func.coalesce(new['quantity'], 0)
+    return {**new, 'amount': amount, 'netvalue': amount * (1 + func.coalesce(new['gst'], 0) / 100)}
+
+
+def _update_postgres(updates):
+    # The VALUES list is sent as one array per column and unnested server side:
+    # five bind parameters however many rows, instead of a statement to compile per chunk
+    arrays = [
+        cast(bindparam(f"new_{name}", [u[name] for u in updates], type_=ARRAY(getattr(Medicine, name).type)),
+             ARRAY(getattr(Medicine, name).type))
+        for name in ('id', *REVISION_FIELDS)
+    ]
+    revision = func.unnest(*arrays).table_valued('id', *REVISION_FIELDS).render_derived('revision')
+    # SET expressions see the old row, so the new values are spelled out again for amount/netvalue
+    new = {name: func.coalesce(revision.c[name], getattr(Medicine, name)) for name in REVISION_FIELDS}
+    db.session.execute(
+        update(Medicine).where(Medicine.id == revision.c.id).values(**_values(new)),
+        execution_options={'synchronize_session': False},
+    )
+
+
+def _update_executemany(updates):
+    table = Medicine.__table__
+    new = {name: func.coalesce(bindparam(f"new_{name}", type_=table.c[name].type), table.c[name])
+           for name in REVISION_FIELDS}
+    statement = table.update().where(table.c.id == bindparam('target_id')).values(**_values(new))
+    db.session.execute(statement, [
+        {'target_id': u['id'], **{f"new_{name}": u[name] for name in REVISION_FIELDS}} for u in updates
+    ])
+
+
+def apply_revisions(rows, dry_run=False):
+    """Validates and applies the revision rows in one transaction. Returns the summary dict."""
+    errors, wanted = [], []
+    for index, row in enumerate(rows):
+        try:
+            wanted.append((index, *parse_revision(row)))
+        except InvalidRevision as e:
+            errors.append({'row': index, 'error': str(e)})
+
+    ids = {medicine_id for _, medicine_id, _, _ in wanted if medicine_id is not None}
+    names = {name.lower() for _, medicine_id, name, _ in wanted if medicine_id is None}
+    criteria = []
+    if ids:
+        criteria.append(Medicine.id.in_(ids))
+    if names:
+        criteria.append(func.lower(Medicine.name).in_(names))
+    current = {}
+    if criteria:
+        # Ordered by id so concurrent revisions and batch bills lock rows in the same order
+        locked = select(Medicine.id, Medicine.name, *(getattr(Medicine, field) for field in REVISION_FIELDS))\
+            .where(or_(*criteria)).order_by(Medicine.id)
+        if db.engine.dialect.name == 'postgresql':
+            locked = locked.with_for_update()
+        current = {row.id: row._asdict() for row in db.session.execute(locked)}
+    by_name = {}
+    for row in current.values():
+        by_name.setdefault(row['name'].lower(), row['id'])
+
+    revised = {}  # medicine id -> (input row index, changes)
+    for index, medicine_id, name, changes in wanted:
+        target = medicine_id if medicine_id is not None else by_name.get(name.lower())
+        if target not in current:
+            errors.append({'row': index, 'error': f"Medicine not found: {medicine_id if medicine_id is not None else name}"})
+        elif target in revised:
+            errors.append({'row': index, 'error': f"Medicine {target} is already revised by row {revised[target][0]}."})
+        else:
+            revised[target] = (index, changes)
+
+    diff, updates, deltas = [], [], {}
+    for medicine_id, (_, changes) in sorted(revised.items()):
+        old = current[medicine_id]
+        changed = {field: [old[field], value] for field, value in changes.items() if old[field] != value}
+        if not changed:
+            continue
+        diff.append({'id': medicine_id, 'name': old['name'], **changed})
+        updates.append({'id': medicine_id, **{field: changes.get(field) for field in REVISION_FIELDS}})
+        if 'quantity' in changed:
+            deltas[medicine_id] = {'quantity': changes['quantity'] - (old['quantity'] or 0)}
+
+    summary = {
+        'updated': len(diff),
+        'unchanged': len(revised) - len(diff),
+        'errors': errors,
+        'changes': diff,
+        'dry_run': dry_run,
+    }
+    if dry_run or not updates:
+        db.session.rollback()
+        return summary
+
+    if db.engine.dialect.name == 'postgresql':
+        _update_postgres(updates)
+    else:
+        _update_executemany(updates)
+    changed_ids = [u['id'] for u in updates]
+    record_bulk_updates(db.session, Medicine, changed_ids, deltas)
+    mark_changed(db.session, changed_ids)
+    mark_restocked(db.session, {normalize_medicine_name(current[medicine_id]['name'])
+                                for medicine_id, delta in deltas.items()
+                                if delta['quantity'] > 0 and revised[medicine_id][1]['quantity'] > 0})
+    db.session.commit()
+    return summary
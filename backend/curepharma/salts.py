@@ -0,0 +1,205 @@
+# backend/curepharma/salts.py
+"""
+In-stock substitutes from Medicine.formula (/api/substitutes, the billing
+out-of-stock error and the shortage list).
+
+A formula such as 'Amoxycillin (500mg) + Clavulanic Acid (125mg)' is parsed
+into (salt, strength) components, both normalized: salt names lower-cased
+with counter-ions (hydrochloride, maleate, ...) and common spelling variants
+folded, strengths with g/mcg converted to mg. SaltIndex, a CatalogMirror
+(see curepharma.catalog), maps every salt to the ids of the store's medicines
+that contain it. Candidates are therefore one dict lookup per salt of the wanted
+medicine rather than a scan of the table.
+
+Candidates with stock are ranked by:
+1. match: 'exact' (same salts and strengths), then 'same_salts' (a strength
+   differs), then 'partial' (ordered by the share of salts in common);
+2. margin, (MRP - PTR) / MRP, highest first. Rows without a PTR come last.
+"""
+
+import logging
+import re
+
+from flask import current_app
+
+from .catalog import CatalogMirror, register_mirror
+from .models import Medicine
+
+logger = logging.getLogger(__name__)
+
+# Dropped from the end of a salt name: 'Cetirizine Hydrochloride' is cetirizine
+COUNTER_IONS = ('hydrochloride', 'hcl', 'hydrobromide', 'maleate', 'mesylate', 'besylate', 'besilate')
+SALT_ALIASES = {
+    'acetaminophen': 'paracetamol',
+    'amoxycillin': 'amoxicillin',
+    'cetrizine': 'cetirizine',
+    'levocetrizine': 'levocetirizine',
+}
+STRENGTH_PATTERN = r'\d+(?:\.\d+)?\s*(?:mcg|µg|mg|g|iu|ml|%)'
+COMPONENT_RE = re.compile(
+    rf'^(?P<salt>.+?)\s*(?:\((?P<strength>[^)]*)\)|(?P<inline>{STRENGTH_PATTERN}\S*))?$', re.IGNORECASE
+)
+UNIT_RE = re.compile(r'(\d+(?:\.\d+)?)(mcg|µg|mg|g|iu|ml|%)')
+MATCH_RANK = {'exact': 0, 'same_salts': 1, 'partial': 2}
+
+
+# --- PARSING ---
+def normalize_salt(name):
+    words = re.sub(r'[^a-z0-9]+', ' ', (name or '').lower()).split()
+    while len(words) > 1 and words[-1] in COUNTER_IONS:
+        words.pop()
+    salt = ' '.join(words)
+    return SALT_ALIASES.get(salt, salt)
+
+
+def _to_mg(match):
+    value, unit = float(match.group(1)), match.group(2)
+    if unit == 'g':
+        value, unit = value * 1000, 'mg'
+    elif unit in ('mcg', 'µg'):
+        value, unit = value / 1000, 'mg'
+    return f"{value:g}{unit}"
+
+
+def normalize_strength(text):
+    text = ''.join((text or '').lower().split())
+    return UNIT_RE.sub(_to_mg, text) or None
+
+
+def normalize_medicine_name(name):
+    """
+    A medicine name for matching shortage requests to stock (see
+    curepharma.shortages): 'DOLO-650 Tab.', 'dolo 650 tab' are one medicine,
+    as are 'Augmentin 1 g' and 'augmentin 1000mg'.
+    """
+    text = re.sub(r'[^a-z0-9.%µ]+|(?<!\d)\.|\.(?!\d)', ' ', (name or '').lower())
+    text = re.sub(r'(\d)\s+(?=(?:mcg|µg|mg|g|iu|ml)\b)', r'\1', text)
+    words = [UNIT_RE.sub(_to_mg, word) if UNIT_RE.fullmatch(word) else word for word in text.split()]
+    return ' '.join(words)[:120]
+
+
+def parse_formula(formula):
+    """The formula's (salt, strength) pairs as a frozenset; empty for blank or placeholder formulas."""
+    components = set()
+    for part in (formula or '').split('+'):
+        match = COMPONENT_RE.match(part.strip())
+        if not match:
+            continue
+        salt = normalize_salt(match['salt'])
+        if salt:
+            components.add((salt, normalize_strength(match['strength'] or match['inline'])))
+    return frozenset(components)
+
+
+def _margin(row):
+    mrp, ptr = row['mrp'] or 0, row['ptr'] or 0
+    if mrp <= 0 or ptr <= 0:
+        return None
+    return round((mrp - ptr) / mrp * 100, 1)
+
+
+def _match(wanted, offered):
+    """(match kind, share of salts in common) of `offered` as a substitute for `wanted`."""
+    wanted_salts = {salt for salt, _strength in wanted}
+    offered_salts = {salt for salt, _strength in offered}
+    overlap = len(wanted_salts & offered_salts) / len(wanted_salts | offered_salts)
+    if offered_salts != wanted_salts:
+        return 'partial', overlap
+    if offered == wanted or all(strength is None for _salt, strength in wanted):
+        return 'exact', overlap
+    return 'same_salts', overlap
+
+
+# --- INDEX ---
+class SaltIndex(CatalogMirror):
+    def clear(self):
+        self.rows = {}          # medicine id -> row, for medicines with a parseable formula
+        self.compositions = {}  # medicine id -> frozenset of (salt, strength)
+        self.by_salt = {}       # salt -> set of medicine ids
+        self.by_name = {}       # normalize_medicine_name(name) -> medicine id
+
+    def discard(self, medicine_id):
+        row = self.rows.pop(medicine_id, None)
+        if row is not None and self.by_name.get(normalize_medicine_name(row['name'])) == medicine_id:
+            del self.by_name[normalize_medicine_name(row['name'])]
+        for salt, _strength in self.compositions.pop(medicine_id, ()):
+            ids = self.by_salt.get(salt)
+            if ids is not None:
+                ids.discard(medicine_id)
+                if not ids:
+                    del self.by_salt[salt]
+
+    def put(self, row):
+        self.discard(row['id'])
+        composition = parse_formula(row['formula'])
+        if not composition:
+            return
+        self.rows[row['id']] = row
+        self.compositions[row['id']] = composition
+        self.by_name[normalize_medicine_name(row['name'])] = row['id']
+        for salt, _strength in composition:
+            self.by_salt.setdefault(salt, set()).add(row['id'])
+
+    def rebuild_criteria(self):
+        return (Medicine.formula.isnot(None),)
+
+    def composition_for(self, medicine_id=None, name=None, formula=None):
+        """
+        What to substitute: a known medicine's composition, else `formula` (or
+        `name`) parsed as one. Names match as normalize_medicine_name spells
+        them, so 'dolo  650 ' finds Dolo 650.
+        """
+        self.ensure_current()
+        if medicine_id is None and name:
+            medicine_id = self.by_name.get(normalize_medicine_name(name))
+        if medicine_id is not None and medicine_id in self.compositions:
+            return medicine_id, self.compositions[medicine_id]
+        return medicine_id, parse_formula(formula or name)
+
+    def substitutes(self, medicine_id=None, name=None, formula=None, min_quantity=1, limit=5):
+        """In-stock alternatives, best first, as compact dicts."""
+        exclude_id, wanted = self.composition_for(medicine_id, name, formula)
+        if not wanted:
+            return []
+        # set.union runs in C, so a concurrent refresh can't change a set mid-iteration
+        candidates = set().union(*(self.by_salt.get(salt, ()) for salt, _strength in wanted))
+        candidates.discard(exclude_id)
+
+        ranked = []
+        for candidate_id in candidates:
+            row = self.rows.get(candidate_id)
+            offered = self.compositions.get(candidate_id)
+            if row is None or offered is None or (row['quantity'] or 0) < min_quantity:
+                continue
+            kind, overlap = _match(wanted, offered)
+            margin = _margin(row)
+            ranked.append(((MATCH_RANK[kind], -overlap, margin is None, -(margin or 0), row['name']), {
+                'id': row['id'],
+                'name': row['name'],
+                'formula': row['formula'],
+                'quantity': row['quantity'],
+                'mrp': row['mrp'],
+                'margin': margin,
+                'match': kind,
+                'overlap': round(overlap, 2),
+            }))
+        ranked.sort(key=lambda item: item[0])
+        return [suggestion for _key, suggestion in ranked[:limit]]
+
+
+def get_salt_index(store_id=None):
+    """The store's (default: the current store's) index."""
+    return current_app.extensions['salt_index'].for_store(store_id)
+
+
+def suggest_substitutes(**kwargs):
+    """SaltIndex.substitutes on the app's index; never raises, so error paths can call it freely."""
+    try:
+        return get_salt_index().substitutes(**kwargs)
+    except Exception:
+        logger.exception("Error suggesting substitutes")
+        return []
+
+
+def init_app(app):
+    register_mirror(app, 'salt_index', SaltIndex)
@@ -0,0 +1,78 @@
+# backend/curepharma/scheduler.py
+"""
+Background jobs.
+
+Modules register jobs with @scheduled_job at import time; nothing is started
+until start_scheduler() runs (on the first request, see create_app). Only the
+process holding SCHEDULER_LOCK_FILE starts the scheduler, so running several
+gunicorn workers does not send every reminder once per worker. Within a
+process, concurrent first requests (threaded servers) start it once.
+"""
+
+import os
+import threading
+
+_jobs = []
+_lock_handle = None
+_start_lock = threading.Lock()
+
+
+def scheduled_job(trigger, **trigger_args):
+    """Registers a function to run inside an app context on the given APScheduler trigger."""
+    def decorator(func):
+        _jobs.append((func, trigger, trigger_args))
+        return func
+    return decorator
+
+
+def _acquire_process_lock(path):
+    """Returns an open handle holding an exclusive lock on path, or None if another process has it."""
+    handle = open(path, 'a+')
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def _run_in_context(app, func):
+    def job():
+        with app.app_context():
+            func()
+    job.__name__ = func.__name__
+    return job
+
+
+def start_scheduler(app):
+    """Starts the BackgroundScheduler for this app if enabled and not already owned elsewhere."""
+    global _lock_handle
+    if not app.config.get('SCHEDULER_ENABLED', True):
+        return None
+
+    # Held for the whole start: a second thread waits, then finds app.extensions['scheduler'] set
+    with _start_lock:
+        if 'scheduler' in app.extensions:
+            return app.extensions['scheduler']
+
+        lock_path = app.config.get('SCHEDULER_LOCK_FILE')
+        if lock_path and _lock_handle is None:
+            _lock_handle = _acquire_process_lock(lock_path)
+            if _lock_handle is None:
+                app.extensions['scheduler'] = None
+                return None
+
+        # Imported here so that app startup, CLI commands and tests don't pay for it
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        scheduler = BackgroundScheduler(daemon=True)
+        for func, trigger, trigger_args in _jobs:
+            scheduler.add_job(_run_in_context(app, func), trigger, id=func.__name__, name=func.__name__, replace_existing=True, **trigger_args)
+        scheduler.start()
+        app.extensions['scheduler'] = scheduler
+        return scheduler
@@ -0,0 +1,158 @@
+# backend/curepharma/shortages.py
+"""
+Shortage requests, grouped by medicine and resolved when stock arrives.
+
+Every request (a customer asking for something that is out of stock) is
+still one Shortage row, but requests are matched on normalized_name
+(salts.normalize_medicine_name, so 'DOLO-650 Tab' and 'dolo 650 tab' are one
+medicine). The list shows one entry per medicine with its demand and the
+customers waiting, and resolving an entry resolves all of its requests.
+
+Restocks resolve them without anyone noticing first:
+- a flush that raises a medicine's quantity above zero (the CSV import, an
+  edit, a stock transfer, a new medicine) queues the medicine's name;
+- bulk statements that raise stock report it with mark_restocked() (the
+  price/stock revisions);
+- before commit, one UPDATE per store resolves every pending request for the
+  queued names and marks those with a phone notify_status 'Queued', inside
+  the same transaction as the stock itself.
+send_restock_notifications then sends one message per waiting customer and
+marks the whole batch 'Sent' with one more UPDATE.
+
+Changes applied by sync are left alone: the node the stock arrived at
+resolves its requests and replicates them. notify_status is never
+replicated, so a customer hears from one node only.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+from itertools import groupby
+
+from sqlalchemy import and_, case, event, inspect, update
+
+from .change_stamps import mark_tables, stamp_name
+from .extensions import db
+from .helpers import default_store_id
+from .models import Medicine, Shortage
+from .postgres_profile import RoutingSession
+from .salts import normalize_medicine_name
+from .scheduler import scheduled_job
+from .sync import record_bulk_updates
+
+logger = logging.getLogger(__name__)
+
+RESTOCK_KEY = 'restocked_names'
+# Notifications sent per run; the rest wait for the next one
+NOTIFY_BATCH_SIZE = 500
+
+
+# --- RESOLVING ---
+def mark_restocked(session, names, store_id=None):
+    """Queues normalized medicine names whose stock this transaction raised without a flush (bulk statements)."""
+    store_id = store_id if store_id is not None else default_store_id()
+    session.info.setdefault(RESTOCK_KEY, {}).setdefault(store_id, set()).update(name for name in names if name)
+
+
+def resolve_requests(session, names, store_id=None, notify=False):
+    """
+    Resolves every pending request of the store for the normalized names in
+    one UPDATE, queueing a notification for those with a phone if notify.
+    Returns the ids resolved.
+    """
+    store_id = store_id if store_id is not None else default_store_id()
+    values = {'status': 'Resolved', 'resolved_date': datetime.utcnow()}
+    if notify:
+        has_phone = and_(Shortage.customer_phone.isnot(None), Shortage.customer_phone != '')
+        values['notify_status'] = case((has_phone, 'Queued'), else_=None)
+    ids = session.execute(
+        update(Shortage)
+        .where(Shortage.store_id == store_id, Shortage.status == 'Pending', Shortage.normalized_name.in_(names))
+        .values(**values).returning(Shortage.id)
+        .execution_options(all_stores=True, synchronize_session='fetch')
+    ).scalars().all()
+    if ids:
+        record_bulk_updates(session, Shortage, ids)
+        mark_tables(session, [stamp_name(Shortage.__tablename__, store_id)])
+    return ids
+
+
+def _normalize_requests(session, _flush_context, _instances):
+    """before_flush: keeps normalized_name in step with medicine_name."""
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Shortage):
+            name = normalize_medicine_name(obj.medicine_name)
+            if obj.normalized_name != name:
+                obj.normalized_name = name
+
+
+def _restocked(obj, is_new):
+    if (obj.quantity or 0) <= 0:
+        return False
+    if is_new:
+        return True
+    history = inspect(obj).attrs.quantity.history
+    if not history.added:
+        return False
+    # Without the old value (an unloaded attribute) any positive stock counts
+    return not history.deleted or (history.deleted[0] or 0) < obj.quantity
+
+
+def _collect_restocks(session, _flush_context):
+    """after_flush: queues the names of medicines this flush restocked."""
+    if session.info.get('sync_origin'):
+        return
+    restocked = defaultdict(set)
+    for obj in session.new:
+        if isinstance(obj, Medicine) and _restocked(obj, True):
+            restocked[obj.store_id].add(normalize_medicine_name(obj.name))
+    for obj in session.dirty:
+        if isinstance(obj, Medicine) and _restocked(obj, False):
+            restocked[obj.store_id].add(normalize_medicine_name(obj.name))
+    for store_id, names in restocked.items():
+        mark_restocked(session, names, store_id)
+
+
+def _resolve_restocked(session):
+    """before_commit (ahead of the change stamps): resolves the requests the transaction's restocks satisfy."""
+    session.flush()
+    pending = session.info.pop(RESTOCK_KEY, None)
+    for store_id, names in sorted((pending or {}).items()):
+        ids = resolve_requests(session, sorted(names), store_id, notify=True)
+        if ids:
+            logger.info("Restock resolved %d shortage request(s) in store %s", len(ids), store_id)
+
+
+def _forget_restocks(session, *_args):
+    session.info.pop(RESTOCK_KEY, None)
+
+
+def init_app(app):
+    # Must come before change_stamps.init_app, so the shortage stamp is bumped in the same commit
+    for name, listener in (('before_flush', _normalize_requests), ('after_flush', _collect_restocks),
+                           ('before_commit', _resolve_restocked), ('after_commit', _forget_restocks),
+                           ('after_rollback', _forget_restocks)):
+        if not event.contains(RoutingSession, name, listener):
+            event.listen(RoutingSession, name, listener)
+
+
+# --- NOTIFYING ---
+@scheduled_job('interval', minutes=5, max_instances=1, coalesce=True)
+def send_restock_notifications():
+    try:
+        queued = db.session.query(
+            Shortage.id, Shortage.store_id, Shortage.customer_name, Shortage.customer_phone, Shortage.medicine_name
+        ).filter(Shortage.notify_status == 'Queued')\
+            .order_by(Shortage.store_id, Shortage.customer_phone, Shortage.id).limit(NOTIFY_BATCH_SIZE).all()
+        if not queued:
+            return
+        for (_store_id, phone), rows in groupby(queued, key=lambda row: (row.store_id, row.customer_phone)):
+            rows = list(rows)
+            # A placeholder for the WhatsApp API, like the refill reminders
+            logger.info("Sending restock notice to %s for %s", phone, ', '.join(sorted({row.medicine_name for row in rows})))
+        db.session.query(Shortage).filter(Shortage.id.in_([row.id for row in queued]))\
+            .update({'notify_status': 'Sent'}, synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("Error sending restock notifications")
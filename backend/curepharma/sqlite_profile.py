@@ -0,0 +1,128 @@
+# backend/curepharma/sqlite_profile.py
+"""
+SQLite tuning for the desktop build (see DesktopConfig).
+
+Every pooled connection gets SQLITE_PRAGMAS applied through a connect event:
+WAL so report reads don't block billing commits, synchronous=NORMAL so a
+commit is one WAL append instead of several fsyncs, plus mmap/cache/temp_store
+sizing and a busy timeout. The scheduler runs PRAGMA optimize and an
+incremental vacuum, and backups go through the SQLite online backup API so
+they are consistent while the app keeps writing.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+
+from .extensions import db
+from .scheduler import scheduled_job
+
+
+def _is_sqlite(app):
+    return app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite')
+
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return on_connect
+
+
+def init_app(app):
+    """Hooks the pragmas onto the app's engine. No-op unless SQLITE_PRAGMAS is set and the DB is SQLite."""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas or not _is_sqlite(app):
+        return
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', _apply_pragmas(pragmas))
+    app.cli.add_command(backup_db_command)
+    app.cli.add_command(vacuum_db_command)
+
+
+# --- MAINTENANCE ---
+def optimize_database(max_pages=None):
+    """Refreshes planner statistics and returns free pages to the OS, a bounded amount at a time."""
+    if max_pages is None:
+        max_pages = current_app.config.get('SQLITE_INCREMENTAL_VACUUM_PAGES', 2000)
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA optimize")
+        # auto_vacuum 2 == INCREMENTAL; other modes need a one-off `flask vacuum-db` first
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+            conn.exec_driver_sql(f"PRAGMA incremental_vacuum({int(max_pages)})")
+        conn.commit()
+
+
+def backup_database(target_path, pages_per_step=1024):
+    """
+    Copies the live database to target_path with the SQLite backup API.
+    Copies in steps so writers are only briefly blocked. Returns target_path.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(target_path)), exist_ok=True)
+    raw = db.engine.raw_connection()
+    try:
+        target = sqlite3.connect(target_path)
+        try:
+            raw.driver_connection.backup(target, pages=pages_per_step)
+        finally:
+            target.close()
+    finally:
+        raw.close()
+    return target_path
+
+
+def prune_backups(folder, keep):
+    """Deletes all but the newest `keep` backups (names sort by timestamp)."""
+    backups = sorted(f for f in os.listdir(folder) if f.startswith('inventory-') and f.endswith('.db'))
+    for name in backups[:max(len(backups) - keep, 0)]:
+        os.remove(os.path.join(folder, name))
+
+
+@scheduled_job('interval', hours=6)
+def sqlite_maintenance():
+    if not current_app.config.get('SQLITE_PRAGMAS') or not _is_sqlite(current_app):
+        return
+    optimize_database()
+
+
+@scheduled_job('cron', hour=23, minute=30)
+def sqlite_nightly_backup():
+    folder = current_app.config.get('SQLITE_BACKUP_FOLDER')
+    if not folder or not current_app.config.get('SQLITE_PRAGMAS') or not _is_sqlite(current_app):
+        return
+    backup_database(os.path.join(folder, f"inventory-{datetime.now():%Y%m%d-%H%M%S}.db"))
+    prune_backups(folder, current_app.config.get('SQLITE_BACKUP_KEEP', 14))
+
+
+# --- CLI ---
+@click.command("backup-db")
+@click.argument("target", required=False)
+@with_appcontext
+def backup_db_command(target):
+    """Writes an online backup of the SQLite database."""
+    if not target:
+        folder = current_app.config.get('SQLITE_BACKUP_FOLDER') or current_app.config['BASE_DIR']
+        target = os.path.join(folder, f"inventory-{datetime.now():%Y%m%d-%H%M%S}.db")
+    backup_database(target)
+    print(f"✅ Backup written to {target}")
+
+
+@click.command("vacuum-db")
+@with_appcontext
+def vacuum_db_command():
+    """Switches the database to incremental auto-vacuum and rebuilds it (one-off, takes a write lock)."""
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.commit()
+    # VACUUM cannot run inside a transaction
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+    print("✅ Database vacuumed; incremental vacuum is now enabled.")
@@ -0,0 +1,216 @@
+# backend/curepharma/static_assets.py
+"""
+Serving of the React build (build/).
+
+The folder is indexed once at startup instead of being stat'ed per request:
+- Files up to STATIC_MEMORY_MAX_BYTES are held in memory, larger ones are
+  streamed from disk.
+- Pre-generated .br/.gz siblings (see `flask precompress-build`) are served
+  to clients that accept them. Small text files with no .gz are gzipped in
+  memory while indexing.
+- Hashed assets under static/ are cached as immutable for a year.
+  index.html is sent with no-cache and an ETag, so a repeat visit costs a
+  304. Other root files (manifest, icons) get STATIC_DEFAULT_MAX_AGE.
+
+A new `npm run build` is picked up on restart. In debug mode the index is
+rebuilt whenever index.html changes on disk.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+import click
+from flask import current_app, request
+from flask.cli import with_appcontext
+from werkzeug.http import is_resource_modified
+from werkzeug.wsgi import wrap_file
+
+IMMUTABLE_PREFIX = 'static/'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+INDEX_FILE = 'index.html'
+COMPRESSIBLE_SUFFIXES = ('.js', '.css', '.html', '.json', '.map', '.svg', '.txt', '.ico')
+# Preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class Variant:
+    """One encoding of a file: where it lives, how big it is and, if small, its bytes."""
+
+    __slots__ = ('file', 'size', 'body', 'etag')
+
+    def __init__(self, file, size, body, etag):
+        self.file = file
+        self.size = size
+        self.body = body
+        self.etag = etag
+
+
+class Asset:
+    __slots__ = ('path', 'mimetype', 'cache_control', 'variants')
+
+    def __init__(self, path, mimetype, cache_control):
+        self.path = path
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        # encoding ('identity', 'br', 'gzip') -> Variant
+        self.variants = {}
+
+
+def _read_variant(file, memory_max_bytes, etag_suffix=''):
+    stat = os.stat(file)
+    body = None
+    if stat.st_size <= memory_max_bytes:
+        with open(file, 'rb') as f:
+            body = f.read()
+        etag = hashlib.md5(body).hexdigest()
+    else:
+        etag = f"{int(stat.st_mtime)}-{stat.st_size}"
+    return Variant(file, stat.st_size, body, etag + etag_suffix)
+
+
+class AssetIndex:
+    def __init__(self, root, memory_max_bytes, default_max_age):
+        self.root = root
+        self.memory_max_bytes = memory_max_bytes
+        self.default_max_age = default_max_age
+        self.assets = {}
+        self.index_mtime = None
+
+    def _cache_control(self, path):
+        if path.startswith(IMMUTABLE_PREFIX):
+            return IMMUTABLE_CACHE_CONTROL
+        if path == INDEX_FILE:
+            return 'no-cache'
+        return f'public, max-age={self.default_max_age}'
+
+    def build(self):
+        assets = {}
+        if os.path.isdir(self.root):
+            for dirpath, _dirnames, filenames in os.walk(self.root):
+                names = set(filenames)
+                for name in filenames:
+                    if name.endswith(('.br', '.gz')) and name[:-3] in names:
+                        continue
+                    file = os.path.join(dirpath, name)
+                    path = os.path.relpath(file, self.root).replace(os.sep, '/')
+                    asset = Asset(path, mimetypes.guess_type(name)[0] or 'application/octet-stream', self._cache_control(path))
+                    identity = _read_variant(file, self.memory_max_bytes)
+                    asset.variants['identity'] = identity
+                    for encoding, suffix in ENCODINGS:
+                        if name + suffix in names:
+                            asset.variants[encoding] = _read_variant(file + suffix, self.memory_max_bytes, f'-{encoding}')
+                    if 'gzip' not in asset.variants and identity.body is not None and name.endswith(COMPRESSIBLE_SUFFIXES):
+                        compressed = gzip.compress(identity.body, compresslevel=9, mtime=0)
+                        if len(compressed) < identity.size:
+                            asset.variants['gzip'] = Variant(None, len(compressed), compressed, f'{identity.etag}-gzip')
+                    assets[path] = asset
+        self.assets = assets
+        self.index_mtime = self._index_mtime()
+        return self
+
+    def _index_mtime(self):
+        try:
+            return os.stat(os.path.join(self.root, INDEX_FILE)).st_mtime
+        except OSError:
+            return None
+
+    def refresh_if_changed(self):
+        if self._index_mtime() != self.index_mtime:
+            self.build()
+
+    def lookup(self, path):
+        """The asset for a request path; unknown non-asset paths get index.html (SPA routes)."""
+        path = path.strip('/') or INDEX_FILE
+        asset = self.assets.get(path)
+        if asset is None and not path.startswith(IMMUTABLE_PREFIX):
+            asset = self.assets.get(INDEX_FILE)
+        return asset
+
+
+def _choose_variant(asset):
+    accepted = request.accept_encodings
+    for encoding, _suffix in ENCODINGS:
+        if encoding in asset.variants and accepted[encoding]:
+            return encoding, asset.variants[encoding]
+    return 'identity', asset.variants['identity']
+
+
+def asset_response(asset):
+    encoding, variant = _choose_variant(asset)
+    response_class = current_app.response_class
+    if not is_resource_modified(request.environ, etag=variant.etag):
+        # Checked before opening anything, so a revalidation never touches the disk
+        response = response_class(status=304)
+    elif variant.body is not None:
+        response = response_class(variant.body, mimetype=asset.mimetype)
+    else:
+        response = response_class(
+            wrap_file(request.environ, open(variant.file, 'rb')),
+            mimetype=asset.mimetype,
+            direct_passthrough=True,
+        )
+        response.content_length = variant.size
+    if encoding != 'identity' and response.status_code == 200:
+        response.content_encoding = encoding
+    if len(asset.variants) > 1:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = asset.cache_control
+    response.set_etag(variant.etag)
+    return response
+
+
+def get_index():
+    index = current_app.extensions['static_assets']
+    if current_app.debug:
+        index.refresh_if_changed()
+    return index
+
+
+def init_app(app):
+    root = os.path.dirname(app.config['STATIC_FOLDER'])
+    app.extensions['static_assets'] = AssetIndex(
+        root,
+        app.config.get('STATIC_MEMORY_MAX_BYTES', 512 * 1024),
+        app.config.get('STATIC_DEFAULT_MAX_AGE', 3600),
+    ).build()
+    app.cli.add_command(precompress_build_command)
+
+
+# --- CLI ---
+def precompress_folder(root, min_bytes=1024):
+    """Writes .gz (and .br, when the brotli module is installed) next to every compressible file. Returns the count."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    written = 0
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            if not name.endswith(COMPRESSIBLE_SUFFIXES):
+                continue
+            file = os.path.join(dirpath, name)
+            with open(file, 'rb') as f:
+                data = f.read()
+            if len(data) < min_bytes:
+                continue
+            with open(file + '.gz', 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            written += 1
+            if brotli is not None:
+                with open(file + '.br', 'wb') as f:
+                    f.write(brotli.compress(data, quality=11))
+                written += 1
+    return written
+
+
+@click.command("precompress-build")
+@with_appcontext
+def precompress_build_command():
+    """Writes gzip/brotli variants of the React build; run after `npm run build`."""
+    root = os.path.dirname(current_app.config['STATIC_FOLDER'])
+    written = precompress_folder(root)
+    current_app.extensions['static_assets'].build()
+    print(f"✅ Wrote {written} compressed files under {root}")
@@ -0,0 +1,207 @@
+# backend/curepharma/stores.py
+"""
+Multi-store tenancy: every outlet's inventory, bills, reminders, shortages,
+advances and purchase invoices live in the same tables, partitioned by
+store_id (models.StoreScoped), with indexes that lead with it.
+
+The current store:
+- a logged-in session carries store_id (set at login, switched by admins
+  with /api/stores/select). A session from before stores gets its user's
+  store (else DEFAULT_STORE_ID) on its next request;
+- anonymous requests (the public catalogue) pick one with ?store=<id>,
+  else get DEFAULT_STORE_ID. ?store= is never honoured for a logged-in
+  session;
+- scheduled jobs and CLI commands have none, so they see every store,
+  unless they run a block in store_context(store_id);
+- views marked @all_stores (sync, shared bill links) have none either.
+
+Isolation is applied once, here, rather than in every view: while a store
+is current, every ORM SELECT/UPDATE/DELETE gets `store_id = <current>` for
+each store-scoped entity it touches (joins and archive aliases included),
+and new rows default to the current store. Statements on plain Tables
+(models.X.__table__) are not filtered; their callers either select the
+ids first through the ORM or pass store_id themselves. A query that must
+see other stores says so with .execution_options(all_stores=True).
+
+Everything derived from the partitioned tables is per store as well: change
+stamps ('medicine@2', see curepharma.change_stamps), catalogue versions and
+snapshots, the barcode and salt indexes, and report snapshots and cache keys.
+One store's writes never invalidate another's caches or wait on its locks,
+so adding outlets doesn't slow an existing one down.
+
+transfer_stock() moves stock between stores in one transaction.
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, request, session
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.orm import with_loader_criteria
+
+from .extensions import db
+from .helpers import current_store_id
+from .models import Medicine, StockTransfer, StockTransferItem, Store, StoreScoped, User
+from .postgres_profile import RoutingSession
+
+STORE_ARG = 'store'
+# Catalogue fields a store receiving stock it has never had copies from the sender
+TRANSFERRED_FIELDS = ('batch_no', 'expiry_date', 'mrp', 'ptr', 'gst', 'category', 'formula', 'image_url',
+                      'barcode', 'hsn_code')
+
+
+class InvalidTransfer(ValueError):
+    pass
+
+
+# --- CURRENT STORE ---
+@contextmanager
+def store_context(store_id):
+    """Runs the block as store_id (None: every store), e.g. a scheduled job's per-store pass."""
+    previous = g.get('store_id')
+    g.store_id = store_id
+    try:
+        yield store_id
+    finally:
+        g.store_id = previous
+
+
+def all_stores(f):
+    """Runs the view without a current store: it sees (and must itself filter) every store's rows."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.store_id = None
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def active_store_ids():
+    return db.session.execute(
+        select(Store.id).where(Store.is_active.is_(True)).order_by(Store.id)
+    ).scalars().all()
+
+
+def _select_store():
+    store_id = session.get('store_id')
+    if store_id is None and session.get('user_id') is not None:
+        user = db.session.get(User, session['user_id'])
+        store_id = (user.store_id if user is not None else None) or current_app.config.get('DEFAULT_STORE_ID', 1)
+        session['store_id'] = store_id
+    elif store_id is None:
+        store_id = request.args.get(STORE_ARG, type=int)
+    g.store_id = store_id or current_app.config.get('DEFAULT_STORE_ID', 1)
+
+
+def _scope_to_store(execute_state):
+    """do_orm_execute: restricts store-scoped entities to the current store."""
+    store_id = current_store_id()
+    if store_id is None or execute_state.execution_options.get('all_stores', False):
+        return
+    if not (execute_state.is_select or execute_state.is_update or execute_state.is_delete):
+        return
+    if execute_state.is_column_load or execute_state.is_relationship_load:
+        return
+    execute_state.statement = execute_state.statement.options(
+        with_loader_criteria(StoreScoped, lambda cls: cls.store_id == store_id, include_aliases=True)
+    )
+
+
+# --- TRANSFERS ---
+def parse_transfer_lines(lines):
+    """{medicine id: quantity} from [{"medicine_id", "quantity"}]; repeated ids are added up."""
+    if not isinstance(lines, list) or not lines:
+        raise InvalidTransfer("Give a non-empty list of items.")
+    wanted = {}
+    for line in lines:
+        try:
+            medicine_id = int(line['medicine_id'])
+            quantity = int(line['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidTransfer(f"Invalid item {line!r}")
+        if quantity <= 0:
+            raise InvalidTransfer(f"Quantity for medicine {medicine_id} must be positive")
+        wanted[medicine_id] = wanted.get(medicine_id, 0) + quantity
+    return wanted
+
+
+def transfer_stock(to_store_id, lines, notes=None, user_id=None):
+    """
+    Moves stock from the current store to to_store_id in one transaction and
+    returns the StockTransfer. The receiving store's row is matched by name
+    (case-insensitive) and created from the sender's when it has none.
+    Raises InvalidTransfer, having changed nothing, if any line can't be met.
+    """
+    from_store_id = current_store_id()
+    if from_store_id is None:
+        raise InvalidTransfer("No current store to transfer from.")
+    if to_store_id == from_store_id:
+        raise InvalidTransfer("Choose a different store to transfer to.")
+    destination = db.session.get(Store, to_store_id)
+    if destination is None or not destination.is_active:
+        raise InvalidTransfer(f"Store {to_store_id} not found.")
+    wanted = parse_transfer_lines(lines)
+
+    names = db.session.execute(
+        select(Medicine.id, Medicine.name).where(Medicine.id.in_(wanted))
+    ).all()
+    names = {medicine_id: name for medicine_id, name in names}
+    missing = sorted(set(wanted) - set(names))
+    if missing:
+        raise InvalidTransfer(f"Medicines not found in this store: {', '.join(map(str, missing))}")
+
+    # Both stores' rows in one statement, in id order, so opposite transfers
+    # (and batch bills) lock them in the same order
+    locked = Medicine.query.execution_options(all_stores=True).filter(or_(
+        Medicine.id.in_(wanted),
+        (Medicine.store_id == to_store_id) & func.lower(Medicine.name).in_({name.lower() for name in names.values()}),
+    )).order_by(Medicine.id)
+    if db.engine.dialect.name == 'postgresql':
+        locked = locked.with_for_update()
+    sources, targets = {}, {}
+    for medicine in locked:
+        if medicine.id in wanted and medicine.store_id == from_store_id:
+            sources[medicine.id] = medicine
+        elif medicine.store_id == to_store_id:
+            targets.setdefault(medicine.name.lower(), medicine)
+
+    short = [f"{sources[medicine_id].name} (have {sources[medicine_id].quantity or 0}, need {quantity})"
+             for medicine_id, quantity in sorted(wanted.items()) if (sources[medicine_id].quantity or 0) < quantity]
+    if short:
+        db.session.rollback()
+        raise InvalidTransfer(f"Not enough stock: {'; '.join(short)}")
+
+    # A barcode the receiving store already uses for another product isn't copied
+    codes = {source.barcode for source in sources.values() if source.barcode}
+    taken_codes = set(db.session.execute(
+        select(Medicine.barcode).where(Medicine.store_id == to_store_id, Medicine.barcode.in_(codes))
+        .execution_options(all_stores=True)
+    ).scalars()) if codes else set()
+
+    transfer = StockTransfer(from_store_id=from_store_id, to_store_id=to_store_id, notes=notes, user_id=user_id)
+    for medicine_id, quantity in sorted(wanted.items()):
+        source = sources[medicine_id]
+        target = targets.get(source.name.lower())
+        if target is None:
+            target = Medicine(store_id=to_store_id, name=source.name, quantity=0, freeqty=0,
+                              **{field: getattr(source, field) for field in TRANSFERRED_FIELDS})
+            if target.barcode in taken_codes:
+                target.barcode = None
+            db.session.add(target)
+            targets[source.name.lower()] = target
+        source.quantity = (source.quantity or 0) - quantity
+        target.quantity = (target.quantity or 0) + quantity
+        source.update_value()
+        target.update_value()
+        transfer.items.append(StockTransferItem(medicine_name=source.name, quantity=quantity, from_medicine_id=source.id))
+    db.session.add(transfer)
+    db.session.flush()
+    for item in transfer.items:
+        item.to_medicine_id = targets[item.medicine_name.lower()].id
+    db.session.commit()
+    return transfer
+
+
+def init_app(app):
+    app.before_request(_select_store)
+    if not event.contains(RoutingSession, 'do_orm_execute', _scope_to_store):
+        event.listen(RoutingSession, 'do_orm_execute', _scope_to_store)
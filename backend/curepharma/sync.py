@@ -0,0 +1,387 @@
+# backend/curepharma/sync.py
+"""
+Incremental replication between the desktop (SQLite) and cloud (Postgres) databases.
+
+Change tracking: an after_flush listener appends one SyncChange per inserted,
+updated or deleted SyncTracked row, holding a JSON snapshot of the row (parent
+ids replaced by the parent's sync_uid) and, for additive columns such as
+Medicine.quantity, the delta applied by this flush.
+
+Replication: the desktop pushes its own changes to the cloud's
+/api/sync/push and pulls everyone else's from /api/sync/pull, in batches,
+from the scheduler (see sync_with_remote). Applied changes are logged with
+the origin they came from, so they are never echoed back.
+
+Conflict rules when a change is applied:
+- additive columns (stock quantity) add the remote delta to the local value,
+  so sales made on both sides while offline are all deducted;
+- every other column is last-writer-wins on updated_at;
+- a Medicine not known by sync_uid is matched by name, within the row's
+  store, before inserting.
+
+Each desktop belongs to one store (its DEFAULT_STORE_ID) and pulls only that
+store's changes: every SyncChange records the store of the row it logs.
+"""
+
+import json
+import logging
+import socket
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import Date, DateTime, event, inspect
+
+from .extensions import db
+from .helpers import default_store_id
+from .models import (
+    Medicine, Reminder, CustomerInvoice, CustomerInvoiceItem, PurchaseInvoice,
+    AdvancePayment, Shortage, SyncChange, SyncCursor,
+)
+from .postgres_profile import RoutingSession
+from .scheduler import scheduled_job
+
+logger = logging.getLogger(__name__)
+
+# Parents first, so a batch never references a row it hasn't created yet
+TRACKED_MODELS = [Medicine, CustomerInvoice, CustomerInvoiceItem, Reminder, Shortage, AdvancePayment, PurchaseInvoice]
+MODELS_BY_TABLE = {model.__tablename__: model for model in TRACKED_MODELS}
+TABLE_RANK = {model: rank for rank, model in enumerate(TRACKED_MODELS)}
+
+# Foreign keys travel as the parent's sync_uid
+PARENT_KEYS = {
+    CustomerInvoiceItem: {'invoice_id': CustomerInvoice},
+    Reminder: {'invoice_id': CustomerInvoice},
+}
+ADDITIVE_COLUMNS = {Medicine: ('quantity',)}
+NATURAL_KEYS = {Medicine: 'name'}
+# Never replicated: the row id and per-database bookkeeping (see curepharma.catalog
+# and curepharma.shortages)
+LOCAL_COLUMNS = ('id', 'catalog_version', 'notify_status')
+
+
+def node_id():
+    return current_app.config.get('SYNC_NODE_ID') or socket.gethostname()
+
+
+# --- CHANGE TRACKING ---
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _decode(column, value):
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    return value
+
+
+def _parent_uid(session, parent_model, parent_id):
+    if parent_id is None:
+        return None
+    parent = session.get(parent_model, parent_id)
+    return parent.sync_uid if parent is not None else None
+
+
+def snapshot(session, obj):
+    """The row as a JSON-safe dict, without its local id."""
+    model = type(obj)
+    parents = PARENT_KEYS.get(model, {})
+    row = {}
+    for column in model.__table__.columns:
+        if column.key in LOCAL_COLUMNS:
+            continue
+        value = getattr(obj, column.key)
+        if column.key in parents:
+            row[column.key.replace('_id', '_uid')] = _parent_uid(session, parents[column.key], value)
+        else:
+            row[column.key] = _encode(value)
+    return row
+
+
+def _deltas(obj):
+    deltas = {}
+    state = inspect(obj)
+    for key in ADDITIVE_COLUMNS.get(type(obj), ()):
+        history = state.attrs[key].history
+        if history.added and history.deleted:
+            deltas[key] = (history.added[0] or 0) - (history.deleted[0] or 0)
+    return deltas
+
+
+def record_changes(session, _flush_context):
+    """after_flush: logs every SyncTracked row touched by this flush."""
+    origin = session.info.get('sync_origin') or node_id()
+    entries = []
+
+    touched = [(obj, 'insert') for obj in session.new] + [(obj, 'delete') for obj in session.deleted]
+    touched += [(obj, 'update') for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    touched = [(obj, op) for obj, op in touched if type(obj) in TABLE_RANK]
+    touched.sort(key=lambda item: TABLE_RANK[type(item[0])])
+
+    for obj, operation in touched:
+        payload = None
+        if operation != 'delete':
+            payload = json.dumps({'row': snapshot(session, obj), 'deltas': _deltas(obj), 'created': operation == 'insert'})
+            operation = 'upsert'
+        entries.append({
+            'table_name': obj.__tablename__,
+            'row_uid': obj.sync_uid,
+            'operation': operation,
+            'payload': payload,
+            'origin': origin,
+            'store_id': obj.store_id,
+            'created_at': datetime.utcnow(),
+        })
+    if entries:
+        session.connection().execute(SyncChange.__table__.insert(), entries)
+
+
+def record_bulk_inserts(session, model, rows):
+    """
+    Logs rows written with a bulk INSERT, which after_flush never sees.
+    `rows` are the inserted value dicts; each must carry its sync_uid. Missing
+    columns are logged with their scalar default, parent ids as parent uids.
+    """
+    origin = session.info.get('sync_origin') or node_id()
+    parents = PARENT_KEYS.get(model, {})
+    parent_uids = {}
+    for key, parent_model in parents.items():
+        ids = {row[key] for row in rows if row.get(key) is not None}
+        if ids:
+            parent_uids[key] = dict(session.query(parent_model.id, parent_model.sync_uid).filter(parent_model.id.in_(ids)))
+
+    entries = []
+    for row in rows:
+        snapshot_row = {}
+        for column in model.__table__.columns:
+            if column.key in LOCAL_COLUMNS:
+                continue
+            value = row.get(column.key)
+            if column.key not in row and column.default is not None and column.default.is_scalar:
+                value = column.default.arg
+            if column.key in parents:
+                snapshot_row[column.key.replace('_id', '_uid')] = parent_uids.get(column.key, {}).get(value)
+            else:
+                snapshot_row[column.key] = _encode(value)
+        entries.append({
+            'table_name': model.__tablename__,
+            'row_uid': row['sync_uid'],
+            'operation': 'upsert',
+            'payload': json.dumps({'row': snapshot_row, 'deltas': {}, 'created': True}),
+            'origin': origin,
+            'store_id': row.get('store_id') or default_store_id(),
+            'created_at': datetime.utcnow(),
+        })
+    if entries:
+        session.connection().execute(SyncChange.__table__.insert(), entries)
+
+
+def record_bulk_updates(session, model, ids, deltas=None):
+    """
+    Logs rows changed with a bulk UPDATE, which after_flush never sees. Each
+    row is re-read after the statement; `deltas` maps a row id to its
+    additive column deltas, e.g. {'quantity': -3}.
+    """
+    if not ids:
+        return
+    origin = session.info.get('sync_origin') or node_id()
+    parents = PARENT_KEYS.get(model, {})
+    table = model.__table__
+    rows = session.connection().execute(table.select().where(table.c.id.in_(ids))).mappings().all()
+    parent_uids = {}
+    for key, parent_model in parents.items():
+        parent_ids = {row[key] for row in rows if row[key] is not None}
+        if parent_ids:
+            parent_uids[key] = dict(session.query(parent_model.id, parent_model.sync_uid).filter(parent_model.id.in_(parent_ids)))
+
+    entries = []
+    for row in rows:
+        snapshot_row = {}
+        for column in table.columns:
+            if column.key in LOCAL_COLUMNS:
+                continue
+            if column.key in parents:
+                snapshot_row[column.key.replace('_id', '_uid')] = parent_uids.get(column.key, {}).get(row[column.key])
+            else:
+                snapshot_row[column.key] = _encode(row[column.key])
+        entries.append({
+            'table_name': model.__tablename__,
+            'row_uid': row['sync_uid'],
+            'operation': 'upsert',
+            'payload': json.dumps({'row': snapshot_row, 'deltas': (deltas or {}).get(row['id'], {}), 'created': False}),
+            'origin': origin,
+            'store_id': row['store_id'],
+            'created_at': datetime.utcnow(),
+        })
+    session.connection().execute(SyncChange.__table__.insert(), entries)
+
+
+def init_app(app):
+    if not event.contains(RoutingSession, 'after_flush', record_changes):
+        event.listen(RoutingSession, 'after_flush', record_changes)
+
+
+# --- APPLYING CHANGES ---
+def _find_local(model, uid, row):
+    obj = model.query.filter_by(sync_uid=uid).first()
+    if obj is None and model in NATURAL_KEYS and row:
+        key = NATURAL_KEYS[model]
+        # Natural keys are unique per store: never adopt another store's row
+        store_id = row.get('store_id') or default_store_id()
+        obj = model.query.filter(model.store_id == store_id, getattr(model, key) == row.get(key)).first()
+    return obj
+
+
+def _apply_one(change):
+    model = MODELS_BY_TABLE.get(change['table'])
+    if model is None:
+        return 'skipped'
+
+    payload = json.loads(change['payload']) if change.get('payload') else {}
+    row = payload.get('row', {})
+    deltas = payload.get('deltas', {})
+    local = _find_local(model, change['uid'], row)
+
+    if change['op'] == 'delete':
+        if local is not None:
+            db.session.delete(local)
+        return 'applied'
+
+    values = {}
+    for parent_key, parent_model in PARENT_KEYS.get(model, {}).items():
+        parent_uid = row.get(parent_key.replace('_id', '_uid'))
+        parent = parent_model.query.filter_by(sync_uid=parent_uid).first() if parent_uid else None
+        if parent_uid and parent is None:
+            return 'orphan'
+        values[parent_key] = parent.id if parent else None
+    for column in model.__table__.columns:
+        if column.key in row:
+            values[column.key] = _decode(column, row[column.key])
+
+    additive = ADDITIVE_COLUMNS.get(model, ())
+    if local is None:
+        values['sync_uid'] = change['uid']
+        db.session.add(model(**values))
+        return 'applied'
+
+    for key in additive:
+        if key in deltas:
+            setattr(local, key, (getattr(local, key) or 0) + deltas[key])
+        elif payload.get('created') and local.sync_uid != change['uid'] and key in values:
+            # Same medicine created independently on both sides: stock adds up
+            setattr(local, key, (getattr(local, key) or 0) + (values[key] or 0))
+
+    remote_updated = values.get('updated_at')
+    if local.updated_at is None or (remote_updated is not None and remote_updated >= local.updated_at):
+        for key, value in values.items():
+            if key not in additive and key != 'sync_uid':
+                setattr(local, key, value)
+    return 'applied'
+
+
+def apply_changes(changes, origin):
+    """Applies a batch of change dicts in one transaction. Returns a count per outcome."""
+    outcomes = {'applied': 0, 'skipped': 0, 'orphan': 0}
+    db.session.info['sync_origin'] = origin
+    try:
+        for change in changes:
+            outcomes[_apply_one(change)] += 1
+            # Flush per change so later changes in the batch see earlier inserts
+            db.session.flush()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        db.session.info.pop('sync_origin', None)
+    return outcomes
+
+
+def changes_since(last_id, limit, only_origin=None):
+    query = SyncChange.query.filter(SyncChange.id > last_id)
+    if only_origin:
+        query = query.filter(SyncChange.origin == only_origin)
+    return query.order_by(SyncChange.id).limit(limit).all()
+
+
+def pull_batch(since, limit, node, store_id):
+    """
+    The next page of the log for `node`, a desktop of store_id: that store's
+    changes minus the node's own. last_id covers the filtered-out rows too,
+    so the caller's cursor always advances.
+    """
+    scanned = changes_since(since, limit)
+    return {
+        'changes': [c.to_dict() for c in scanned if c.origin != node and c.store_id in (None, store_id)],
+        'last_id': scanned[-1].id if scanned else since,
+        'has_more': len(scanned) == limit,
+    }
+
+
+# --- CLIENT (desktop side) ---
+def _cursor_for(peer):
+    cursor = db.session.get(SyncCursor, peer)
+    if cursor is None:
+        cursor = SyncCursor(peer=peer, last_pushed_id=0, last_pulled_id=0)
+        db.session.add(cursor)
+        db.session.commit()
+    return cursor
+
+
+def sync_with_remote(http=None):
+    """Pushes local changes to SYNC_REMOTE_URL, then pulls remote ones. Returns counts."""
+    import requests
+
+    config = current_app.config
+    remote = config['SYNC_REMOTE_URL'].rstrip('/')
+    batch_size = config.get('SYNC_BATCH_SIZE', 500)
+    headers = {'X-Sync-Token': config.get('SYNC_TOKEN') or ''}
+    timeout = config.get('SYNC_TIMEOUT_SECONDS', 10)
+    http = http or requests
+    me = node_id()
+    cursor = _cursor_for(remote)
+    pushed = pulled = 0
+
+    while True:
+        batch = changes_since(cursor.last_pushed_id, batch_size, only_origin=me)
+        if not batch:
+            break
+        response = http.post(f"{remote}/api/sync/push", json={'node': me, 'changes': [c.to_dict() for c in batch]},
+                             headers=headers, timeout=timeout)
+        response.raise_for_status()
+        cursor.last_pushed_id = batch[-1].id
+        db.session.commit()
+        pushed += len(batch)
+
+    while True:
+        response = http.get(f"{remote}/api/sync/pull", headers=headers, timeout=timeout, params={
+            'since': cursor.last_pulled_id, 'node': me, 'limit': batch_size, 'store': config.get('DEFAULT_STORE_ID', 1),
+        })
+        response.raise_for_status()
+        data = response.json()
+        if data['changes']:
+            apply_changes(data['changes'], origin=remote)
+            pulled += len(data['changes'])
+        cursor.last_pulled_id = data['last_id']
+        db.session.commit()
+        if not data['has_more']:
+            break
+
+    return {'pushed': pushed, 'pulled': pulled}
+
+
+@scheduled_job('interval', seconds=15, max_instances=1, coalesce=True)
+def replicate():
+    if not current_app.config.get('SYNC_REMOTE_URL'):
+        return
+    try:
+        sync_with_remote()
+    except Exception as e:
+        # Offline is the normal case at the counter; try again next tick
+        db.session.rollback()
+        logger.warning("Sync with remote failed: %s", e)
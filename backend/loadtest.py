@@ -0,0 +1,286 @@
+# backend/loadtest.py
+"""
+Replays the real request mix from an access log against a running instance.
+
+    python loadtest.py app.log --base-url http://127.0.0.1:5001 \
+        --concurrency 8 --duration 60 --phone 9999999999 --password secret
+
+Both werkzeug lines (as written to app.log) and gunicorn's default access
+format are understood. Only requests that can be replayed without a body are
+sent (GET/HEAD), plus POST /api/login which is replayed with the supplied
+credentials. Everything else is listed as skipped in the mix summary.
+"""
+
+# --- IMPORTS ---
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+
+# Matches the request/status part shared by werkzeug and gunicorn lines:
+#   "GET /api/check_session HTTP/1.1" 401 -
+REQUEST_LINE = re.compile(
+    r'"(?P<method>[A-Z]+) (?P<path>\S+) HTTP/[0-9.]+" (?P<status>\d{3}) '
+)
+
+REPLAYABLE_METHODS = {'GET', 'HEAD'}
+LOGIN_PATH = '/api/login'
+
+DATE_SEGMENT = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+INT_SEGMENT = re.compile(r'^\d+$')
+
+
+# --- LOG PARSING ---
+def parse_log_line(line):
+    """Returns (method, path, status) for an access log line, or None."""
+    match = REQUEST_LINE.search(ANSI_ESCAPE.sub('', line))
+    if not match:
+        return None
+    return match.group('method'), match.group('path'), int(match.group('status'))
+
+
+def route_for(path):
+    """Collapses ids and dates so /api/medicines/12 and /api/medicines/40 share a bucket."""
+    path = path.split('?', 1)[0]
+    segments = []
+    for segment in path.split('/'):
+        if DATE_SEGMENT.match(segment):
+            segments.append('<date>')
+        elif INT_SEGMENT.match(segment):
+            segments.append('<int>')
+        else:
+            segments.append(segment)
+    return '/'.join(segments) or '/'
+
+
+def build_request_mix(lines, include_static=False):
+    """
+    Counts replayable (method, path) pairs from log lines.
+    Returns (mix, skipped) where both are Counters.
+    """
+    mix = Counter()
+    skipped = Counter()
+    for line in lines:
+        parsed = parse_log_line(line)
+        if not parsed:
+            continue
+        method, path, _status = parsed
+        if not include_static and not path.startswith('/api/'):
+            continue
+        if method in REPLAYABLE_METHODS or (method == 'POST' and path == LOGIN_PATH):
+            mix[(method, path)] += 1
+        else:
+            skipped[(method, route_for(path))] += 1
+    return mix, skipped
+
+
+# --- REPLAY ---
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+class Recorder:
+    """Thread-safe collector of per-route latencies and outcomes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.client_errors = Counter()
+        self.server_errors = Counter()
+
+    def record(self, route, elapsed_ms, status):
+        with self._lock:
+            self.latencies[route].append(elapsed_ms)
+            if status is None or status >= 500:
+                self.server_errors[route] += 1
+            elif status >= 400:
+                self.client_errors[route] += 1
+
+
+def login(http, base_url, phone, password, timeout):
+    response = http.post(f"{base_url}{LOGIN_PATH}", json={'phone': phone, 'password': password}, timeout=timeout)
+    return response.status_code
+
+
+def run_worker(base_url, population, weights, args, recorder, deadline, budget, rng):
+    http = requests.Session()
+    if args.phone and args.password:
+        status = login(http, base_url, args.phone, args.password, args.timeout)
+        if status != 200:
+            print(f"Login failed for worker session (HTTP {status}); continuing unauthenticated.", file=sys.stderr)
+
+    while time.perf_counter() < deadline and budget.take():
+        method, path = rng.choices(population, weights)[0]
+        route = f"{method} {route_for(path)}"
+        started = time.perf_counter()
+        try:
+            if method == 'POST' and path == LOGIN_PATH:
+                status = login(http, base_url, args.phone, args.password, args.timeout)
+            else:
+                status = http.request(method, f"{base_url}{path}", timeout=args.timeout).status_code
+        except requests.RequestException:
+            status = None
+        recorder.record(route, (time.perf_counter() - started) * 1000, status)
+
+
+class RequestBudget:
+    """Caps the total number of requests across workers (None means unlimited)."""
+
+    def __init__(self, limit):
+        self._remaining = limit
+        self._lock = threading.Lock()
+
+    def take(self):
+        if self._remaining is None:
+            return True
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+
+def replay(mix, args):
+    population = list(mix.keys())
+    weights = list(mix.values())
+    recorder = Recorder()
+    budget = RequestBudget(args.requests)
+    base_url = args.base_url.rstrip('/')
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [
+        threading.Thread(
+            target=run_worker,
+            args=(base_url, population, weights, args, recorder, deadline, budget, random.Random(args.seed + i)),
+            daemon=True,
+        )
+        for i in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - started
+
+
+# --- REPORTING ---
+def summarize(recorder, elapsed):
+    """Builds the report dict: overall throughput plus per-route latency and error rates."""
+    routes = {}
+    total = 0
+    total_errors = 0
+    for route, values in sorted(recorder.latencies.items()):
+        values.sort()
+        count = len(values)
+        total += count
+        total_errors += recorder.server_errors[route]
+        routes[route] = {
+            'requests': count,
+            'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(values, 50), 2),
+            'p95_ms': round(percentile(values, 95), 2),
+            'p99_ms': round(percentile(values, 99), 2),
+            'client_error_rate': round(recorder.client_errors[route] / count, 4),
+            'error_rate': round(recorder.server_errors[route] / count, 4),
+        }
+    return {
+        'elapsed_s': round(elapsed, 2),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(total_errors / total, 4) if total else 0.0,
+        'routes': routes,
+    }
+
+
+def print_mix(mix, skipped):
+    total = sum(mix.values())
+    print(f"Request mix ({total} replayable requests):")
+    by_route = Counter()
+    for (method, path), count in mix.items():
+        by_route[f"{method} {route_for(path)}"] += count
+    for route, count in by_route.most_common():
+        print(f"  {count / total:7.2%}  {route}")
+    if skipped:
+        print("Skipped (no request body in access log):")
+        for (method, route), count in skipped.most_common():
+            print(f"  {count:7d}  {method} {route}")
+
+
+def print_report(report):
+    print(f"\n{report['requests']} requests in {report['elapsed_s']}s "
+          f"-> {report['throughput_rps']} req/s, error rate {report['error_rate']:.2%}")
+    header = f"{'route':<48}{'reqs':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'4xx':>8}{'err':>8}"
+    print(header)
+    print('-' * len(header))
+    for route, stats in report['routes'].items():
+        print(f"{route[:47]:<48}{stats['requests']:>7}{stats['throughput_rps']:>9}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+              f"{stats['client_error_rate']:>8.1%}{stats['error_rate']:>8.1%}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay an access log's request mix against a running app.")
+    parser.add_argument('logs', nargs='+', help="werkzeug or gunicorn access log file(s)")
+    parser.add_argument('--base-url', default='http://127.0.0.1:5001')
+    parser.add_argument('--concurrency', type=int, default=4, help="parallel client sessions")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds to run")
+    parser.add_argument('--requests', type=int, default=None, help="stop after this many requests")
+    parser.add_argument('--timeout', type=float, default=10.0, help="per-request timeout in seconds")
+    parser.add_argument('--phone', default=os.environ.get('LOADTEST_PHONE'), help="login phone for authenticated sessions")
+    parser.add_argument('--password', default=os.environ.get('LOADTEST_PASSWORD'))
+    parser.add_argument('--include-static', action='store_true', help="also replay non-/api paths")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', dest='json_path', help="also write the report to this file")
+    parser.add_argument('--dry-run', action='store_true', help="only print the parsed request mix")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    mix, skipped = Counter(), Counter()
+    for log_path in args.logs:
+        with open(log_path, encoding='utf-8', errors='replace') as log_file:
+            file_mix, file_skipped = build_request_mix(log_file, args.include_static)
+        mix.update(file_mix)
+        skipped.update(file_skipped)
+
+    if ('POST', LOGIN_PATH) in mix and not (args.phone and args.password):
+        print("Log contains logins but no --phone/--password given; dropping them from the mix.", file=sys.stderr)
+        del mix[('POST', LOGIN_PATH)]
+
+    if not mix:
+        print("No replayable requests found in the given logs.", file=sys.stderr)
+        return 1
+
+    print_mix(mix, skipped)
+    if args.dry_run:
+        return 0
+
+    recorder, elapsed = replay(mix, args)
+    report = summarize(recorder, elapsed)
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as out:
+            json.dump(report, out, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""Add stores and partition store data by store_id
+
+Revision ID: 1409d8e47354
+Revises: 0e03c3a6a3d6
+Create Date: 2026-10-19 23:05:12.418530
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1409d8e47354'
+down_revision = '0e03c3a6a3d6'
+branch_labels = None
+depends_on = None
+
+STORE_TABLES = [
+    'medicine', 'customer_invoice', 'customer_invoice_item', 'reminder',
+    'shortage', 'advance_payment', 'purchase_invoice',
+]
+ARCHIVE_TABLES = [
+    'customer_invoice_archive', 'customer_invoice_item_archive', 'reminder_archive',
+    'shortage_archive', 'advance_payment_archive',
+]
+STORE_INDEXES = [
+    ('ix_customer_invoice_store_bill_date', 'customer_invoice', ['store_id', 'bill_date']),
+    ('ix_customer_invoice_store_customer_phone', 'customer_invoice', ['store_id', 'customer_phone']),
+    ('ix_customer_invoice_store_status', 'customer_invoice', ['store_id', 'status']),
+    ('ix_customer_invoice_item_store_invoice', 'customer_invoice_item', ['store_id', 'invoice_id']),
+    ('ix_reminder_store_status_date', 'reminder', ['store_id', 'status', 'reminder_date']),
+    ('ix_shortage_store_status_date', 'shortage', ['store_id', 'status', 'requested_date']),
+    ('ix_advance_payment_store_delivered_date', 'advance_payment', ['store_id', 'is_delivered', 'created_date']),
+    ('ix_purchase_invoice_store_date', 'purchase_invoice', ['store_id', 'invoice_date']),
+    ('ix_medicine_store_catalog_version', 'medicine', ['store_id', 'catalog_version']),
+    ('ix_catalog_tombstone_store_version', 'catalog_tombstone', ['store_id', 'version']),
+]
+# Stamps that become store 1's: the store tables', the catalogue's and the sales months'
+STORE_STAMPS = STORE_TABLES + ['catalog_tombstones']
+
+
+def _change_stamp():
+    return sa.table('change_stamp', sa.column('name', sa.String))
+
+
+def _create_report_snapshot(*store_column):
+    op.create_table('report_snapshot',
+    *store_column,
+    sa.Column('report', sa.String(length=40), nullable=False),
+    sa.Column('period', sa.String(length=40), nullable=False),
+    sa.Column('params', sa.String(length=200), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=True),
+    sa.Column('end_date', sa.Date(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint(*(['store_id'] if store_column else []), 'report', 'period', 'params')
+    )
+
+
+def _name_constraint(table, columns):
+    """The name of the UNIQUE constraint on exactly these columns (None on SQLite, which leaves it unnamed)."""
+    for constraint in sa.inspect(op.get_bind()).get_unique_constraints(table):
+        if constraint['column_names'] == columns:
+            return constraint['name']
+    return None
+
+
+def upgrade():
+    store = op.create_table('store',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(length=20), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('admin_phones', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code')
+    )
+    # Everything so far belongs to the one shop there was; its admins were a hard-coded list
+    op.bulk_insert(store, [{'id': 1, 'code': 'MAIN', 'name': 'Main Store', 'admin_phones': '917702164957',
+                            'is_active': True, 'created_at': datetime.utcnow()}])
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("SELECT setval(pg_get_serial_sequence('store', 'id'), (SELECT MAX(id) FROM store))")
+
+    for table in STORE_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('store_id', sa.Integer(), server_default='1', nullable=False))
+            batch_op.create_foreign_key(f'fk_{table}_store_id_store', 'store', ['store_id'], ['id'])
+    for table in ARCHIVE_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('store_id', sa.Integer(), server_default='1', nullable=True))
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('store_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_user_store_id_store', 'store', ['store_id'], ['id'])
+    with op.batch_alter_table('catalog_tombstone', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('store_id', sa.Integer(), server_default='1', nullable=False))
+        batch_op.drop_index('ix_catalog_tombstone_version')
+
+    # Medicine names and barcodes become unique per store
+    name_constraint = _name_constraint('medicine', ['name'])
+    naming_convention = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+    with op.batch_alter_table('medicine', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint(name_constraint or 'uq_medicine_name', type_='unique')
+        batch_op.drop_index('ix_medicine_barcode')
+        batch_op.drop_index('ix_medicine_catalog_version')
+        batch_op.create_unique_constraint('uq_medicine_store_name', ['store_id', 'name'])
+        batch_op.create_index('ix_medicine_store_barcode', ['store_id', 'barcode'], unique=True)
+    for name, table, columns in STORE_INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+    # A cache: rebuilt per store by the scheduler
+    op.drop_table('report_snapshot')
+    _create_report_snapshot(sa.Column('store_id', sa.Integer(), server_default='1', autoincrement=False, nullable=False))
+
+    change_stamp = _change_stamp()
+    op.execute(change_stamp.update()
+               .where(sa.or_(change_stamp.c.name.in_(STORE_STAMPS), change_stamp.c.name.like('sales:%')))
+               .values(name=change_stamp.c.name + '@1'))
+
+    op.create_table('stock_transfer',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('from_store_id', sa.Integer(), nullable=False),
+    sa.Column('to_store_id', sa.Integer(), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['from_store_id'], ['store.id'], ),
+    sa.ForeignKeyConstraint(['to_store_id'], ['store.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stock_transfer_from_store_date', 'stock_transfer', ['from_store_id', 'created_at'], unique=False)
+    op.create_index('ix_stock_transfer_to_store_date', 'stock_transfer', ['to_store_id', 'created_at'], unique=False)
+    op.create_table('stock_transfer_item',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('transfer_id', sa.Integer(), nullable=False),
+    sa.Column('medicine_name', sa.String(length=120), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('from_medicine_id', sa.Integer(), nullable=True),
+    sa.Column('to_medicine_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['transfer_id'], ['stock_transfer.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stock_transfer_item_transfer_id'), 'stock_transfer_item', ['transfer_id'], unique=False)
+
+
+def downgrade():
+    # Only store 1's data fits the single-store schema; other stores must be removed first
+    op.drop_index(op.f('ix_stock_transfer_item_transfer_id'), table_name='stock_transfer_item')
+    op.drop_table('stock_transfer_item')
+    op.drop_index('ix_stock_transfer_to_store_date', table_name='stock_transfer')
+    op.drop_index('ix_stock_transfer_from_store_date', table_name='stock_transfer')
+    op.drop_table('stock_transfer')
+
+    change_stamp = _change_stamp()
+    op.execute(change_stamp.delete().where(change_stamp.c.name.like('%@%'), ~change_stamp.c.name.like('%@1')))
+    op.execute(change_stamp.update().where(change_stamp.c.name.like('%@1'))
+               .values(name=sa.func.substr(change_stamp.c.name, 1, sa.func.length(change_stamp.c.name) - 2)))
+
+    op.drop_table('report_snapshot')
+    _create_report_snapshot()
+
+    for name, table, _columns in reversed(STORE_INDEXES):
+        op.drop_index(name, table_name=table)
+    with op.batch_alter_table('medicine', schema=None) as batch_op:
+        batch_op.drop_index('ix_medicine_store_barcode')
+        batch_op.drop_constraint('uq_medicine_store_name', type_='unique')
+        batch_op.create_index('ix_medicine_catalog_version', ['catalog_version'], unique=False)
+        batch_op.create_index('ix_medicine_barcode', ['barcode'], unique=True)
+        batch_op.create_unique_constraint('medicine_name_key', ['name'])
+
+    with op.batch_alter_table('catalog_tombstone', schema=None) as batch_op:
+        batch_op.create_index('ix_catalog_tombstone_version', ['version'], unique=False)
+        batch_op.drop_column('store_id')
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_user_store_id_store', type_='foreignkey')
+        batch_op.drop_column('store_id')
+    for table in ARCHIVE_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('store_id')
+    for table in STORE_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(f'fk_{table}_store_id_store', type_='foreignkey')
+            batch_op.drop_column('store_id')
+    op.drop_table('store')
@@ -0,0 +1,28 @@
+"""Add idempotency_key to CustomerInvoice
+
+Revision ID: 3f6b8d21c7e5
+Revises: 7c1e2a9d4b10
+Create Date: 2026-10-19 20:03:17.512904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6b8d21c7e5'
+down_revision = '7c1e2a9d4b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('customer_invoice', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_customer_invoice_idempotency_key'), 'customer_invoice', ['idempotency_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_customer_invoice_idempotency_key'), table_name='customer_invoice')
+    with op.batch_alter_table('customer_invoice', schema=None) as batch_op:
+        batch_op.drop_column('idempotency_key')
@@ -0,0 +1,44 @@
+"""Add geohash to CustomerInvoice
+
+Revision ID: 4d8e1b6f2a57
+Revises: e2b7f04c6a19
+Create Date: 2026-10-20 15:41:08.219374
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from curepharma.geo import encode_geohash
+
+
+# revision identifiers, used by Alembic.
+revision = '4d8e1b6f2a57'
+down_revision = 'e2b7f04c6a19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('customer_invoice', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+    op.create_index(op.f('ix_customer_invoice_geohash'), 'customer_invoice', ['geohash'], unique=False)
+
+    # Backfill geocoded orders
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT id, latitude, longitude FROM customer_invoice "
+        "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    )).all()
+    updates = [
+        {'id': row.id, 'geohash': geohash}
+        for row in rows
+        if (geohash := encode_geohash(row.latitude, row.longitude))
+    ]
+    if updates:
+        conn.execute(sa.text("UPDATE customer_invoice SET geohash = :geohash WHERE id = :id"), updates)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_customer_invoice_geohash'), table_name='customer_invoice')
+    with op.batch_alter_table('customer_invoice', schema=None) as batch_op:
+        batch_op.drop_column('geohash')
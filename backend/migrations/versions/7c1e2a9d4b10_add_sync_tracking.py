@@ -0,0 +1,61 @@
+"""Add sync tracking columns and change log
+
+Revision ID: 7c1e2a9d4b10
+Revises: efb0ebb20f09
+Create Date: 2026-10-19 10:12:41.204113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e2a9d4b10'
+down_revision = 'efb0ebb20f09'
+branch_labels = None
+depends_on = None
+
+TRACKED_TABLES = [
+    'medicine', 'customer_invoice', 'customer_invoice_item', 'reminder',
+    'shortage', 'advance_payment', 'purchase_invoice',
+]
+
+
+def upgrade():
+    for table in TRACKED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('sync_uid', sa.String(length=36), nullable=True))
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        # Derived from the id so a cloud copy made by migrate_data.py gets the same uids
+        op.execute(f"UPDATE {table} SET sync_uid = '{table}-' || id WHERE sync_uid IS NULL")
+        op.create_index(op.f(f'ix_{table}_sync_uid'), table, ['sync_uid'], unique=True)
+
+    op.create_table('sync_change',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('table_name', sa.String(length=50), nullable=False),
+        sa.Column('row_uid', sa.String(length=36), nullable=False),
+        sa.Column('operation', sa.String(length=10), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=True),
+        sa.Column('origin', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_change_origin'), 'sync_change', ['origin'], unique=False)
+    op.create_table('sync_cursor',
+        sa.Column('peer', sa.String(length=255), nullable=False),
+        sa.Column('last_pushed_id', sa.Integer(), nullable=False),
+        sa.Column('last_pulled_id', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('peer')
+    )
+
+
+def downgrade():
+    op.drop_table('sync_cursor')
+    op.drop_index(op.f('ix_sync_change_origin'), table_name='sync_change')
+    op.drop_table('sync_change')
+    for table in reversed(TRACKED_TABLES):
+        op.drop_index(op.f(f'ix_{table}_sync_uid'), table_name=table)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
+            batch_op.drop_column('sync_uid')
@@ -0,0 +1,48 @@
+"""Add catalogue version counters and tombstones
+
+Revision ID: 9a4c2e7f1b83
+Revises: 3f6b8d21c7e5
+Create Date: 2026-10-19 21:26:40.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c2e7f1b83'
+down_revision = '3f6b8d21c7e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_stamp',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('catalog_tombstone',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('medicine_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_catalog_tombstone_version'), 'catalog_tombstone', ['version'], unique=False)
+
+    # Existing rows start at version 0, which is what a first snapshot reports
+    with op.batch_alter_table('medicine', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('catalog_version', sa.Integer(), server_default='0', nullable=False))
+    op.create_index(op.f('ix_medicine_catalog_version'), 'medicine', ['catalog_version'], unique=False)
+    op.execute("INSERT INTO change_stamp (name, version) VALUES ('catalog', 0)")
+
+
+def downgrade():
+    op.drop_index(op.f('ix_medicine_catalog_version'), table_name='medicine')
+    with op.batch_alter_table('medicine', schema=None) as batch_op:
+        batch_op.drop_column('catalog_version')
+    op.drop_index(op.f('ix_catalog_tombstone_version'), table_name='catalog_tombstone')
+    op.drop_table('catalog_tombstone')
+    op.drop_table('change_stamp')
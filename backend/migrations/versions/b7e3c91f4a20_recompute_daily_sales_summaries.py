@@ -0,0 +1,26 @@
+"""Recompute daily sales summaries
+
+Revision ID: b7e3c91f4a20
+Revises: d8124ad9655a
+Create Date: 2026-10-19 20:14:02.305117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3c91f4a20'
+down_revision = 'd8124ad9655a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Stored summaries counted multi-item bills once per line; snapshots are a
+    # cache, so dropping them makes the next request or scheduler run rebuild them
+    op.execute("DELETE FROM report_snapshot WHERE report = 'daily_sales_summary'")
+
+
+def downgrade():
+    pass
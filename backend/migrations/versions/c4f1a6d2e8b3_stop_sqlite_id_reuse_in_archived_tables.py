@@ -0,0 +1,46 @@
+"""Stop SQLite reusing ids in archived tables
+
+Revision ID: c4f1a6d2e8b3
+Revises: b7e3c91f4a20
+Create Date: 2026-10-19 21:02:41.771304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f1a6d2e8b3'
+down_revision = 'b7e3c91f4a20'
+branch_labels = None
+depends_on = None
+
+# Hot tables whose rows move to <table>_archive
+ARCHIVED_TABLES = ['customer_invoice', 'customer_invoice_item', 'reminder', 'shortage', 'advance_payment']
+
+
+def _recreate(autoincrement):
+    for table in ARCHIVED_TABLES:
+        with op.batch_alter_table(table, schema=None, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': autoincrement}):
+            pass
+
+
+def upgrade():
+    # Postgres sequences never hand out an id twice; only SQLite reuses the highest deleted one
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _recreate(True)
+    # New ids start above every id used so far, archived ones included
+    for table in ARCHIVED_TABLES:
+        op.execute(f"DELETE FROM sqlite_sequence WHERE name = '{table}'")
+        op.execute(
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table}', MAX(id) FROM "
+            f"(SELECT COALESCE(MAX(id), 0) AS id FROM {table} UNION ALL SELECT COALESCE(MAX(id), 0) FROM {table}_archive)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _recreate(False)
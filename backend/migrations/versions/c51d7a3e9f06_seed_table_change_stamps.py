@@ -0,0 +1,39 @@
+"""Seed per-table change stamps
+
+Revision ID: c51d7a3e9f06
+Revises: 9a4c2e7f1b83
+Create Date: 2026-10-19 22:41:08.730215
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c51d7a3e9f06'
+down_revision = '9a4c2e7f1b83'
+branch_labels = None
+depends_on = None
+
+STAMPED_TABLES = [
+    'customer_invoice', 'customer_invoice_item', 'reminder',
+    'shortage', 'advance_payment', 'purchase_invoice',
+]
+
+
+def upgrade():
+    # The catalogue counter becomes the medicine table's stamp
+    now = datetime.utcnow()
+    change_stamp = sa.table('change_stamp',
+        sa.column('name', sa.String), sa.column('version', sa.Integer), sa.column('changed_at', sa.DateTime))
+    op.execute(change_stamp.update().where(change_stamp.c.name == 'catalog').values(name='medicine', changed_at=now))
+    # Stamped now so Last-Modified works before the first write
+    op.bulk_insert(change_stamp, [{'name': table, 'version': 0, 'changed_at': now} for table in STAMPED_TABLES])
+
+
+def downgrade():
+    change_stamp = sa.table('change_stamp', sa.column('name', sa.String))
+    op.execute(change_stamp.delete().where(change_stamp.c.name.in_(STAMPED_TABLES)))
+    op.execute(change_stamp.update().where(change_stamp.c.name == 'medicine').values(name='catalog'))
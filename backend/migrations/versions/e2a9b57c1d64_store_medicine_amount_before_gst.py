@@ -0,0 +1,40 @@
+"""Store medicine amount before GST
+
+Revision ID: e2a9b57c1d64
+Revises: c4f1a6d2e8b3
+Create Date: 2026-10-19 21:24:10.502837
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a9b57c1d64'
+down_revision = 'c4f1a6d2e8b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows added or edited in the app stored amount after GST and no netvalue;
+    # the CSV import and Medicine.update_value store it before GST, netvalue after.
+    # Imported amounts can differ from PTR x quantity, so only rows written the
+    # app's way (no netvalue, or amount equal to the after-GST value) are rewritten.
+    medicine = sa.table('medicine', sa.column('ptr', sa.Float), sa.column('quantity', sa.Integer),
+                        sa.column('gst', sa.Float), sa.column('amount', sa.Float), sa.column('netvalue', sa.Float))
+    before_gst = sa.func.coalesce(medicine.c.ptr, 0) * sa.func.coalesce(medicine.c.quantity, 0)
+    gst_factor = 1 + sa.func.coalesce(medicine.c.gst, 0) / 100.0
+    op.execute(
+        medicine.update()
+        .where(sa.or_(
+            medicine.c.netvalue.is_(None),
+            sa.and_(medicine.c.gst > 0, sa.func.abs(medicine.c.amount - before_gst * gst_factor) < 0.005),
+        ))
+        .values(amount=before_gst, netvalue=before_gst * gst_factor)
+    )
+
+
+def downgrade():
+    # The old values can't be told apart from imported ones afterwards; both definitions stay readable
+    pass
@@ -0,0 +1,32 @@
+"""Add barcode and HSN code to Medicine
+
+Revision ID: e2b7f04c6a19
+Revises: c51d7a3e9f06
+Create Date: 2026-10-20 09:12:55.604871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7f04c6a19'
+down_revision = 'c51d7a3e9f06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('medicine', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('barcode', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('hsn_code', sa.String(length=8), nullable=True))
+    op.create_index(op.f('ix_medicine_barcode'), 'medicine', ['barcode'], unique=True)
+    op.create_index(op.f('ix_medicine_hsn_code'), 'medicine', ['hsn_code'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_medicine_hsn_code'), table_name='medicine')
+    op.drop_index(op.f('ix_medicine_barcode'), table_name='medicine')
+    with op.batch_alter_table('medicine', schema=None) as batch_op:
+        batch_op.drop_column('hsn_code')
+        batch_op.drop_column('barcode')
@@ -1,7 +1,12 @@
+
 import webview
 import sys
 import os
-from app1 import app, db
+from curepharma import create_app
+from curepharma.config import DesktopConfig
+from curepharma.extensions import db
+
+app = create_app(DesktopConfig)
 
 if __name__ == '__main__':
     # Ensure the database tables are created in the correct location